@@ -1,21 +1,26 @@
 import streamlit as st
 import hashlib
-from database import BankDatabase, UserManager
-from mysql_config import MySQLDatabase
+from database import get_bank_database, UserManager
+from mysql_config import DatabaseUnavailableError, MySQLDatabase, get_database
 
+# Attente maximale (s) de la connexion à la base à la connexion d'un utilisateur
 def hash_password(password):
     return hashlib.sha256(password.encode()).hexdigest()
 
 def init_db_connection():
     try:
-        db = BankDatabase()
-        if not db.conn:
-            st.error("Échec de la connexion à la base de données Railway")
-            st.stop()
-        return db
+        # Pendant l'établissement de la connexion en arrière-plan, on répond tout de suite
+        # Service partagé par toutes les sessions : il ne doit pas être fermé ici
+        bank = get_bank_database() if get_database().is_available() else None
+    except DatabaseUnavailableError:
+        bank = None
     except Exception as e:
         st.error(f"Erreur de connexion à la base de données: {str(e)}")
         st.stop()
+    if bank is None:
+        st.warning("Connexion à la base de données en cours, veuillez réessayer dans quelques instants")
+        st.stop()
+    return bank
 
 def show_login_form():
     with st.form("Login"):
@@ -26,7 +31,7 @@ def show_login_form():
 
         if submit_button:
             db = init_db_connection()
-            user_manager = UserManager(db.conn)
+            user_manager = UserManager(db.db)
             hashed_password = hash_password(password)
             user = user_manager.verify_user(username, hashed_password)
             
@@ -37,7 +42,6 @@ def show_login_form():
                 st.rerun()
             else:
                 st.error("Nom d'utilisateur ou mot de passe incorrect")
-            db.close()
 
 def show_signup_form():
     with st.form("Signup"):
@@ -54,16 +58,14 @@ def show_signup_form():
                 return
 
             db = init_db_connection()
-            user_manager = UserManager(db.conn)
+            user_manager = UserManager(db.db)
             hashed_password = hash_password(password)
             
             if user_manager.get_user_by_username(username):
                 st.error("Ce nom d'utilisateur est déjà pris")
-                db.close()
                 return
 
             user_id = user_manager.add_user(username, email, hashed_password)
-            db.close()
             
             if user_id:
                 st.success("Compte créé avec succès! Vous pouvez maintenant vous connecter.")
@@ -0,0 +1,21 @@
+# backfill_daily_stats.py
+import argparse
+from datetime import datetime
+
+from database import BankDatabase
+from mysql_config import MySQLDatabase
+
+def backfill_daily_stats(since=None):
+    db = MySQLDatabase()
+    try:
+        rows = BankDatabase(db).rebuild_daily_stats(since)
+        print(f"daily_stats reconstruite: {rows} lignes d'agrégat")
+    finally:
+        db.close()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Reconstruit la table daily_stats depuis l'historique des transactions")
+    parser.add_argument("--since", type=lambda s: datetime.strptime(s, "%Y-%m-%d").date(),
+                        help="Premier jour à recalculer (AAAA-MM-JJ) ; tout l'historique par défaut")
+    args = parser.parse_args()
+    backfill_daily_stats(args.since)
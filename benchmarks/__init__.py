@@ -0,0 +1,2 @@
+# benchmarks/__init__.py
+# Mesures de performance, à lancer avec `python -m benchmarks.<nom>`
@@ -0,0 +1,121 @@
+# benchmarks/bench_frames.py
+"""
+Mémoire et temps de construction des DataFrames de l'historique : liste de
+dictionnaires (construction d'origine, colonnes object) contre frames.py
+(tuples du curseur et schéma typé), puis un filtre et une agrégation
+typiques d'une page ou d'un graphique.
+
+Par défaut les lignes sont synthétiques, de la forme renvoyée par le
+curseur (centimes entiers, datetime, chaînes répétées) ; --from-db lit les N
+premières lignes de l'historique.
+
+    python -m benchmarks.bench_frames --rows 1000000
+"""
+import argparse
+import gc
+import json
+import random
+import time
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Tuple
+
+import pandas as pd
+
+from database import DEPOSIT, TRANSACTION_FIELDS, WITHDRAWAL
+from frames import TRANSACTION_SCHEMA, frame_from_rows, frame_memory
+
+
+def synthetic_rows(count: int) -> List[Tuple]:
+    rng = random.Random(42)
+    start = datetime(2024, 1, 1)
+    currencies = ['EUR'] * 8 + ['USD', 'GBP']
+    names = [f"Client {n}" for n in range(20_000)]
+    rows = []
+    for n in range(count):
+        client = rng.randrange(len(names))
+        rows.append((
+            n + 1,
+            start + timedelta(seconds=n * 30),
+            DEPOSIT if rng.random() < 0.45 else WITHDRAWAL,
+            rng.randint(100, 500_000),
+            rng.choice(("Virement", "Retrait DAB", "Salaire", "Loyer", "")),
+            client,
+            client * 2,
+            f"FR76{client * 2:023d}",
+            rng.choice(currencies),
+            names[client],
+        ))
+    return rows
+
+
+def database_rows(count: int) -> List[Tuple]:
+    from database import BankDatabase
+    from mysql_config import MySQLDatabase
+
+    db = MySQLDatabase()
+    try:
+        rows = []
+        for chunk in BankDatabase(db).iter_transactions(50_000):
+            rows.extend(chunk)
+            if len(rows) >= count:
+                break
+        return rows[:count]
+    finally:
+        db.close()
+
+
+def _timed(build) -> Tuple[Any, float]:
+    gc.collect()
+    start = time.perf_counter()
+    value = build()
+    return value, (time.perf_counter() - start) * 1000
+
+
+def _workload(frame: pd.DataFrame):
+    """Filtre par type et total par devise et par jour, comme un graphique du tableau de bord"""
+    deposits = frame[frame['type'] == DEPOSIT]
+    days = pd.to_datetime(deposits['date']).dt.date
+    return deposits.assign(day=days).groupby(['currency', 'day'], observed=True)['amount_cents'].sum()
+
+
+def run(rows: List[Tuple]) -> Dict[str, Any]:
+    report = {'rows': len(rows)}
+    for label, build in (
+        ('dicts', lambda: pd.DataFrame([dict(zip(TRANSACTION_FIELDS, row)) for row in rows])),
+        ('typed', lambda: frame_from_rows(TRANSACTION_FIELDS, rows, TRANSACTION_SCHEMA)),
+    ):
+        frame, build_ms = _timed(build)
+        _, workload_ms = _timed(lambda: _workload(frame))
+        report[label] = {
+            'memory_mb': round(frame_memory(frame) / 1024 / 1024, 1),
+            'build_ms': round(build_ms, 1),
+            'workload_ms': round(workload_ms, 1),
+            'dtypes': {column: str(dtype) for column, dtype in frame.dtypes.items()},
+        }
+        del frame
+    report['memory_ratio'] = round(report['dicts']['memory_mb'] / report['typed']['memory_mb'], 2)
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Mémoire des DataFrames typés contre liste de dictionnaires")
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--from-db", action="store_true", help="Lit l'historique au lieu de lignes synthétiques")
+    parser.add_argument("--json", action="store_true", help="Sortie JSON brute")
+    args = parser.parse_args()
+
+    rows = database_rows(args.rows) if args.from_db else synthetic_rows(args.rows)
+    report = run(rows)
+    if args.json:
+        print(json.dumps(report, indent=2))
+        return
+    print(f"{report['rows']:,} lignes")
+    print(f"{'construction':<14} {'mémoire Mo':>11} {'création ms':>12} {'filtre+agrégat ms':>18}")
+    for label in ('dicts', 'typed'):
+        stats = report[label]
+        print(f"{label:<14} {stats['memory_mb']:>11} {stats['build_ms']:>12} {stats['workload_ms']:>18}")
+    print(f"Mémoire divisée par {report['memory_ratio']}")
+
+
+if __name__ == "__main__":
+    main()
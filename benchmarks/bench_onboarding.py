@@ -0,0 +1,77 @@
+# benchmarks/bench_onboarding.py
+"""
+Débit de l'import de masse des clients : génère un CSV de N lignes (un client
+et un compte par ligne, plus une part de lignes rattachées à un client déjà
+vu), l'importe puis le réimporte pour mesurer le chemin de déduplication.
+Objectif : au moins 10 000 lignes/s sur un MySQL local.
+
+    python -m benchmarks.bench_onboarding --rows 100000
+"""
+import argparse
+import csv
+import io
+import json
+import os
+import random
+import tempfile
+import uuid
+
+from client_import import DEFAULT_CHUNK_SIZE, import_clients
+from database import BankDatabase
+from mysql_config import MySQLDatabase
+
+TARGET_ROWS_PER_S = 10_000
+
+
+def write_dataset(path: str, rows: int, repeat_ratio: float):
+    tag = uuid.uuid4().hex[:6].upper()
+    with open(path, 'w', encoding='utf-8', newline='') as f:
+        writer = csv.writer(f)
+        writer.writerow(['first_name', 'last_name', 'email', 'phone', 'type', 'status',
+                         'iban', 'currency', 'account_type', 'balance'])
+        for n in range(rows):
+            client = random.randrange(n) if n and random.random() < repeat_ratio else n
+            writer.writerow([
+                'Bench', f'Client{client}', f'bench{client}.{tag.lower()}@example.com', '0600000000',
+                'Particulier', 'Actif', f'FR76{tag}{n:018d}', 'EUR', 'Courant', '100.00',
+            ])
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Mesure le débit de l'import de clients et de comptes")
+    parser.add_argument("--rows", type=int, default=100_000)
+    parser.add_argument("--chunk-size", type=int, default=DEFAULT_CHUNK_SIZE)
+    parser.add_argument("--repeat-ratio", type=float, default=0.1,
+                        help="Part des lignes qui ajoutent un compte à un client déjà vu")
+    parser.add_argument("--json", action="store_true", help="Sortie JSON brute")
+    args = parser.parse_args()
+
+    db = MySQLDatabase(pool_settings={'min_size': 1, 'max_size': 2})
+    bank = BankDatabase(db)
+    directory = tempfile.mkdtemp(prefix="bench_onboarding_")
+    path = os.path.join(directory, "clients.csv")
+    try:
+        write_dataset(path, args.rows, args.repeat_ratio)
+        first = import_clients(bank, path, args.chunk_size, io.StringIO(), resume=False)
+        # Deuxième passage : tout existe déjà, seule la déduplication travaille
+        second = import_clients(bank, path, args.chunk_size, io.StringIO(), resume=False)
+    finally:
+        db.close()
+        for name in os.listdir(directory):
+            os.remove(os.path.join(directory, name))
+        os.rmdir(directory)
+
+    report = {'rows': args.rows, 'chunk_size': args.chunk_size, 'first_pass': first, 'dedupe_pass': second,
+              'target_met': first['rows_per_s'] >= TARGET_ROWS_PER_S}
+    if args.json:
+        print(json.dumps(report, indent=2))
+        return
+    for label, result in (("Premier passage", first), ("Réimport (dédupliqué)", second)):
+        print(f"{label}: {result['rows_per_s']:,.0f} lignes/s en {result['seconds']} s — "
+              f"{result['clients_created']} clients et {result['ibans_created']} comptes créés, "
+              f"{result['ibans_existing']} comptes déjà présents, {result['rejected']} rejets")
+    print(f"Objectif {TARGET_ROWS_PER_S:,} lignes/s: " + ("atteint" if report['target_met'] else "non atteint"))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,74 @@
+# benchmarks/bench_receipts.py
+"""
+Latence par reçu de receipt_generator, avec et sans logo :
+
+- per_call : un ReceiptRenderer par reçu et écriture dans receipts/, le
+  schéma d'appel de l'ancien generate_receipt_pdf (styles et logo refaits
+  à chaque reçu) ;
+- shared   : moteur partagé, reçu rendu en mémoire ;
+- shared+save : moteur partagé puis save_receipt ;
+- cached : reçu déjà rendu, resservi par ReceiptCache (niveau mémoire).
+
+Les données sont synthétiques : aucune base n'est nécessaire.
+
+    python -m benchmarks.bench_receipts --repeat 200
+"""
+import argparse
+import json
+import os
+import tempfile
+
+from benchmarks.suite import ROOT, measure
+from money import Money
+from receipt_cache import ReceiptCache
+from receipt_generator import ReceiptRenderer, save_receipt
+
+TRANSACTION = {'id': 123456, 'date': '2024-12-31 18:45:00', 'type': 'withdrawal',
+               'amount': Money(123450, 'EUR'), 'description': "Retrait DAB"}
+CLIENT = {'first_name': 'Camille', 'last_name': 'Durand', 'type': 'Particulier',
+          'email': 'camille.durand@example.com', 'phone': '+33 6 12 34 56 78'}
+IBAN = {'iban': 'FR76 3000 6000 0112 3456 7890 189', 'currency': 'EUR'}
+OPTIONS = {'company_name': "Banque Virtuelle", 'additional_notes': "Merci pour votre confiance."}
+
+
+def run(repeat: int):
+    logo = os.path.join(ROOT, "assets", "logo.png")
+    shared = ReceiptRenderer()
+    results = {}
+    with tempfile.TemporaryDirectory() as directory:
+        cache = ReceiptCache(directory)
+        for suffix, logo_path in (('', None), ('.logo', logo)):
+            render = lambda renderer: renderer.render(TRANSACTION, CLIENT, IBAN, logo=logo_path, **OPTIONS)
+            cases = {
+                'per_call': lambda: save_receipt(render(ReceiptRenderer()), TRANSACTION['id'], directory),
+                'shared': lambda: render(shared),
+                'shared+save': lambda: save_receipt(render(shared), TRANSACTION['id'], directory),
+                'cached': lambda: cache.get_or_render(shared, TRANSACTION, CLIENT, IBAN, logo=logo_path, **OPTIONS),
+            }
+            for name, fn in cases.items():
+                stats = measure(fn, repeat)
+                stats['receipts_per_s'] = round(1000 / stats['median_ms'], 1) if stats['median_ms'] else 0.0
+                results[f"{name}{suffix}"] = stats
+        results['pdf_bytes'] = len(render(shared))
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Latence de rendu des reçus PDF")
+    parser.add_argument("--repeat", type=int, default=100)
+    parser.add_argument("--json", action="store_true", help="Sortie JSON brute")
+    args = parser.parse_args()
+
+    results = run(args.repeat)
+    if args.json:
+        print(json.dumps(results, indent=2))
+        return
+    print(f"{'cas':<18} {'médiane ms':>11} {'p95 ms':>8} {'reçus/s':>9}")
+    for name, stats in results.items():
+        if isinstance(stats, dict):
+            print(f"{name:<18} {stats['median_ms']:>11} {stats['p95_ms']:>8} {stats['receipts_per_s']:>9}")
+    print(f"Taille d'un reçu avec logo: {results['pdf_bytes'] / 1024:.1f} Ko")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,112 @@
+# benchmarks/bench_statements.py
+"""
+Temps et mémoire d'un relevé de compte (statement_generator) selon le
+nombre de mouvements. Les mouvements sont synthétiques, de la forme
+renvoyée par iter_statement_rows (solde cumulé déjà calculé) : aucune base
+n'est nécessaire. Le pic mémoire est mesuré par tracemalloc, qui ralentit
+le rendu : les temps sont à comparer entre eux. Chaque page est écrite dès
+qu'elle est pleine : le pic doit rester le même de 10 000 à 100 000
+mouvements.
+
+    python -m benchmarks.bench_statements --movements 10000 100000
+"""
+import argparse
+import json
+import os
+import random
+import tempfile
+import time
+import tracemalloc
+from datetime import date, datetime, timedelta
+from typing import Any, Dict
+
+from database import DEPOSIT, WITHDRAWAL
+from statement_generator import generate_statement
+
+DATE_FROM, DATE_TO = date(2024, 1, 1), date(2024, 12, 31)
+LABELS = ["Paiement carte", "Virement reçu", "Prélèvement SEPA", "Retrait DAB",
+          "Remboursement de frais professionnels engagés lors du déplacement client"]
+
+
+class SyntheticBank:
+    """Réponses de BankDatabase pour un compte de `movements` mouvements"""
+
+    OPENING_CENTS = 1_000_000
+
+    def __init__(self, movements: int):
+        self.movements = movements
+        # Totaux de la synthèse cohérents avec les mouvements générés
+        self.deposits_cents = self.withdrawals_cents = 0
+        for rows in self.iter_statement_rows(None, None, None, self.OPENING_CENTS, 10_000):
+            for _, _, transaction_type, cents, _, _ in rows:
+                if transaction_type == DEPOSIT:
+                    self.deposits_cents += cents
+                else:
+                    self.withdrawals_cents += cents
+        self.closing_cents = self.OPENING_CENTS + self.deposits_cents - self.withdrawals_cents
+
+    def get_statement_summary(self, iban_id, date_from, date_to) -> Dict[str, Any]:
+        return {'id': iban_id, 'iban': 'FR76 3000 6000 0112 3456 7890 189', 'currency': 'EUR',
+                'account_type': 'Courant', 'first_name': 'Camille', 'last_name': 'Durand',
+                'email': 'camille.durand@example.com', 'balance_cents': self.closing_cents,
+                'opening_cents': self.OPENING_CENTS, 'deposits_cents': self.deposits_cents,
+                'withdrawals_cents': self.withdrawals_cents, 'movements': self.movements,
+                'closing_cents': self.closing_cents}
+
+    def iter_statement_rows(self, iban_id, date_from, date_to, opening_cents, chunk_size):
+        rng = random.Random(42)
+        balance, start = opening_cents, datetime(2024, 1, 1)
+        step = (365 * 86400) // max(self.movements, 1)
+        for low in range(0, self.movements, chunk_size):
+            rows = []
+            for n in range(low, min(self.movements, low + chunk_size)):
+                transaction_type = DEPOSIT if rng.random() < 0.5 else WITHDRAWAL
+                cents = rng.randint(100, 500_000)
+                balance += cents if transaction_type == DEPOSIT else -cents
+                rows.append((n + 1, start + timedelta(seconds=n * step), transaction_type, cents,
+                             rng.choice(LABELS), balance))
+            yield rows
+
+
+def run_case(movements: int, directory: str) -> Dict[str, Any]:
+    bank = SyntheticBank(movements)
+    path = os.path.join(directory, f"releve_{movements}.pdf")
+    try:
+        tracemalloc.start()
+        start = time.perf_counter()
+        result = generate_statement(bank, 1, DATE_FROM, DATE_TO, output=path)
+        seconds = time.perf_counter() - start
+        peak = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+    return {
+        'movements': movements,
+        'pages': result['pages'],
+        'seconds': round(seconds, 2),
+        'movements_per_s': round(movements / seconds) if seconds else 0,
+        'peak_mb': round(peak / 1024 / 1024, 1),
+        'pdf_mb': round(os.path.getsize(path) / 1024 / 1024, 2),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Temps et mémoire d'un relevé de compte")
+    parser.add_argument("--movements", type=int, nargs="+", default=[1_000, 10_000, 100_000])
+    parser.add_argument("--json", action="store_true", help="Sortie JSON brute")
+    args = parser.parse_args()
+
+    results = {}
+    with tempfile.TemporaryDirectory() as directory:
+        for movements in args.movements:
+            results[str(movements)] = run_case(movements, directory)
+    if args.json:
+        print(json.dumps(results, indent=2))
+        return
+    print(f"{'mouvements':<12} {'pages':>6} {'s':>7} {'mouvements/s':>13} {'pic Mo':>7} {'PDF Mo':>7}")
+    for name, stats in results.items():
+        print(f"{name:<12} {stats['pages']:>6} {stats['seconds']:>7} {stats['movements_per_s']:>13,} "
+              f"{stats['peak_mb']:>7} {stats['pdf_mb']:>7}")
+
+
+if __name__ == "__main__":
+    main()
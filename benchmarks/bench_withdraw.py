@@ -0,0 +1,140 @@
+# benchmarks/bench_withdraw.py
+"""
+Charge concurrente sur deposit/withdraw : N threads débitent et créditent un
+petit nombre d'IBAN « chauds » pendant une durée donnée, puis on mesure le
+débit, les latences, les interblocages et l'attente du pool, et on vérifie
+qu'aucun solde n'est devenu négatif ni n'a divergé des mouvements enregistrés.
+
+    python -m benchmarks.bench_withdraw --threads 32 --hot-ibans 4 --duration 30
+"""
+import argparse
+import json
+import random
+import statistics
+import threading
+import time
+import uuid
+from collections import Counter
+from decimal import Decimal
+
+from database import BankDatabase, DEPOSIT, TX_OK
+from mysql_config import MySQLDatabase
+
+
+def _percentile(samples, fraction):
+    if len(samples) < 2:
+        return samples[0] if samples else 0.0
+    return statistics.quantiles(samples, n=100, method='inclusive')[int(fraction * 100) - 1]
+
+
+def setup_ibans(bank: BankDatabase, count: int, balance: Decimal):
+    """Crée un client de test et `count` IBAN approvisionnés"""
+    tag = uuid.uuid4().hex[:8]
+    client_id = bank.add_client("Bench", tag, f"bench-{tag}@example.com", "", "Particulier", "Inactif")
+    return [
+        bank.add_iban(client_id, f"BENCH{tag.upper()}{n:06d}", "EUR", "Courant", balance)
+        for n in range(count)
+    ]
+
+
+def run(threads: int, hot_ibans: int, duration: float, withdraw_ratio: float,
+        amount: Decimal, initial_balance: Decimal):
+    db = MySQLDatabase(pool_settings={'min_size': threads, 'max_size': threads})
+    bank = BankDatabase(db)
+    iban_ids = setup_ibans(bank, hot_ibans, initial_balance)
+
+    latencies, statuses, errors = [], Counter(), Counter()
+    lock = threading.Lock()
+    deadline = time.monotonic() + duration
+
+    def worker():
+        local_latencies, local_statuses, local_errors = [], Counter(), Counter()
+        while time.monotonic() < deadline:
+            iban_id = random.choice(iban_ids)
+            operation = bank.withdraw if random.random() < withdraw_ratio else bank.deposit
+            start = time.perf_counter()
+            try:
+                result = operation(iban_id, amount, "benchmark")
+                local_statuses[f"{operation.__name__}:{result['status']}"] += 1
+            except Exception as e:
+                local_errors[type(e).__name__] += 1
+            local_latencies.append((time.perf_counter() - start) * 1000)
+        with lock:
+            latencies.extend(local_latencies)
+            statuses.update(local_statuses)
+            errors.update(local_errors)
+
+    workers = [threading.Thread(target=worker) for _ in range(threads)]
+    started = time.perf_counter()
+    for thread in workers:
+        thread.start()
+    for thread in workers:
+        thread.join()
+    elapsed = time.perf_counter() - started
+
+    # Solde final = solde initial + mouvements enregistrés, et jamais négatif
+    invariant = []
+    with db.connection() as conn:
+        cursor = conn.cursor()
+        for iban_id in iban_ids:
+            cursor.execute('''
+                SELECT i.balance,
+                       COALESCE(SUM(CASE WHEN t.type = %s THEN t.amount ELSE -t.amount END), 0)
+                FROM ibans i LEFT JOIN transactions t ON t.iban_id = i.id
+                WHERE i.id = %s GROUP BY i.balance
+            ''', (DEPOSIT, iban_id))
+            balance, movements = cursor.fetchone()
+            invariant.append({'iban_id': iban_id, 'balance': float(balance),
+                              'ok': balance >= 0 and balance == initial_balance + movements})
+        cursor.close()
+
+    succeeded = sum(n for key, n in statuses.items() if key.endswith(TX_OK))
+    report = {
+        'threads': threads,
+        'hot_ibans': hot_ibans,
+        'duration_s': round(elapsed, 2),
+        'operations': len(latencies),
+        'committed': succeeded,
+        'tx_per_s': round(succeeded / elapsed, 1) if elapsed else 0.0,
+        'latency_ms_p50': round(_percentile(latencies, 0.50), 2),
+        'latency_ms_p99': round(_percentile(latencies, 0.99), 2),
+        'statuses': dict(statuses),
+        'errors': dict(errors),
+        'lock_metrics': bank.transaction_metrics(),
+        'pool': {key: value for key, value in db.pool_metrics().items()
+                 if key in ('size', 'exhausted', 'timeouts', 'rejected', 'wait_ms_avg', 'wait_ms_p99')},
+        'invariant_ok': all(item['ok'] for item in invariant),
+        'ibans': invariant,
+    }
+    db.close()
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Mesure le débit de deposit/withdraw sous contention")
+    parser.add_argument("--threads", type=int, default=16)
+    parser.add_argument("--hot-ibans", type=int, default=4, help="Nombre d'IBAN se partageant la charge")
+    parser.add_argument("--duration", type=float, default=20.0, help="Durée en secondes")
+    parser.add_argument("--withdraw-ratio", type=float, default=0.7)
+    parser.add_argument("--amount", type=Decimal, default=Decimal("10.00"))
+    parser.add_argument("--initial-balance", type=Decimal, default=Decimal("5000.00"),
+                        help="Solde de départ, assez bas pour provoquer des refus de provision")
+    parser.add_argument("--json", action="store_true", help="Sortie JSON brute")
+    args = parser.parse_args()
+
+    report = run(args.threads, args.hot_ibans, args.duration, args.withdraw_ratio,
+                 args.amount, args.initial_balance)
+    if args.json:
+        print(json.dumps(report, indent=2))
+        return
+
+    print(f"{report['committed']} mouvements validés en {report['duration_s']} s "
+          f"({report['tx_per_s']} tx/s, {report['threads']} threads, {report['hot_ibans']} IBAN)")
+    print(f"Latence p50 {report['latency_ms_p50']} ms, p99 {report['latency_ms_p99']} ms")
+    print(f"Résultats: {report['statuses']}  Erreurs: {report['errors']}")
+    print(f"Verrous: {report['lock_metrics']}  Pool: {report['pool']}")
+    print("Invariant des soldes: " + ("OK" if report['invariant_ok'] else "VIOLÉ"))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,199 @@
+# benchmarks/load_driver.py
+"""
+Rejoue un mélange d'opérations de l'application (tableau de bord, recherches,
+historique, fiches client, mouvements) avec N utilisateurs simulés, pour
+dimensionner la base et le pool de connexions.
+
+Chaque utilisateur enchaîne des opérations tirées selon le mélange, séparées
+par un temps de réflexion aléatoire ; le rapport donne le débit, les
+latences p50/p95/p99 et les erreurs par opération.
+
+    python -m benchmarks.load_driver --users 50 --duration 60 \\
+        --mix dashboard=10,search=25,history=30,client=15,post=20
+"""
+import argparse
+import json
+import random
+import statistics
+import threading
+import time
+from collections import defaultdict
+from typing import Any, Callable, Dict, List
+
+from cache import VersionedCache
+from database import BankDatabase
+from mysql_config import MySQLDatabase
+
+DEFAULT_MIX = "dashboard=10,search=25,history=30,client=15,post=20"
+
+# Taille des échantillons d'identifiants et de noms tirés de la base
+SAMPLE_SIZE = 1000
+
+
+def parse_mix(text: str) -> Dict[str, float]:
+    mix = {}
+    for item in text.split(','):
+        name, _, weight = item.partition('=')
+        mix[name.strip()] = float(weight)
+    return mix
+
+
+def _percentile(samples: List[float], fraction: float) -> float:
+    if len(samples) < 2:
+        return samples[0] if samples else 0.0
+    return statistics.quantiles(samples, n=100, method='inclusive')[int(fraction * 100) - 1]
+
+
+def load_samples(db: MySQLDatabase) -> Dict[str, List[Any]]:
+    """Identifiants de clients et d'IBAN et noms, tirés sur toute l'étendue des tables"""
+    samples = {}
+    with db.connection() as conn:
+        cursor = conn.cursor()
+        for table in ('clients', 'ibans'):
+            cursor.execute(f"SELECT MIN(id), MAX(id) FROM {table}")
+            low, high = cursor.fetchone()
+            if low is None:
+                raise SystemExit(f"La table {table} est vide : lancez d'abord data_generator.py")
+            samples[table] = [random.randint(low, high) for _ in range(SAMPLE_SIZE)]
+        cursor.execute("SELECT last_name FROM clients WHERE id >= %s LIMIT %s",
+                       (random.choice(samples['clients']), SAMPLE_SIZE))
+        samples['names'] = [row[0] for row in cursor.fetchall()] or ['martin']
+        cursor.close()
+    return samples
+
+
+def build_operations(bank: BankDatabase, samples: Dict[str, List[Any]]) -> Dict[str, Callable[[], Any]]:
+    """Opérations rejouées, chacune équivalente à un affichage ou un envoi de formulaire"""
+    def search():
+        name = random.choice(samples['names'])
+        if random.random() < 0.5:
+            return bank.search_clients(name[:random.randint(3, max(3, len(name)))])
+        return bank.get_transactions_page(search=name)
+
+    def history():
+        page = bank.get_transactions_page()
+        # Une fois sur trois, l'utilisateur passe à la page suivante
+        if page['has_next'] and random.random() < 0.33:
+            page = bank.get_transactions_page(after=page['last_key'])
+        return page
+
+    def client():
+        client_id = random.choice(samples['clients'])
+        return bank.get_client_by_id(client_id), bank.get_ibans_by_client(client_id)
+
+    def post():
+        iban_id = random.choice(samples['ibans'])
+        amount = round(random.lognormvariate(3.8, 1.1), 2) or 1.0
+        if random.random() < 0.6:
+            return bank.withdraw(iban_id, amount, "load test")
+        return bank.deposit(iban_id, amount, "load test")
+
+    return {
+        'dashboard': bank.get_dashboard_stats,
+        'search': search,
+        'history': history,
+        'client': client,
+        'post': post,
+    }
+
+
+def run(users: int, duration: float, mix: Dict[str, float], think_ms: float,
+        use_cache: bool) -> Dict[str, Any]:
+    db = MySQLDatabase(pool_settings={'min_size': 1, 'max_size': users})
+    bank = BankDatabase(db)
+    if not use_cache:
+        # Cache de lecture neutralisé : chaque opération va jusqu'à la base
+        bank.cache = VersionedCache(max_entries=0, ttl=0)
+    operations = build_operations(bank, load_samples(db))
+    unknown = set(mix) - set(operations)
+    if unknown:
+        raise SystemExit(f"Opérations inconnues dans le mélange: {', '.join(sorted(unknown))}")
+    names, weights = list(mix), list(mix.values())
+
+    latencies: Dict[str, List[float]] = defaultdict(list)
+    errors: Dict[str, Dict[str, int]] = defaultdict(lambda: defaultdict(int))
+    lock = threading.Lock()
+    deadline = time.monotonic() + duration
+
+    def user():
+        local_latencies, local_errors = defaultdict(list), defaultdict(lambda: defaultdict(int))
+        while time.monotonic() < deadline:
+            name = random.choices(names, weights)[0]
+            start = time.perf_counter()
+            try:
+                operations[name]()
+            except Exception as e:
+                local_errors[name][type(e).__name__] += 1
+            local_latencies[name].append((time.perf_counter() - start) * 1000)
+            if think_ms:
+                time.sleep(random.expovariate(1000 / think_ms))
+        with lock:
+            for name, samples in local_latencies.items():
+                latencies[name].extend(samples)
+            for name, counts in local_errors.items():
+                for error, count in counts.items():
+                    errors[name][error] += count
+
+    threads = [threading.Thread(target=user) for _ in range(users)]
+    started = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - started
+
+    report = {
+        'users': users,
+        'duration_s': round(elapsed, 2),
+        'think_ms': think_ms,
+        'cache': use_cache,
+        'operations': {},
+        'pool': db.pool_metrics(),
+        'lock_metrics': bank.transaction_metrics(),
+    }
+    total = 0
+    for name in names:
+        samples = latencies.get(name, [])
+        total += len(samples)
+        report['operations'][name] = {
+            'count': len(samples),
+            'per_s': round(len(samples) / elapsed, 1),
+            'p50_ms': round(_percentile(samples, 0.50), 2),
+            'p95_ms': round(_percentile(samples, 0.95), 2),
+            'p99_ms': round(_percentile(samples, 0.99), 2),
+            'errors': dict(errors.get(name, {})),
+        }
+    report['total_per_s'] = round(total / elapsed, 1)
+    db.close()
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Charge mixte sur les opérations de l'application")
+    parser.add_argument("--users", type=int, default=20, help="Utilisateurs simulés (threads)")
+    parser.add_argument("--duration", type=float, default=30.0, help="Durée en secondes")
+    parser.add_argument("--mix", default=DEFAULT_MIX, help="Poids des opérations, ex. " + DEFAULT_MIX)
+    parser.add_argument("--think-ms", type=float, default=200.0,
+                        help="Temps de réflexion moyen entre deux opérations (0 : charge maximale)")
+    parser.add_argument("--no-cache", action="store_true", help="Désactive le cache de lecture")
+    parser.add_argument("--json", action="store_true", help="Sortie JSON brute")
+    args = parser.parse_args()
+
+    report = run(args.users, args.duration, parse_mix(args.mix), args.think_ms, not args.no_cache)
+    if args.json:
+        print(json.dumps(report, indent=2))
+        return
+
+    print(f"{report['users']} utilisateurs, {report['duration_s']} s, "
+          f"{report['total_per_s']} opérations/s au total")
+    print(f"{'opération':<10} {'nb':>8} {'/s':>8} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8}  erreurs")
+    for name, stats in report['operations'].items():
+        print(f"{name:<10} {stats['count']:>8} {stats['per_s']:>8} {stats['p50_ms']:>8} "
+              f"{stats['p95_ms']:>8} {stats['p99_ms']:>8}  {stats['errors'] or ''}")
+    pool = report['pool']
+    print(f"Pool: {pool['size']}/{pool['max_size']} connexions, attente p99 {pool['wait_ms_p99']:.1f} ms, "
+          f"{pool['exhausted']} saturations, {pool['timeouts']} délais dépassés")
+
+
+if __name__ == "__main__":
+    main()
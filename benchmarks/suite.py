@@ -0,0 +1,364 @@
+# benchmarks/suite.py
+"""
+Suite de mesures reproductible : méthodes de BankDatabase utilisées par
+main.py, generate_receipt_pdf, et rendu sans navigateur de chaque page
+Streamlit (streamlit.testing).
+
+Chaque jeu de données vit dans son propre schéma (<MYSQL_DATABASE>_bench_<nom>),
+généré une fois avec une graine fixe par data_generator puis réutilisé.
+Les résultats sont écrits en JSON et comparés à une référence enregistrée :
+le code de sortie vaut 1 si une mesure régresse au-delà de la tolérance.
+
+    python -m benchmarks.suite --dataset 10k
+    python -m benchmarks.suite --dataset 1m --save-baseline
+"""
+import argparse
+import json
+import os
+import platform
+import statistics
+import sys
+import tempfile
+import time
+from datetime import date, datetime
+from typing import Any, Callable, Dict, List, Optional
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+BASELINE_DIR = os.path.join(ROOT, "benchmarks", "baselines")
+
+DATASETS = {
+    '10k': {'clients': 1_000, 'transactions': 10_000},
+    '1m': {'clients': 50_000, 'transactions': 1_000_000},
+    '10m': {'clients': 500_000, 'transactions': 10_000_000},
+}
+DATASET_SEED = 20240101
+
+DATASET_END = date(2024, 12, 31)
+
+# Pages du menu de main.py (MENU_PAGES), choisies dans le widget du menu (clé "menu").
+# main.py n'est pas importable hors de Streamlit : la liste est recopiée ici.
+PAGES = ["Tableau de Bord", "Gestion Clients", "Gestion IBAN", "Transactions", "Générer Reçu"]
+
+# Une mesure régresse si sa médiane dépasse la référence de plus de TOLERANCE
+# et d'au moins NOISE_FLOOR_MS (en dessous, l'écart est du bruit)
+TOLERANCE = 0.20
+NOISE_FLOOR_MS = 2.0
+
+
+def _use_schema(name: str, reseed: bool) -> str:
+    """Crée au besoin le schéma du jeu de données et y dirige les connexions du processus"""
+    from mysql_config import MySQLDatabase
+
+    base = os.getenv("MYSQL_DATABASE")
+    schema = f"{base}_bench_{name}"
+    params = DATASETS[name]
+    db = MySQLDatabase()
+    try:
+        with db.connection() as conn:
+            cursor = conn.cursor()
+            if reseed:
+                cursor.execute(f"DROP DATABASE IF EXISTS `{schema}`")
+            cursor.execute(f"CREATE DATABASE IF NOT EXISTS `{schema}`")
+            cursor.execute(f'''
+                CREATE TABLE IF NOT EXISTS `{schema}`.bench_dataset (
+                    name VARCHAR(20) PRIMARY KEY, clients INT NOT NULL,
+                    transactions BIGINT NOT NULL, seed INT NOT NULL,
+                    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+                )
+            ''')
+            cursor.execute(f"SELECT clients, transactions, seed FROM `{schema}`.bench_dataset WHERE name = %s",
+                           (name,))
+            ready = cursor.fetchone() == (params['clients'], params['transactions'], DATASET_SEED)
+            cursor.close()
+    finally:
+        db.close()
+
+    os.environ['MYSQL_DATABASE'] = schema
+    if not ready:
+        _seed(name, schema)
+    return schema
+
+
+def _seed(name: str, schema: str):
+    from data_generator import generate
+    from mysql_config import MySQLDatabase
+
+    params = DATASETS[name]
+    print(f"Génération du jeu {name} dans {schema} "
+          f"({params['clients']:,} clients, {params['transactions']:,} transactions)...", flush=True)
+    generate(params['clients'], params['transactions'], end=DATASET_END, seed=DATASET_SEED)
+    db = MySQLDatabase()
+    try:
+        with db.connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute("ANALYZE TABLE clients, ibans, transactions, daily_stats")
+            cursor.fetchall()
+            cursor.execute('''
+                REPLACE INTO bench_dataset (name, clients, transactions, seed) VALUES (%s, %s, %s, %s)
+            ''', (name, params['clients'], params['transactions'], DATASET_SEED))
+            conn.commit()
+            cursor.close()
+    finally:
+        db.close()
+
+
+def measure(fn: Callable[[], Any], repeat: int, warmup: int = 1) -> Dict[str, float]:
+    """Médiane, minimum et p95 (ms) de `repeat` appels après `warmup` appels d'échauffement"""
+    for _ in range(warmup):
+        fn()
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - start) * 1000)
+    samples.sort()
+    return {
+        'median_ms': round(statistics.median(samples), 3),
+        'min_ms': round(samples[0], 3),
+        'p95_ms': round(samples[min(len(samples) - 1, int(len(samples) * 0.95))], 3),
+        'runs': repeat,
+    }
+
+
+def _samples(db) -> Dict[str, Any]:
+    """Identifiants et valeurs représentatifs du milieu des tables"""
+    with db.connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute("SELECT id, client_id FROM ibans WHERE id >= (SELECT (MIN(id) + MAX(id)) DIV 2 FROM ibans) "
+                       "ORDER BY id LIMIT 1")
+        iban_id, client_id = cursor.fetchone()
+        cursor.execute("SELECT last_name FROM clients WHERE id = %s", (client_id,))
+        last_name = cursor.fetchone()[0]
+        cursor.execute("SELECT id FROM transactions WHERE iban_id = %s ORDER BY id LIMIT 1", (iban_id,))
+        row = cursor.fetchone()
+        cursor.execute("SELECT date, id FROM transactions ORDER BY date DESC, id DESC LIMIT 1 OFFSET 5000")
+        deep_key = cursor.fetchone()
+        cursor.close()
+    return {'iban_id': iban_id, 'client_id': client_id, 'last_name': last_name,
+            'transaction_id': row[0] if row else None, 'deep_key': tuple(deep_key) if deep_key else None}
+
+
+def bench_database(repeat: int) -> Dict[str, Dict[str, float]]:
+    """Méthodes de lecture et d'écriture appelées par les pages, cache de lecture neutralisé"""
+    from cache import VersionedCache
+    from client_index import ClientIndex
+    from database import BankDatabase
+    from mysql_config import MySQLDatabase
+
+    db = MySQLDatabase()
+    bank = BankDatabase(db)
+    bank.cache = VersionedCache(max_entries=0, ttl=0)
+    s = _samples(db)
+    month = {'date_from': date(DATASET_END.year, DATASET_END.month, 1), 'date_to': DATASET_END}
+    cases = {
+        'get_dashboard_stats': bank.get_dashboard_stats,
+        'search_clients': lambda: bank.search_clients(),
+        'search_clients.query': lambda: bank.search_clients(s['last_name']),
+        'search_clients_frame': lambda: bank.search_clients_frame(),
+        'get_client_by_id': lambda: bank.get_client_by_id(s['client_id']),
+        'client_index.load': lambda: ClientIndex().load(bank.get_all_clients()),
+        'search_ibans': lambda: bank.search_ibans(),
+        'search_ibans.query': lambda: bank.search_ibans(s['last_name']),
+        'search_ibans_frame': lambda: bank.search_ibans_frame(),
+        'get_ibans_by_client': lambda: bank.get_ibans_by_client(s['client_id']),
+        'get_iban_by_id': lambda: bank.get_iban_by_id(s['iban_id']),
+        'get_recent_transactions': bank.get_recent_transactions,
+        'get_transactions_page': lambda: bank.get_transactions_page(),
+        'get_transactions_page.frame': lambda: bank.get_transactions_page(frame=True),
+        'get_transactions_page.deep': lambda: bank.get_transactions_page(after=s['deep_key']),
+        'get_transactions_page.month': lambda: bank.get_transactions_page(**month),
+        'get_transactions_page.client': lambda: bank.get_transactions_page(client_id=s['client_id']),
+        'get_transactions_page.search': lambda: bank.get_transactions_page(search=s['last_name']),
+        'estimate_transactions_count': lambda: bank.estimate_transactions_count(**month),
+        'get_transaction_by_id': lambda: bank.get_transaction_by_id(s['transaction_id']),
+        # Écritures appariées : le solde de l'IBAN témoin ne bouge pas
+        'deposit': lambda: bank.deposit(s['iban_id'], 1, "benchmark"),
+        'withdraw': lambda: bank.withdraw(s['iban_id'], 1, "benchmark"),
+    }
+    results = {}
+    try:
+        for name, fn in cases.items():
+            results[f"db.{name}"] = measure(fn, repeat)
+    finally:
+        db.close()
+    return results
+
+
+def bench_receipt(repeat: int) -> Dict[str, Dict[str, float]]:
+    """generate_receipt_pdf et rendu en mémoire (ReceiptRenderer) sur une transaction réelle, avec et sans logo"""
+    from database import BankDatabase
+    from mysql_config import MySQLDatabase
+    from receipt_generator import generate_receipt_pdf, get_receipt_renderer
+
+    db = MySQLDatabase()
+    try:
+        bank = BankDatabase(db)
+        s = _samples(db)
+        transaction = bank.get_transaction_by_id(s['transaction_id'])
+        client = bank.get_client_by_id(transaction['client_id'])
+        iban = bank.get_iban_by_id(transaction['iban_id'])
+    finally:
+        db.close()
+
+    logo = os.path.join(ROOT, "assets", "logo.png")
+    cwd = os.getcwd()
+    results = {}
+    with tempfile.TemporaryDirectory() as directory:
+        # generate_receipt_pdf écrit dans le cache ./receipts : on l'isole dans un répertoire temporaire.
+        # Après le premier appel, la mesure est celle d'un reçu servi par le cache
+        os.chdir(directory)
+        try:
+            for name, logo_path in (('generate_receipt_pdf', None), ('generate_receipt_pdf.logo', logo)):
+                results[f"receipt.{name}"] = measure(
+                    lambda: generate_receipt_pdf(transaction, client, iban, "Banque Virtuelle",
+                                                 logo_path=logo_path, additional_notes="Merci."),
+                    repeat
+                )
+                results[f"receipt.{name.replace('generate_receipt_pdf', 'render')}"] = measure(
+                    lambda: get_receipt_renderer().render(transaction, client, iban, "Banque Virtuelle",
+                                                          logo=logo_path, additional_notes="Merci."),
+                    repeat
+                )
+        finally:
+            os.chdir(cwd)
+    return results
+
+
+def bench_pages(repeat: int, timeout: float) -> Dict[str, Dict[str, float]]:
+    """
+    Exécution complète de main.py pour chaque page du menu, via
+    streamlit.testing : une session par page, ouverte puis amenée sur la page
+    par le menu de la barre latérale comme le ferait un utilisateur ; chaque
+    mesure est une réexécution de la page dans cette session.
+    """
+    try:
+        from streamlit.testing.v1 import AppTest
+    except ImportError:
+        print("streamlit.testing indisponible (Streamlit >= 1.28 requis) : pages ignorées", file=sys.stderr)
+        return {}
+
+    cwd = os.getcwd()
+    os.chdir(ROOT)  # main.py lit assets/ en chemin relatif
+    results = {}
+    try:
+        for page in PAGES:
+            app = AppTest.from_file("main.py", default_timeout=timeout)
+            app.session_state['authenticated'] = True
+            app.session_state['user'] = {'username': 'benchmark'}
+            app.run()
+            app.sidebar.radio(key="menu").set_value(page).run()
+
+            def render():
+                app.run()
+                if app.exception:
+                    raise RuntimeError(f"Page « {page} »: {app.exception[0].value}")
+            results[f"page.{page}"] = measure(render, repeat)
+    finally:
+        os.chdir(cwd)
+    return results
+
+
+def compare(results: Dict[str, Dict[str, float]], baseline: Dict[str, Dict[str, float]],
+            tolerance: float = TOLERANCE) -> List[Dict[str, Any]]:
+    """Écarts à la référence, une ligne par mesure présente des deux côtés"""
+    rows = []
+    for name, current in results.items():
+        reference = baseline.get(name)
+        if reference is None:
+            continue
+        ratio = current['median_ms'] / reference['median_ms'] if reference['median_ms'] else 1.0
+        delta = current['median_ms'] - reference['median_ms']
+        rows.append({
+            'name': name,
+            'baseline_ms': reference['median_ms'],
+            'current_ms': current['median_ms'],
+            'ratio': round(ratio, 3),
+            'regression': ratio > 1 + tolerance and delta > NOISE_FLOOR_MS,
+        })
+    return rows
+
+
+def _environment() -> Dict[str, Any]:
+    from mysql_config import MySQLDatabase
+
+    db = MySQLDatabase()
+    try:
+        with db.connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute("SELECT VERSION()")
+            version = cursor.fetchone()[0]
+            cursor.close()
+    finally:
+        db.close()
+    return {'python': platform.python_version(), 'platform': platform.platform(),
+            'mysql': version, 'host': os.getenv("MYSQL_HOST")}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Mesures reproductibles des accès aux données et des pages")
+    parser.add_argument("--dataset", choices=DATASETS, default='10k')
+    parser.add_argument("--repeat", type=int, default=7, help="Mesures par cas (après un échauffement)")
+    parser.add_argument("--only", choices=('db', 'receipt', 'page'), action='append',
+                        help="Limite la suite à une famille de mesures (répétable)")
+    parser.add_argument("--page-timeout", type=float, default=60.0)
+    parser.add_argument("--reseed", action="store_true", help="Régénère le jeu de données")
+    parser.add_argument("--output", help="Fichier JSON des résultats (par défaut benchmark_<jeu>.json)")
+    parser.add_argument("--baseline", help="Référence à comparer (par défaut benchmarks/baselines/<jeu>.json)")
+    parser.add_argument("--save-baseline", action="store_true", help="Enregistre les résultats comme référence")
+    parser.add_argument("--tolerance", type=float, default=TOLERANCE)
+    args = parser.parse_args()
+
+    families = set(args.only or ('db', 'receipt', 'page'))
+    schema = _use_schema(args.dataset, args.reseed)
+    results: Dict[str, Dict[str, float]] = {}
+    if 'db' in families:
+        results.update(bench_database(args.repeat))
+    if 'receipt' in families:
+        results.update(bench_receipt(args.repeat))
+    if 'page' in families:
+        results.update(bench_pages(max(1, args.repeat // 2), args.page_timeout))
+
+    report = {
+        'dataset': args.dataset,
+        'schema': schema,
+        'size': DATASETS[args.dataset],
+        'created_at': datetime.now().isoformat(timespec='seconds'),
+        'environment': _environment(),
+        'results': results,
+    }
+    output = args.output or f"benchmark_{args.dataset}.json"
+    with open(output, 'w', encoding='utf-8') as f:
+        json.dump(report, f, indent=2, ensure_ascii=False)
+    print(f"Résultats écrits dans {output}")
+
+    baseline_path = args.baseline or os.path.join(BASELINE_DIR, f"{args.dataset}.json")
+    if args.save_baseline:
+        os.makedirs(os.path.dirname(baseline_path), exist_ok=True)
+        with open(baseline_path, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2, ensure_ascii=False)
+        print(f"Référence enregistrée dans {baseline_path}")
+        return
+
+    baseline: Optional[Dict[str, Any]] = None
+    if os.path.exists(baseline_path):
+        with open(baseline_path, encoding='utf-8') as f:
+            baseline = json.load(f)
+    if baseline is None:
+        for name, stats in results.items():
+            print(f"{name:<45} {stats['median_ms']:>10.2f} ms")
+        print(f"Pas de référence {baseline_path} : lancez avec --save-baseline pour en créer une")
+        return
+
+    rows = compare(results, baseline['results'], args.tolerance)
+    print(f"{'mesure':<45} {'référence':>10} {'actuel':>10} {'ratio':>7}")
+    for row in rows:
+        flag = "  RÉGRESSION" if row['regression'] else ""
+        print(f"{row['name']:<45} {row['baseline_ms']:>10.2f} {row['current_ms']:>10.2f} {row['ratio']:>7.2f}{flag}")
+    regressions = [row for row in rows if row['regression']]
+    if regressions:
+        print(f"{len(regressions)} régression(s) au-delà de {args.tolerance:.0%}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,109 @@
+# cache.py
+import functools
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Taille et durée de vie par défaut du cache de lecture
+CACHE_MAX_ENTRIES = int(os.getenv("READ_CACHE_SIZE", "1024"))
+CACHE_TTL = float(os.getenv("READ_CACHE_TTL", "60"))
+
+
+class VersionedCache:
+    """
+    Cache LRU borné en taille, avec durée de vie et numéros de version par table.
+
+    Chaque entrée retient la version des tables dont elle dépend au moment de
+    la lecture. Une écriture incrémente la version de ses tables : les entrées
+    qui en dépendent deviennent périmées et sont relues au prochain accès.
+    La durée de vie borne la péremption des écritures faites par d'autres
+    processus, que les versions locales ne voient pas.
+    """
+
+    def __init__(self, max_entries: int = CACHE_MAX_ENTRIES, ttl: float = CACHE_TTL):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._entries: 'OrderedDict[Hashable, Tuple[Any, float, Tuple[int, ...]]]' = OrderedDict()
+        self._versions: Dict[str, int] = {}
+        self._counters = {'hits': 0, 'misses': 0, 'stale': 0, 'expired': 0, 'evictions': 0}
+
+    def _snapshot(self, tables: Tuple[str, ...]) -> Tuple[int, ...]:
+        return tuple(self._versions.get(table, 0) for table in tables)
+
+    def get_or_load(self, key: Hashable, tables: Tuple[str, ...], loader: Callable[[], Any]) -> Any:
+        """Renvoie la valeur en cache si elle est à jour, sinon la relit avec `loader`"""
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                value, expires_at, versions = entry
+                if versions != self._snapshot(tables):
+                    self._counters['stale'] += 1
+                    del self._entries[key]
+                elif expires_at <= now:
+                    self._counters['expired'] += 1
+                    del self._entries[key]
+                else:
+                    self._counters['hits'] += 1
+                    self._entries.move_to_end(key)
+                    return value
+            self._counters['misses'] += 1
+            # Versions relevées avant la lecture : une écriture concurrente la rendra périmée
+            versions = self._snapshot(tables)
+
+        value = loader()
+
+        with self._lock:
+            self._entries[key] = (value, time.monotonic() + self.ttl, versions)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self._counters['evictions'] += 1
+        return value
+
+    def bump(self, *tables: str):
+        """Invalide les lectures qui dépendent de `tables` (à appeler après le commit)"""
+        with self._lock:
+            for table in tables:
+                self._versions[table] = self._versions.get(table, 0) + 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self._counters['hits'] + self._counters['misses']
+            return {
+                'entries': len(self._entries),
+                'max_entries': self.max_entries,
+                'ttl': self.ttl,
+                **self._counters,
+                'hit_ratio': self._counters['hits'] / lookups if lookups else 0.0,
+                'versions': dict(self._versions),
+            }
+
+
+def cached_read(*tables: str):
+    """
+    Met en cache le résultat d'une méthode de lecture dans `self.cache`, selon
+    ses arguments et la version des `tables` lues. Les valeurs renvoyées sont
+    partagées entre sessions et ne doivent pas être modifiées par l'appelant.
+    """
+    def decorator(method):
+        @functools.wraps(method)
+        def wrapper(self, *args, **kwargs):
+            key = (method.__name__, args, tuple(sorted(kwargs.items())))
+            try:
+                hash(key)
+            except TypeError:
+                return method(self, *args, **kwargs)
+            return self.cache.get_or_load(key, tables, lambda: method(self, *args, **kwargs))
+        return wrapper
+    return decorator
@@ -0,0 +1,260 @@
+# client_import.py
+"""
+Import de masse des clients et de leurs comptes (tableurs CSV ou XLSX).
+
+Une ligne décrit un client et, facultativement, un compte : colonnes
+first_name, last_name, email, phone, type, status, iban, currency,
+account_type, balance. Plusieurs lignes avec le même email rattachent
+plusieurs comptes au même client.
+
+Le fichier est lu en flux et enregistré par lots (BankDatabase.import_onboarding),
+une transaction par lot. Après chaque lot validé, le numéro de la dernière
+ligne traitée est écrit dans un fichier de reprise : relancé après un
+incident, l'import reprend au lot suivant. Un lot rejoué (incident entre le
+commit et l'écriture de la reprise) ne crée pas de doublons, les emails et
+IBAN existants étant reconnus.
+
+    python client_import.py clients.csv --rejects rejets_clients.csv
+"""
+import argparse
+import csv
+import json
+import logging
+import os
+import re
+import time
+from decimal import Decimal, InvalidOperation
+from itertools import islice
+from typing import Any, Dict, Iterable, Iterator, Optional, TextIO
+
+from database import BankDatabase
+from ibans import normalize_iban
+from money import to_cents
+from transaction_import import RawRow, read_csv
+
+logger = logging.getLogger(__name__)
+
+# Lignes par transaction ; assez pour amortir les allers-retours, assez peu pour des verrous courts
+DEFAULT_CHUNK_SIZE = 5000
+
+CLIENT_TYPES = ("Particulier", "Entreprise", "VIP")
+CLIENT_STATUSES = ("Actif", "Inactif")
+CURRENCIES = ("EUR", "USD", "GBP")
+ACCOUNT_TYPES = ("Courant", "Épargne", "Entreprise")
+
+_EMAIL = re.compile(r'[^@\s]+@[^@\s]+\.[^@\s]+')
+_IBAN = re.compile(r'[A-Z]{2}\d{2}[A-Z0-9]{11,30}')
+
+_COLUMNS = ('first_name', 'last_name', 'email', 'phone', 'type', 'status',
+            'iban', 'currency', 'account_type', 'balance')
+
+
+def read_xlsx(path: str) -> Iterator[RawRow]:
+    """Lignes de la première feuille d'un classeur, lue en mode flux"""
+    try:
+        from openpyxl import load_workbook
+    except ImportError:
+        raise RuntimeError("La lecture des fichiers .xlsx nécessite openpyxl (pip install openpyxl)")
+    workbook = load_workbook(path, read_only=True, data_only=True)
+    try:
+        rows = workbook.active.iter_rows(values_only=True)
+        columns = [str(cell or '').strip().lower() for cell in next(rows, ())]
+        for line, row in enumerate(rows, start=2):
+            if any(cell not in (None, '') for cell in row):
+                yield line, {column: '' if cell is None else str(cell) for column, cell in zip(columns, row)}
+    finally:
+        workbook.close()
+
+
+def _choice(value: str, choices: tuple, default: str, label: str) -> str:
+    value = (value or '').strip()
+    if not value:
+        return default
+    for choice in choices:
+        if choice.lower() == value.lower():
+            return choice
+    raise ValueError(f"{label} invalide: {value!r}")
+
+
+def validate(fields: Dict[str, str]) -> Dict[str, Any]:
+    """Convertit une ligne brute en enregistrement ; lève ValueError avec le motif du refus"""
+    first_name = (fields.get('first_name') or '').strip()
+    last_name = (fields.get('last_name') or '').strip()
+    if not first_name or not last_name:
+        raise ValueError("Prénom et nom obligatoires")
+    if len(first_name) > 255 or len(last_name) > 255:
+        raise ValueError("Prénom ou nom trop long")
+    email = (fields.get('email') or '').strip().lower()
+    if not _EMAIL.fullmatch(email) or len(email) > 255:
+        raise ValueError(f"Email invalide: {fields.get('email')!r}")
+    phone = (fields.get('phone') or '').strip()
+    if len(phone) > 50:
+        raise ValueError("Téléphone trop long")
+
+    record = {
+        'first_name': first_name,
+        'last_name': last_name,
+        'email': email,
+        'phone': phone,
+        'type': _choice(fields.get('type'), CLIENT_TYPES, CLIENT_TYPES[0], "Type de client"),
+        'status': _choice(fields.get('status'), CLIENT_STATUSES, CLIENT_STATUSES[0], "Statut"),
+        'iban': None,
+    }
+
+    iban = ' '.join((fields.get('iban') or '').split()).upper()
+    if not iban:
+        return record
+    iban_key = normalize_iban(iban)
+    if not _IBAN.fullmatch(iban_key) or len(iban) > 34:
+        raise ValueError(f"IBAN invalide: {fields.get('iban')!r}")
+    try:
+        balance = Decimal((fields.get('balance') or '0').replace(' ', '').replace(',', '.'))
+    except InvalidOperation:
+        raise ValueError(f"Solde invalide: {fields.get('balance')!r}")
+    if balance < 0 or balance != balance.quantize(Decimal("0.01")):
+        raise ValueError(f"Solde invalide: {fields.get('balance')!r}")
+    record.update(
+        iban=iban,
+        iban_key=iban_key,
+        currency=_choice(fields.get('currency'), CURRENCIES, CURRENCIES[0], "Devise"),
+        account_type=_choice(fields.get('account_type'), ACCOUNT_TYPES, ACCOUNT_TYPES[0], "Type de compte"),
+        balance_cents=to_cents(balance),
+    )
+    return record
+
+
+class Checkpoint:
+    """Dernière ligne enregistrée d'un fichier, pour reprendre un import interrompu"""
+
+    def __init__(self, source: str, path: Optional[str] = None):
+        self.source = source
+        self.path = path or f"{source}.checkpoint"
+        self._fingerprint = os.path.getsize(source)
+
+    def load(self) -> Dict[str, Any]:
+        """Point de reprise du même fichier (même taille), ou un état vierge"""
+        try:
+            with open(self.path, encoding='utf-8') as f:
+                state = json.load(f)
+        except (FileNotFoundError, ValueError):
+            return {'line': 0, 'counters': {}}
+        if state.get('size') != self._fingerprint:
+            logger.warning(f"Point de reprise {self.path} ignoré: le fichier source a changé")
+            return {'line': 0, 'counters': {}}
+        return state
+
+    def save(self, line: int, counters: Dict[str, int]):
+        temporary = f"{self.path}.tmp"
+        with open(temporary, 'w', encoding='utf-8') as f:
+            json.dump({'size': self._fingerprint, 'line': line, 'counters': counters}, f)
+        os.replace(temporary, self.path)
+
+    def clear(self):
+        if os.path.exists(self.path):
+            os.remove(self.path)
+
+
+class OnboardingImporter:
+    """Enchaîne lecture, validation et enregistrement par lots, et tient les compteurs de l'import"""
+
+    def __init__(self, bank: BankDatabase, chunk_size: int = DEFAULT_CHUNK_SIZE,
+                 rejects: Optional[TextIO] = None, checkpoint: Optional[Checkpoint] = None):
+        self.bank = bank
+        self.chunk_size = chunk_size
+        self.checkpoint = checkpoint
+        self._rejects = csv.writer(rejects, delimiter=';') if rejects is not None else None
+        # En reprise, le fichier de rejets est complété et garde son en-tête
+        if self._rejects is not None and rejects.tell() == 0:
+            self._rejects.writerow(['ligne', 'motif', *_COLUMNS])
+        self.counters = {'read': 0, 'rejected': 0, 'clients_created': 0, 'clients_existing': 0,
+                         'ibans_created': 0, 'ibans_existing': 0}
+
+    def _reject(self, line: int, fields: Dict[str, Any], reason: str):
+        self.counters['rejected'] += 1
+        if self._rejects is not None:
+            self._rejects.writerow([line, reason, *(fields.get(column) or '' for column in _COLUMNS)])
+
+    def run(self, rows: Iterable[RawRow]) -> Dict[str, Any]:
+        """Importe toutes les lignes (à partir du point de reprise) et renvoie le bilan"""
+        resume_after = 0
+        if self.checkpoint is not None:
+            state = self.checkpoint.load()
+            resume_after = state['line']
+            self.counters.update(state['counters'])
+            if resume_after:
+                logger.info(f"Reprise de l'import après la ligne {resume_after}")
+
+        start = time.perf_counter()
+        processed = 0
+        rows = ((line, fields) for line, fields in rows if line > resume_after)
+        while True:
+            chunk = list(islice(rows, self.chunk_size))
+            if not chunk:
+                break
+            records = []
+            for line, fields in chunk:
+                try:
+                    record = validate(fields)
+                except ValueError as e:
+                    self._reject(line, fields, str(e))
+                    continue
+                record['line'] = line
+                records.append(record)
+
+            result = self.bank.import_onboarding(records)
+            for record, reason in result.pop('rejected'):
+                self._reject(record['line'], record, reason)
+            for key, value in result.items():
+                self.counters[key] += value
+            self.counters['read'] += len(chunk)
+            processed += len(chunk)
+            if self.checkpoint is not None:
+                self.checkpoint.save(chunk[-1][0], self.counters)
+            logger.info(f"Import clients: {self.counters['read']} lignes, "
+                        f"{self.counters['clients_created']} clients et "
+                        f"{self.counters['ibans_created']} comptes créés")
+
+        if self.checkpoint is not None:
+            self.checkpoint.clear()
+        elapsed = time.perf_counter() - start
+        return {
+            **self.counters,
+            'seconds': round(elapsed, 2),
+            'rows_per_s': round(processed / elapsed, 1) if elapsed else 0.0,
+        }
+
+
+def import_clients(bank: BankDatabase, path: str, chunk_size: int = DEFAULT_CHUNK_SIZE,
+                   rejects: Optional[TextIO] = None, resume: bool = True,
+                   encoding: str = 'utf-8-sig') -> Dict[str, Any]:
+    """Importe un fichier CSV ou XLSX ; `resume` reprend après le dernier lot validé"""
+    checkpoint = Checkpoint(path)
+    if not resume:
+        checkpoint.clear()
+    importer = OnboardingImporter(bank, chunk_size, rejects, checkpoint)
+    if path.lower().endswith('.xlsx'):
+        return importer.run(read_xlsx(path))
+    with open(path, encoding=encoding, newline='') as stream:
+        return importer.run(read_csv(stream))
+
+
+if __name__ == "__main__":
+    from mysql_config import MySQLDatabase
+
+    parser = argparse.ArgumentParser(description="Importe des clients et leurs comptes par lots")
+    parser.add_argument("path", help="Fichier CSV ou XLSX")
+    parser.add_argument("--chunk-size", type=int, default=DEFAULT_CHUNK_SIZE)
+    parser.add_argument("--rejects", default="rejets_clients.csv", help="Fichier des lignes refusées")
+    parser.add_argument("--restart", action="store_true", help="Ignore le point de reprise et repart du début")
+    args = parser.parse_args()
+
+    db = MySQLDatabase()
+    try:
+        with open(args.rejects, 'a' if not args.restart else 'w', encoding='utf-8', newline='') as rejects:
+            report = import_clients(BankDatabase(db), args.path, args.chunk_size, rejects,
+                                    resume=not args.restart)
+        print(f"{report['clients_created']} clients et {report['ibans_created']} comptes créés, "
+              f"{report['clients_existing']} clients déjà connus, {report['rejected']} lignes rejetées "
+              f"sur {report['read']} en {report['seconds']} s ({report['rows_per_s']} lignes/s)")
+    finally:
+        db.close()
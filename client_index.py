@@ -0,0 +1,185 @@
+# client_index.py
+import bisect
+import logging
+import threading
+import time
+import unicodedata
+from itertools import islice
+from typing import Optional, Dict, Any, List, Set, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Nombre de clients proposés par défaut dans les listes de sélection
+DEFAULT_LIMIT = 20
+
+# Au-delà de cet âge (secondes), l'index est rechargé depuis la base pour
+# récupérer les écritures faites par d'autres processus
+MAX_AGE = 600
+
+
+def _normalize(text: Any) -> str:
+    """Minuscules sans accents, pour que « Hélène » soit trouvée par « helene »"""
+    decomposed = unicodedata.normalize('NFKD', str(text or '').lower())
+    return ''.join(ch for ch in decomposed if not unicodedata.combining(ch))
+
+
+def _trigrams(text: str) -> Set[str]:
+    return {text[i:i + 3] for i in range(len(text) - 2)}
+
+
+class ClientIndex:
+    """
+    Index en mémoire des clients pour la recherche à la saisie.
+
+    Les préfixes sont servis par une liste triée de (jeton, id) parcourue par
+    dichotomie ; les trigrammes du nom complet servent de repli pour les
+    recherches de sous-chaînes (« pont » trouve « Dupont »).
+    """
+
+    def __init__(self, max_age: float = MAX_AGE):
+        self.max_age = max_age
+        self._lock = threading.RLock()
+        self._clients: Dict[int, Dict[str, Any]] = {}
+        self._client_tokens: Dict[int, List[str]] = {}
+        self._tokens: List[Tuple[str, int]] = []
+        self._trigram_ids: Dict[str, Set[int]] = {}
+        self._loaded_at: Optional[float] = None
+
+    def __len__(self) -> int:
+        return len(self._clients)
+
+    @property
+    def is_loaded(self) -> bool:
+        return self._loaded_at is not None
+
+    def ensure_loaded(self, db):
+        """Charge l'index au premier appel puis le recharge quand il est trop ancien"""
+        if self._loaded_at is not None and time.monotonic() - self._loaded_at < self.max_age:
+            return
+        with self._lock:
+            if self._loaded_at is None or time.monotonic() - self._loaded_at >= self.max_age:
+                self.load(db.get_all_clients())
+
+    def load(self, clients: List[Dict[str, Any]]):
+        """Reconstruit entièrement l'index"""
+        start = time.perf_counter()
+        with self._lock:
+            self._clients.clear()
+            self._client_tokens.clear()
+            self._trigram_ids.clear()
+            tokens = []
+            for client in clients:
+                tokens.extend((token, client['id']) for token in self._add(client))
+            tokens.sort()
+            self._tokens = tokens
+            self._loaded_at = time.monotonic()
+        logger.info(f"Index clients chargé: {len(self._clients)} clients en "
+                    f"{(time.perf_counter() - start) * 1000:.0f} ms")
+
+    def _add(self, client: Dict[str, Any]) -> List[str]:
+        client_id = client['id']
+        record = {key: client.get(key) for key in ('id', 'first_name', 'last_name', 'email')}
+        name = _normalize(f"{record['first_name']} {record['last_name']}")
+        email = _normalize(record['email'])
+        tokens = set(name.split()) | {str(client_id)}
+        if email:
+            tokens |= {email, email.split('@')[0]}
+
+        self._clients[client_id] = record
+        self._client_tokens[client_id] = sorted(tokens)
+        for trigram in _trigrams(name):
+            self._trigram_ids.setdefault(trigram, set()).add(client_id)
+        return self._client_tokens[client_id]
+
+    def _remove(self, client_id: int):
+        record = self._clients.pop(client_id, None)
+        if record is None:
+            return
+        for token in self._client_tokens.pop(client_id):
+            position = bisect.bisect_left(self._tokens, (token, client_id))
+            if position < len(self._tokens) and self._tokens[position] == (token, client_id):
+                del self._tokens[position]
+        for trigram in _trigrams(_normalize(f"{record['first_name']} {record['last_name']}")):
+            ids = self._trigram_ids.get(trigram)
+            if ids is not None:
+                ids.discard(client_id)
+                if not ids:
+                    del self._trigram_ids[trigram]
+
+    def upsert(self, client: Dict[str, Any]):
+        """Ajoute ou met à jour un client ; sans effet tant que l'index n'est pas chargé"""
+        if self._loaded_at is None:
+            return
+        with self._lock:
+            self._remove(client['id'])
+            for token in self._add(client):
+                bisect.insort(self._tokens, (token, client['id']))
+
+    def invalidate(self):
+        """Force un rechargement complet au prochain accès (après un import de masse)"""
+        with self._lock:
+            self._loaded_at = None
+
+    def remove(self, client_id: int):
+        with self._lock:
+            self._remove(client_id)
+
+    def _matches_all(self, client_id: int, words: List[str]) -> bool:
+        tokens = self._client_tokens[client_id]
+        return all(any(token.startswith(word) for token in tokens) for word in words)
+
+    def search(self, query: str, limit: int = DEFAULT_LIMIT) -> List[Dict[str, Any]]:
+        """
+        Renvoie au plus `limit` clients dont chaque mot de la recherche
+        préfixe le prénom, le nom, l'email ou l'identifiant.
+        """
+        words = _normalize(query).split()
+        with self._lock:
+            if not words:
+                return list(islice(self._clients.values(), limit))
+
+            found: Dict[int, None] = {}
+            # Identifiant exact en tête de liste
+            if len(words) == 1 and words[0].isdigit() and int(words[0]) in self._clients:
+                found[int(words[0])] = None
+
+            # Le mot le plus long est le plus sélectif : on parcourt ses préfixes
+            index = max(range(len(words)), key=lambda i: len(words[i]))
+            pivot, others = words[index], words[:index] + words[index + 1:]
+            position = bisect.bisect_left(self._tokens, (pivot, -1))
+            while len(found) < limit and position < len(self._tokens):
+                token, client_id = self._tokens[position]
+                if not token.startswith(pivot):
+                    break
+                if client_id not in found and self._matches_all(client_id, others):
+                    found[client_id] = None
+                position += 1
+
+            # Repli sur les sous-chaînes du nom complet
+            text = ' '.join(words)
+            if len(found) < limit and len(text) >= 3:
+                smallest, *rest = sorted(
+                    (self._trigram_ids.get(trigram, set()) for trigram in _trigrams(text)),
+                    key=len
+                )
+                # Parcours paresseux du plus petit ensemble : on s'arrête dès `limit` résultats
+                for client_id in smallest:
+                    if len(found) >= limit:
+                        break
+                    if client_id in found or not all(client_id in ids for ids in rest):
+                        continue
+                    record = self._clients[client_id]
+                    if text in _normalize(f"{record['first_name']} {record['last_name']}"):
+                        found[client_id] = None
+
+            return [self._clients[client_id] for client_id in found]
+
+
+# Index partagé par toutes les sessions du processus
+CLIENT_INDEX = ClientIndex()
+
+
+def get_client_index(db) -> ClientIndex:
+    """Renvoie l'index partagé, chargé depuis `db` si nécessaire"""
+    CLIENT_INDEX.ensure_loaded(db)
+    return CLIENT_INDEX
@@ -0,0 +1,333 @@
+# data_generator.py
+"""
+Génération de données fictives réalistes pour les tests de charge.
+
+Remplit clients, ibans et transactions avec des millions de lignes, réparties
+entre plusieurs processus qui insèrent par lots. Les distributions imitent
+l'activité réelle : types de clients et devises déséquilibrés, montants à
+queue lourde (log-normale), activité concentrée sur une minorité de clients,
+saisonnalité hebdomadaire, horaire et de fin de mois (salaires).
+
+Les identifiants sont attribués par le générateur à partir du maximum
+existant : les attributs d'un client (type, nombre de comptes, devises) se
+déduisent de son numéro, ce qui permet aux processus de générer les
+transactions sans relire la base. À lancer sur une base sans autre écriture
+concurrente.
+
+    python data_generator.py --clients 200000 --transactions 5000000 --workers 8
+"""
+import argparse
+import bisect
+import concurrent.futures
+import math
+import os
+import random
+import time
+import unicodedata
+import uuid
+from datetime import date, datetime, timedelta
+from itertools import accumulate
+from typing import Any, Dict, List, Tuple
+
+from faker import Faker
+
+from ibans import generate_iban
+
+
+# ----------------------------------------------------------------------
+# Distributions
+# ----------------------------------------------------------------------
+
+CLIENT_TYPES = [("Particulier", 0.85), ("Entreprise", 0.12), ("VIP", 0.03)]
+CLIENT_STATUSES = [("Actif", 0.92), ("Inactif", 0.08)]
+CURRENCIES = [("EUR", 0.80), ("USD", 0.12), ("GBP", 0.08)]
+IBANS_PER_CLIENT = [(1, 0.65), (2, 0.25), (3, 0.08), (4, 0.02)]
+MAX_IBANS_PER_CLIENT = 4
+ACCOUNT_TYPES = {
+    "Particulier": [("Courant", 0.70), ("Épargne", 0.30)],
+    "Entreprise": [("Entreprise", 0.80), ("Courant", 0.20)],
+    "VIP": [("Courant", 0.50), ("Épargne", 0.50)],
+}
+
+# Montants log-normaux (médiane ≈ 45), multipliés selon le type de client
+AMOUNT_MU, AMOUNT_SIGMA = 3.8, 1.1
+AMOUNT_SCALE = {"Particulier": 1.0, "Entreprise": 12.0, "VIP": 6.0}
+MAX_AMOUNT = 5_000_000.0
+
+# Activité : rang tiré comme clients × u**ACTIVITY_SKEW ; plus l'exposant est grand,
+# plus les transactions se concentrent sur une minorité de clients
+ACTIVITY_SKEW = 1.6
+
+# Saisonnalité : lundi..dimanche, heures de 0 à 23, part des dépôts
+WEEKDAY_WEIGHTS = [1.15, 1.05, 1.0, 1.05, 1.25, 0.8, 0.35]
+HOUR_WEIGHTS = [0.1, 0.05, 0.03, 0.03, 0.05, 0.15, 0.4, 0.9, 1.4, 1.6, 1.7, 1.9,
+                2.2, 1.9, 1.6, 1.6, 1.7, 2.0, 2.1, 1.7, 1.2, 0.8, 0.5, 0.25]
+DEPOSIT_SHARE = 0.42
+MONTH_END_DEPOSIT_SHARE = 0.62
+MONTH_END_DAY = 25
+
+DEPOSIT_LABELS = ["Virement reçu", "Salaire", "Dépôt espèces", "Remboursement", "Virement interne"]
+WITHDRAWAL_LABELS = ["Paiement carte", "Retrait DAB", "Prélèvement", "Virement émis", "Loyer", "Facture"]
+
+DEFAULT_BATCH_SIZE = 5000
+_MASK64 = (1 << 64) - 1
+
+
+def _cumulative(weights: List[Tuple[Any, float]]) -> Tuple[List[Any], List[float]]:
+    values = [value for value, _ in weights]
+    totals = list(accumulate(weight for _, weight in weights))
+    return values, [total / totals[-1] for total in totals]
+
+
+def _pick(distribution: Tuple[List[Any], List[float]], u: float) -> Any:
+    values, cumulative = distribution
+    return values[min(bisect.bisect_right(cumulative, u), len(values) - 1)]
+
+
+def _unit(seed: int, n: int, salt: int) -> float:
+    """Tirage uniforme reproductible sur [0, 1[ pour (graine, numéro, attribut)"""
+    x = (n * 0x9E3779B97F4A7C15 + seed * 0xBF58476D1CE4E5B9 + salt) & _MASK64
+    x = ((x ^ (x >> 30)) * 0xBF58476D1CE4E5B9) & _MASK64
+    x = ((x ^ (x >> 27)) * 0x94D049BB133111EB) & _MASK64
+    return (x ^ (x >> 31)) / 2 ** 64
+
+
+_CLIENT_TYPES = _cumulative(CLIENT_TYPES)
+_CLIENT_STATUSES = _cumulative(CLIENT_STATUSES)
+_CURRENCIES = _cumulative(CURRENCIES)
+_IBANS_PER_CLIENT = _cumulative(IBANS_PER_CLIENT)
+_ACCOUNT_TYPES = {key: _cumulative(value) for key, value in ACCOUNT_TYPES.items()}
+_HOURS = _cumulative(list(enumerate(HOUR_WEIGHTS)))
+
+
+def client_type(seed: int, n: int) -> str:
+    return _pick(_CLIENT_TYPES, _unit(seed, n, 1))
+
+
+def iban_count(seed: int, n: int) -> int:
+    return _pick(_IBANS_PER_CLIENT, _unit(seed, n, 2))
+
+
+def iban_currency(seed: int, n: int, j: int) -> str:
+    return _pick(_CURRENCIES, _unit(seed, n * MAX_IBANS_PER_CLIENT + j, 3))
+
+
+def _ascii(text: str) -> str:
+    decomposed = unicodedata.normalize('NFKD', text.lower())
+    return ''.join(ch for ch in decomposed if ch.isalnum() and not unicodedata.combining(ch))
+
+
+def make_plan(db, clients: int, transactions: int, days: int, end: date, seed: int) -> Dict[str, Any]:
+    """Fixe les plages d'identifiants et les paramètres partagés par les processus"""
+    with db.connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute("SELECT COALESCE(MAX(id), 0) FROM clients")
+        client_base = cursor.fetchone()[0]
+        cursor.execute("SELECT COALESCE(MAX(id), 0) FROM ibans")
+        iban_base = cursor.fetchone()[0]
+        cursor.close()
+
+    start = end - timedelta(days=days - 1)
+    # Poids de chaque jour : jour de la semaine et légère croissance de l'activité
+    day_weights = [
+        (offset, WEEKDAY_WEIGHTS[(start + timedelta(days=offset)).weekday()] * (1 + 0.3 * offset / days))
+        for offset in range(days)
+    ]
+    return {
+        'tag': uuid.uuid4().hex[:6],
+        'seed': seed,
+        'clients': clients,
+        'transactions': transactions,
+        'client_base': client_base,
+        'iban_base': iban_base,
+        'start': start,
+        'days': _cumulative(day_weights),
+    }
+
+
+def _ranges(total: int, size: int) -> List[Tuple[int, int]]:
+    return [(low, min(low + size, total)) for low in range(0, total, size)]
+
+
+# ----------------------------------------------------------------------
+# Travail des processus
+# ----------------------------------------------------------------------
+
+_worker: Dict[str, Any] = {}
+
+
+def _init_worker():
+    from mysql_config import MySQLDatabase
+    # Une connexion par processus : les pools ne se partagent pas entre processus
+    _worker['db'] = MySQLDatabase(pool_settings={'min_size': 1, 'max_size': 1})
+    names = Faker('fr_FR')
+    _worker['first_names'] = [names.first_name() for _ in range(500)]
+    _worker['last_names'] = [names.last_name() for _ in range(1000)]
+    _worker['merchants'] = [names.company() for _ in range(300)]
+
+
+def _insert(query: str, rows: List[tuple]):
+    with _worker['db'].connection() as conn:
+        cursor = conn.cursor()
+        # Les identifiants référencés sont cohérents par construction
+        cursor.execute("SET SESSION foreign_key_checks = 0")
+        cursor.executemany(query, rows)
+        conn.commit()
+        cursor.close()
+
+
+def generate_clients(plan: Dict[str, Any], low: int, high: int) -> Tuple[int, int]:
+    """Clients de rang [low, high[ et leurs comptes ; renvoie (clients, comptes) insérés"""
+    seed, rng = plan['seed'], random.Random(plan['seed'] * 1_000_003 + low)
+    first_names, last_names = _worker['first_names'], _worker['last_names']
+    clients, ibans = [], []
+    for n in range(low, high):
+        first, last = rng.choice(first_names), rng.choice(last_names)
+        kind = client_type(seed, n)
+        client_id = plan['client_base'] + n + 1
+        clients.append((
+            client_id, first, last,
+            f"{_ascii(first)}.{_ascii(last)}.{n}.{plan['tag']}@{rng.choice(('gmail.com', 'orange.fr', 'free.fr', 'outlook.fr'))}",
+            f"06{rng.randrange(10 ** 8):08d}", kind, _pick(_CLIENT_STATUSES, rng.random()),
+        ))
+        for j in range(iban_count(seed, n)):
+            iban_id = plan['iban_base'] + n * MAX_IBANS_PER_CLIENT + j + 1
+            opening = round(min(rng.lognormvariate(6.5, 1.2) * AMOUNT_SCALE[kind], MAX_AMOUNT), 2)
+            ibans.append((
+                iban_id, client_id, generate_iban(account_number=f"{iban_id:011d}"),
+                iban_currency(seed, n, j), _pick(_ACCOUNT_TYPES[kind], rng.random()), f"{opening:.2f}",
+            ))
+
+    _insert('''
+        INSERT INTO clients (id, first_name, last_name, email, phone, type, status)
+        VALUES (%s, %s, %s, %s, %s, %s, %s)
+    ''', clients)
+    _insert('''
+        INSERT INTO ibans (id, client_id, iban, currency, type, balance)
+        VALUES (%s, %s, %s, %s, %s, %s)
+    ''', ibans)
+    return len(clients), len(ibans)
+
+
+def generate_transactions(plan: Dict[str, Any], low: int, high: int) -> int:
+    """Transactions de rang [low, high[ ; renvoie le nombre de lignes insérées"""
+    seed, rng = plan['seed'], random.Random(plan['seed'] * 7_000_003 + low)
+    clients = plan['clients']
+    # Permutation des rangs d'activité, pour que les clients actifs ne soient pas les premiers créés
+    stride = 1_000_003 if math.gcd(1_000_003, clients) == 1 else 1
+    merchants = _worker['merchants']
+    rows = []
+    for _ in range(low, high):
+        n = (int(clients * rng.random() ** ACTIVITY_SKEW) * stride) % clients
+        j = rng.randrange(iban_count(seed, n))
+        day = plan['start'] + timedelta(days=_pick(plan['days'], rng.random()))
+        moment = datetime(day.year, day.month, day.day, _pick(_HOURS, rng.random()),
+                          rng.randrange(60), rng.randrange(60))
+        month_end = day.day >= MONTH_END_DAY
+        is_deposit = rng.random() < (MONTH_END_DEPOSIT_SHARE if month_end else DEPOSIT_SHARE)
+        scale = AMOUNT_SCALE[client_type(seed, n)] * (3.0 if is_deposit and month_end else 1.0)
+        amount = max(1.0, min(rng.lognormvariate(AMOUNT_MU, AMOUNT_SIGMA) * scale, MAX_AMOUNT))
+        if is_deposit:
+            description = rng.choice(DEPOSIT_LABELS)
+        else:
+            description = f"{rng.choice(WITHDRAWAL_LABELS)} {rng.choice(merchants)}"
+        rows.append((
+            plan['iban_base'] + n * MAX_IBANS_PER_CLIENT + j + 1, plan['client_base'] + n + 1,
+            'deposit' if is_deposit else 'withdrawal', f"{amount:.2f}", description, moment,
+        ))
+
+    _insert('''
+        INSERT INTO transactions (iban_id, client_id, type, amount, description, date)
+        VALUES (%s, %s, %s, %s, %s, %s)
+    ''', rows)
+    return len(rows)
+
+
+def settle_balances(plan: Dict[str, Any], low: int, high: int) -> int:
+    """
+    Reporte les transactions générées sur les soldes des comptes des clients
+    [low, high[ ; un compte qui finirait à découvert reçoit un apport initial
+    daté du premier jour. Renvoie le nombre d'apports.
+    """
+    first = plan['iban_base'] + low * MAX_IBANS_PER_CLIENT + 1
+    last = plan['iban_base'] + high * MAX_IBANS_PER_CLIENT
+    with _worker['db'].connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute('''
+            UPDATE ibans i
+            JOIN (
+                SELECT iban_id, SUM(CASE WHEN type = 'deposit' THEN amount ELSE -amount END) AS delta
+                FROM transactions WHERE iban_id BETWEEN %s AND %s GROUP BY iban_id
+            ) d ON d.iban_id = i.id
+            SET i.balance = i.balance + d.delta
+        ''', (first, last))
+        cursor.execute('''
+            INSERT INTO transactions (iban_id, client_id, type, amount, description, date)
+            SELECT id, client_id, 'deposit', -balance, 'Apport initial', %s
+            FROM ibans WHERE id BETWEEN %s AND %s AND balance < 0
+        ''', (datetime.combine(plan['start'], datetime.min.time()), first, last))
+        top_ups = cursor.rowcount
+        cursor.execute("UPDATE ibans SET balance = 0 WHERE id BETWEEN %s AND %s AND balance < 0",
+                       (first, last))
+        conn.commit()
+        cursor.close()
+    return top_ups
+
+
+def _run_phase(executor, label: str, task, plan: Dict[str, Any], total: int, batch_size: int) -> float:
+    start = time.perf_counter()
+    done = 0
+    futures = [executor.submit(task, plan, low, high) for low, high in _ranges(total, batch_size)]
+    for future in concurrent.futures.as_completed(futures):
+        future.result()
+        done += 1
+        if done % max(1, len(futures) // 20) == 0 or done == len(futures):
+            print(f"  {label}: {done}/{len(futures)} lots", flush=True)
+    return time.perf_counter() - start
+
+
+def generate(clients: int, transactions: int, days: int = 365, end: date = None,
+             workers: int = None, batch_size: int = DEFAULT_BATCH_SIZE, seed: int = 42) -> Dict[str, Any]:
+    """Génère le jeu de données complet et renvoie les durées et débits de chaque phase"""
+    from database import BankDatabase
+    from mysql_config import MySQLDatabase
+
+    db = MySQLDatabase()
+    try:
+        bank = BankDatabase(db)
+        plan = make_plan(db, clients, transactions, days, end or date.today(), seed)
+        report = {'clients': clients, 'transactions': transactions}
+        with concurrent.futures.ProcessPoolExecutor(max_workers=workers or os.cpu_count(),
+                                                    initializer=_init_worker) as executor:
+            seconds = _run_phase(executor, "clients", generate_clients, plan, clients, batch_size)
+            report['clients_per_s'] = round(clients / seconds, 1)
+            seconds = _run_phase(executor, "transactions", generate_transactions, plan, transactions, batch_size)
+            report['transactions_per_s'] = round(transactions / seconds, 1)
+            seconds = _run_phase(executor, "soldes", settle_balances, plan, clients, batch_size)
+            report['settle_seconds'] = round(seconds, 1)
+
+        start = time.perf_counter()
+        bank.rebuild_daily_stats(plan['start'])
+        report['daily_stats_seconds'] = round(time.perf_counter() - start, 1)
+        return report
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Remplit la base avec des données fictives réalistes")
+    parser.add_argument("--clients", type=int, default=100_000)
+    parser.add_argument("--transactions", type=int, default=1_000_000)
+    parser.add_argument("--days", type=int, default=365, help="Profondeur de l'historique en jours")
+    parser.add_argument("--end", type=lambda s: datetime.strptime(s, "%Y-%m-%d").date(),
+                        help="Dernier jour de l'historique (AAAA-MM-JJ) ; aujourd'hui par défaut")
+    parser.add_argument("--workers", type=int, default=os.cpu_count())
+    parser.add_argument("--batch-size", type=int, default=DEFAULT_BATCH_SIZE)
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    report = generate(args.clients, args.transactions, args.days, args.end,
+                      args.workers, args.batch_size, args.seed)
+    print(f"{report['clients']:,} clients ({report['clients_per_s']:,.0f}/s), "
+          f"{report['transactions']:,} transactions ({report['transactions_per_s']:,.0f}/s), "
+          f"soldes en {report['settle_seconds']} s, daily_stats en {report['daily_stats_seconds']} s")
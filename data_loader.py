@@ -0,0 +1,68 @@
+# data_loader.py
+import concurrent.futures
+import logging
+import os
+import time
+from typing import Any, Callable, Dict, Iterator, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Nombre de chargements simultanés pour tout le processus (chacun emprunte sa connexion au pool)
+MAX_WORKERS = int(os.getenv("DATA_LOADER_WORKERS", "8"))
+
+# Délai maximal d'un chargement (secondes)
+DEFAULT_TIMEOUT = 10.0
+
+# Pool de threads partagé par toutes les sessions
+_executor = concurrent.futures.ThreadPoolExecutor(
+    max_workers=MAX_WORKERS, thread_name_prefix="data-loader"
+)
+
+
+def _timed(name: str, loader: Callable[[], Any], started: Dict[str, float]) -> Callable[[], Any]:
+    def run():
+        start = started[name] = time.perf_counter()
+        try:
+            return loader()
+        finally:
+            logger.debug(f"Chargement « {name} » en {(time.perf_counter() - start) * 1000:.0f} ms")
+    return run
+
+
+def _outcome(name: str, future: concurrent.futures.Future) -> Tuple[str, Any, Optional[BaseException]]:
+    error = future.exception()
+    return name, None if error else future.result(), error
+
+
+def load_concurrently(loaders: Dict[str, Callable[[], Any]],
+                      timeout: float = DEFAULT_TIMEOUT
+                      ) -> Iterator[Tuple[str, Any, Optional[BaseException]]]:
+    """
+    Lance les chargements indépendants en parallèle et produit des triplets
+    (nom, résultat, erreur) au fur et à mesure qu'ils se terminent.
+
+    Chaque chargement a sa propre échéance : `timeout` après son démarrage,
+    ou après sa soumission tant qu'il attend un thread du pool partagé. Un
+    chargement terminé est toujours produit avec son résultat, même relevé
+    après l'échéance (l'appelant affiche entre deux triplets) ; seuls ceux
+    qui tournent encore à leur échéance sont produits avec une TimeoutError.
+    Leur thread finit son travail sans bloquer l'appelant.
+    """
+    submitted = time.perf_counter()
+    started: Dict[str, float] = {}
+    pending = {_executor.submit(_timed(name, loader, started)): name for name, loader in loaders.items()}
+    deadline = lambda name: started.get(name, submitted) + timeout
+    while pending:
+        wait = min(map(deadline, pending.values())) - time.perf_counter()
+        done, _ = concurrent.futures.wait(list(pending), timeout=max(wait, 0),
+                                          return_when=concurrent.futures.FIRST_COMPLETED)
+        for future in done:
+            yield _outcome(pending.pop(future), future)
+        for future, name in list(pending.items()):
+            if future.done():
+                yield _outcome(pending.pop(future), future)
+            elif deadline(name) <= time.perf_counter():
+                del pending[future]
+                future.cancel()
+                logger.warning(f"Chargement « {name} » interrompu après {timeout:.0f} s")
+                yield name, None, TimeoutError(f"Délai de {timeout:.0f} s dépassé")
@@ -0,0 +1,1173 @@
+# database.py
+import json
+import logging
+import os
+import random
+import threading
+import time
+from contextlib import contextmanager
+from datetime import date, datetime
+from typing import Optional, Dict, Any, Iterator, List, Tuple
+
+from mysql.connector import Error, errorcode
+
+import pandas as pd
+
+from cache import VersionedCache, cached_read
+from client_index import CLIENT_INDEX
+from frames import CLIENT_SCHEMA, IBAN_SCHEMA, TRANSACTION_SCHEMA, frame_from_rows
+from ibans import normalize_iban
+from mysql_config import MySQLDatabase, get_database
+from migrations import ensure_schema
+from money import NO_CURRENCY, Money, cents_to_decimal, to_cents
+from partitions import (add_months, find_archived_transaction, iter_archived_transactions,
+                        read_archived_transactions)
+from search import (client_search_clause, iban_search_clause, transaction_search_clause,
+                    boolean_query, parse_search)
+
+logger = logging.getLogger(__name__)
+
+# Types de transaction stockés en base
+DEPOSIT = 'deposit'
+WITHDRAWAL = 'withdrawal'
+
+# Taille de page par défaut de l'historique des transactions
+DEFAULT_PAGE_SIZE = 50
+
+# Résultats de deposit/withdraw
+TX_OK = 'ok'
+TX_INSUFFICIENT_FUNDS = 'insufficient_funds'
+TX_UNKNOWN_IBAN = 'unknown_iban'
+
+# Erreurs de verrouillage après lesquelles un mouvement est rejoué
+RETRYABLE_ERRORS = {errorcode.ER_LOCK_DEADLOCK, errorcode.ER_LOCK_WAIT_TIMEOUT}
+MAX_TX_ATTEMPTS = 3
+
+# Les agrégats du jour sont répartis sur plusieurs lignes (selon l'IBAN) pour que
+# les mouvements concurrents ne se disputent pas tous le même verrou de ligne
+STATS_SLOTS = 16
+
+# Tous les indicateurs du tableau de bord en un aller-retour : agrégats journaliers
+# des 7 derniers jours, totaux par type et par devise et répartition des clients.
+# Les montants sont lus en centimes entiers.
+DASHBOARD_QUERY = '''
+    SELECT 'day' AS kind, stat_date AS day, type AS label, NULL AS status, NULL AS currency,
+           SUM(tx_count) AS n, CAST(SUM(total_amount) * 100 AS SIGNED) AS amount_cents,
+           stat_date = CURDATE() AS is_today
+    FROM daily_stats
+    WHERE stat_date >= CURDATE() - INTERVAL 6 DAY
+    GROUP BY stat_date, type
+    UNION ALL
+    SELECT 'total', NULL, type, NULL, currency, SUM(tx_count), CAST(SUM(total_amount) * 100 AS SIGNED), 0
+    FROM daily_stats
+    GROUP BY type, currency
+    UNION ALL
+    SELECT 'clients', NULL, type, status, NULL, COUNT(*), NULL, 0
+    FROM clients
+    GROUP BY type, status
+'''
+
+# Dernières valeurs connues des KPI, affichées quand la base est indisponible
+KPI_SNAPSHOT_PATH = os.getenv("KPI_SNAPSHOT_PATH", "kpi_snapshot.json")
+
+# Colonnes renvoyées par les listes de transactions (montant en centimes)
+TRANSACTION_COLUMNS = '''
+    t.id, t.date, t.type, CAST(t.amount * 100 AS SIGNED) AS amount_cents, t.description,
+    t.client_id, t.iban_id, i.iban, i.currency,
+    CONCAT(c.first_name, ' ', c.last_name) AS client_name
+'''
+
+# Noms des colonnes de TRANSACTION_COLUMNS, dans l'ordre
+TRANSACTION_FIELDS = ('id', 'date', 'type', 'amount_cents', 'description',
+                      'client_id', 'iban_id', 'iban', 'currency', 'client_name')
+
+# Colonnes des listes de comptes (solde en centimes)
+IBAN_COLUMNS = '''
+    i.id, i.client_id, i.iban, i.currency, i.type,
+    CAST(i.balance * 100 AS SIGNED) AS balance_cents, i.created_at
+'''
+
+TRANSACTION_JOINS = '''
+    FROM transactions t
+    JOIN ibans i ON i.id = t.iban_id
+    JOIN clients c ON c.id = t.client_id
+'''
+
+# Tout ce qu'il faut pour un reçu (transaction, compte, titulaire), en une ligne par transaction
+RECEIPT_COLUMNS = '''
+    t.id, t.date, t.type,
+    CAST(t.amount * 100 AS SIGNED) AS amount_cents, t.description,
+    i.iban, i.currency, c.first_name, c.last_name, c.type AS client_type, c.email, c.phone
+'''
+
+# Solde après chaque mouvement d'un relevé (paramètres : solde d'ouverture en centimes,
+# type des dépôts), cumulé par la base dans l'ordre du relevé
+STATEMENT_BALANCE = '''
+    %s + CAST(SUM(CASE WHEN t.type = %s THEN t.amount ELSE -t.amount END)
+              OVER (ORDER BY t.date, t.id ROWS UNBOUNDED PRECEDING) * 100 AS SIGNED)
+'''
+
+# Registre des reçus : nombre par jour sur les RECEIPT_STATS_DAYS derniers jours et,
+# dans le groupe NULL, les reçus plus anciens ; le total en est la somme
+RECEIPT_STATS_DAYS = 30
+RECEIPT_STATS_QUERY = '''
+    SELECT CASE WHEN created_at >= CURDATE() - INTERVAL %s DAY THEN DATE(created_at) END AS day,
+           COUNT(*) AS n
+    FROM receipts
+    GROUP BY day
+    ORDER BY day
+'''
+
+
+class BankDatabase:
+    def __init__(self, db: Optional[MySQLDatabase] = None):
+        """Utilise le service de base de données partagé ; le schéma est vérifié une fois par processus"""
+        self.db = db or get_database()
+        self.cache = VersionedCache()
+        self.tx_counters = {'deadlocks': 0, 'lock_timeouts': 0, 'retries': 0}
+        self._counters_lock = threading.Lock()
+        ensure_schema(self.db)
+
+    @contextmanager
+    def _cursor(self, dictionary: bool = False):
+        """Curseur sur une connexion empruntée au pool pour la durée du bloc"""
+        with self.db.connection() as conn:
+            cursor = conn.cursor(dictionary=dictionary)
+            try:
+                yield conn, cursor
+            finally:
+                cursor.close()
+
+    # ------------------------------------------------------------------
+    # Utilitaires
+    # ------------------------------------------------------------------
+
+    def _fetch_all(self, query: str, params: Tuple = ()) -> List[Dict[str, Any]]:
+        with self._cursor(dictionary=True) as (conn, cursor):
+            cursor.execute(query, params)
+            return cursor.fetchall()
+
+    def _fetch_one(self, query: str, params: Tuple = ()) -> Optional[Dict[str, Any]]:
+        with self._cursor(dictionary=True) as (conn, cursor):
+            cursor.execute(query, params)
+            return cursor.fetchone()
+
+    def _fetch_rows(self, query: str, params: Tuple = ()) -> Tuple[List[str], List[Tuple]]:
+        """Noms des colonnes et lignes en tuples, sans dictionnaire par ligne"""
+        with self._cursor() as (conn, cursor):
+            cursor.execute(query, params)
+            return list(cursor.column_names), cursor.fetchall()
+
+    def _fetch_frame(self, query: str, params: Tuple, schema: Dict[str, str]) -> pd.DataFrame:
+        return frame_from_rows(*self._fetch_rows(query, params), schema)
+
+    def _fetch_scalar(self, query: str, params: Tuple = (), default=0):
+        with self._cursor() as (conn, cursor):
+            cursor.execute(query, params)
+            row = cursor.fetchone()
+            return row[0] if row and row[0] is not None else default
+
+    def _execute(self, query: str, params: Tuple = ()) -> int:
+        """Exécute une écriture dans sa propre transaction et renvoie le dernier id inséré"""
+        with self._cursor() as (conn, cursor):
+            cursor.execute(query, params)
+            conn.commit()
+            return cursor.lastrowid
+
+    def _execute_unique(self, query: str, params: Tuple, message: str) -> int:
+        """Comme _execute, mais une violation d'unicité (email, IBAN) devient une ValueError lisible"""
+        try:
+            return self._execute(query, params)
+        except Error as e:
+            if e.errno == errorcode.ER_DUP_ENTRY:
+                raise ValueError(message) from e
+            raise
+
+    # ------------------------------------------------------------------
+    # Tableau de bord
+    # ------------------------------------------------------------------
+
+    @cached_read('clients')
+    def count_active_clients(self) -> int:
+        return self._fetch_scalar("SELECT COUNT(*) FROM clients WHERE status = 'Actif'")
+
+    def count_daily_transactions(self) -> int:
+        return self._fetch_scalar(
+            "SELECT SUM(tx_count) FROM daily_stats WHERE stat_date = CURDATE()"
+        )
+
+    def _totals_by_currency(self, transaction_type: str) -> Dict[str, int]:
+        """Total en centimes par devise d'un type de transaction"""
+        _, rows = self._fetch_rows('''
+            SELECT currency, CAST(SUM(total_amount) * 100 AS SIGNED)
+            FROM daily_stats WHERE type = %s GROUP BY currency
+        ''', (transaction_type,))
+        return {currency: int(cents) for currency, cents in rows}
+
+    def total_deposits(self) -> Dict[str, int]:
+        return self._totals_by_currency(DEPOSIT)
+
+    def total_withdrawals(self) -> Dict[str, int]:
+        return self._totals_by_currency(WITHDRAWAL)
+
+    def get_last_week_transactions(self) -> List[Dict[str, Any]]:
+        """Montants journaliers des 7 derniers jours, en centimes, toutes devises confondues"""
+        return self._fetch_all('''
+            SELECT stat_date AS date,
+                   CAST(SUM(CASE WHEN type = %s THEN total_amount ELSE 0 END) * 100 AS SIGNED) AS deposit,
+                   CAST(SUM(CASE WHEN type = %s THEN total_amount ELSE 0 END) * 100 AS SIGNED) AS withdrawal
+            FROM daily_stats
+            WHERE stat_date >= CURDATE() - INTERVAL 6 DAY
+            GROUP BY stat_date
+            ORDER BY stat_date
+        ''', (DEPOSIT, WITHDRAWAL))
+
+    @cached_read('clients')
+    def get_clients_by_type(self) -> List[Dict[str, Any]]:
+        return self._fetch_all(
+            "SELECT type, COUNT(*) AS count FROM clients GROUP BY type"
+        )
+
+    @cached_read('daily_stats', 'clients')
+    def get_dashboard_stats(self) -> Dict[str, Any]:
+        """
+        KPI, série des 7 derniers jours et répartition des clients en une seule
+        requête sur daily_stats et clients (sans parcourir les transactions).
+        Les montants sont en centimes : totaux par devise ({'EUR': 125000}),
+        série journalière toutes devises confondues. Les KPI sont mémorisés
+        pour le mode dégradé.
+        """
+        last_week: Dict[Any, Dict[str, Any]] = {}
+        totals: Dict[str, Dict[str, int]] = {DEPOSIT: {}, WITHDRAWAL: {}}
+        clients_by_type: Dict[Any, int] = {}
+        daily_transactions = active_clients = 0
+
+        for row in self._fetch_all(DASHBOARD_QUERY):
+            if row['kind'] == 'day':
+                day = last_week.setdefault(row['day'], {'date': row['day'], DEPOSIT: 0, WITHDRAWAL: 0})
+                day[row['label']] = int(row['amount_cents'] or 0)
+                if row['is_today']:
+                    daily_transactions += int(row['n'])
+            elif row['kind'] == 'total':
+                totals[row['label']][row['currency']] = int(row['amount_cents'] or 0)
+            else:
+                clients_by_type[row['label']] = clients_by_type.get(row['label'], 0) + int(row['n'])
+                if row['status'] == 'Actif':
+                    active_clients += int(row['n'])
+
+        kpis = {
+            'active_clients': active_clients,
+            'daily_transactions': daily_transactions,
+            'total_deposits': totals[DEPOSIT],
+            'total_withdrawals': totals[WITHDRAWAL],
+        }
+        save_kpi_snapshot(kpis)
+        return {
+            'kpis': kpis,
+            'last_week': [last_week[day] for day in sorted(last_week)],
+            'clients_by_type': [{'type': t, 'count': n} for t, n in clients_by_type.items()],
+        }
+
+    def get_dashboard_kpis(self) -> Dict[str, Any]:
+        return self.get_dashboard_stats()['kpis']
+
+    def rebuild_daily_stats(self, since=None) -> int:
+        """
+        Recalcule daily_stats depuis l'historique des transactions (à partir de
+        `since` si fourni) et renvoie le nombre de lignes d'agrégat écrites.
+        Les agrégats des mois archivés sont conservés : leurs lignes ne sont plus en base.
+        """
+        horizon = self.archive_horizon()
+        if horizon is not None and (since is None or _as_date(since) < horizon):
+            logger.warning(f"Mois archivés avant {horizon}: recalcul limité à partir de cette date")
+            since = horizon
+        where, params = ("", ())
+        if since is not None:
+            where, params = ("WHERE t.date >= %s", (since,))
+        with self._cursor() as (conn, cursor):
+            if since is None:
+                cursor.execute("DELETE FROM daily_stats")
+            else:
+                cursor.execute("DELETE FROM daily_stats WHERE stat_date >= %s", (since,))
+            cursor.execute(f'''
+                INSERT INTO daily_stats (stat_date, currency, type, tx_count, total_amount)
+                SELECT DATE(t.date), COALESCE(i.currency, %s), t.type, COUNT(*), SUM(t.amount)
+                FROM transactions t
+                JOIN ibans i ON i.id = t.iban_id
+                {where}
+                GROUP BY DATE(t.date), COALESCE(i.currency, %s), t.type
+            ''', (NO_CURRENCY,) + params + (NO_CURRENCY,))
+            conn.commit()
+            self.cache.bump('daily_stats')
+            return cursor.rowcount
+
+    # ------------------------------------------------------------------
+    # Clients
+    # ------------------------------------------------------------------
+
+    def add_client(self, first_name, last_name, email, phone, client_type, status) -> int:
+        client_id = self._execute_unique('''
+            INSERT INTO clients (first_name, last_name, email, phone, type, status)
+            VALUES (%s, %s, %s, %s, %s, %s)
+        ''', (first_name, last_name, email, phone, client_type, status),
+            f"Un client utilise déjà l'email {email}")
+        self.cache.bump('clients')
+        CLIENT_INDEX.upsert({'id': client_id, 'first_name': first_name,
+                             'last_name': last_name, 'email': email})
+        return client_id
+
+    def update_client(self, client_id, first_name, last_name, email, phone, client_type, status):
+        self._execute_unique('''
+            UPDATE clients
+            SET first_name = %s, last_name = %s, email = %s,
+                phone = %s, type = %s, status = %s
+            WHERE id = %s
+        ''', (first_name, last_name, email, phone, client_type, status, client_id),
+            f"Un autre client utilise déjà l'email {email}")
+        self.cache.bump('clients')
+        CLIENT_INDEX.upsert({'id': client_id, 'first_name': first_name,
+                             'last_name': last_name, 'email': email})
+
+    @cached_read('clients')
+    def get_all_clients(self) -> List[Dict[str, Any]]:
+        return self._fetch_all("SELECT * FROM clients ORDER BY id")
+
+    def _client_search(self, query: str, limit: int, offset: int) -> Tuple[str, Tuple]:
+        where, params = ("", [])
+        if query.strip():
+            clause, params = client_search_clause(query)
+            where = f"WHERE {clause}"
+        return (f"SELECT c.* FROM clients c {where} ORDER BY c.id LIMIT %s OFFSET %s",
+                tuple(params) + (limit, offset))
+
+    def search_clients(self, query: str = "", limit: int = DEFAULT_PAGE_SIZE,
+                       offset: int = 0) -> List[Dict[str, Any]]:
+        """Page de clients correspondant à la recherche (tous les clients si elle est vide)"""
+        return self._fetch_all(*self._client_search(query, limit, offset))
+
+    def search_clients_frame(self, query: str = "", limit: int = DEFAULT_PAGE_SIZE,
+                             offset: int = 0) -> pd.DataFrame:
+        """Comme search_clients, en DataFrame typé pour l'affichage"""
+        return self._fetch_frame(*self._client_search(query, limit, offset), CLIENT_SCHEMA)
+
+    @cached_read('clients')
+    def get_client_by_id(self, client_id) -> Optional[Dict[str, Any]]:
+        return self._fetch_one("SELECT * FROM clients WHERE id = %s", (client_id,))
+
+    # ------------------------------------------------------------------
+    # IBAN
+    # ------------------------------------------------------------------
+
+    def add_iban(self, client_id, iban, currency, account_type, balance) -> int:
+        """`balance` en unités (float saisi, Decimal) ou Money"""
+        iban_id = self._execute_unique('''
+            INSERT INTO ibans (client_id, iban, currency, type, balance)
+            VALUES (%s, %s, %s, %s, %s)
+        ''', (client_id, iban, currency, account_type, cents_to_decimal(to_cents(balance))),
+            f"L'IBAN {iban} est déjà attribué")
+        self.cache.bump('ibans')
+        return iban_id
+
+    def import_onboarding(self, records: List[Dict[str, Any]]) -> Dict[str, Any]:
+        """
+        Enregistre un lot de clients et de comptes en une transaction.
+
+        Chaque enregistrement porte un client (first_name, last_name, email,
+        phone, type, status) et, facultativement, un compte (iban, iban_key,
+        currency, account_type, balance_cents), `iban_key` étant la forme
+        compacte de l'IBAN. Les emails et IBAN déjà présents sont recherchés en une
+        seule requête pour tout le lot, les IBAN par la colonne générée
+        iban_key quel que soit l'espacement enregistré : un email connu
+        rattache le compte au client existant, un IBAN connu est ignoré s'il
+        appartient déjà à ce client et refusé sinon. Les insertions se font par
+        executemany, que le connecteur regroupe en INSERT multi-lignes ; l'index
+        unique sur iban_key refuse un IBAN inséré entre-temps sous une autre forme.
+        """
+        result = {'clients_created': 0, 'clients_existing': 0, 'ibans_created': 0,
+                  'ibans_existing': 0, 'rejected': []}
+        if not records:
+            return result
+        emails = sorted({record['email'] for record in records})
+        iban_keys = sorted({record['iban_key'] for record in records if record.get('iban')})
+
+        with self._cursor() as (conn, cursor):
+            lookup = f"SELECT 'email', email, id FROM clients WHERE email IN ({', '.join(['%s'] * len(emails))})"
+            if iban_keys:
+                lookup += (" UNION ALL SELECT 'iban', iban_key, client_id FROM ibans "
+                           f"WHERE iban_key IN ({', '.join(['%s'] * len(iban_keys))})")
+            cursor.execute(lookup, (*emails, *iban_keys))
+            client_ids, iban_owners = {}, {}
+            for kind, value, owner_id in cursor.fetchall():
+                if kind == 'email':
+                    client_ids[value.lower()] = owner_id
+                else:
+                    iban_owners[value] = owner_id
+            result['clients_existing'] = len(client_ids)
+
+            new_clients = {}
+            for record in records:
+                if record['email'] not in client_ids and record['email'] not in new_clients:
+                    new_clients[record['email']] = tuple(
+                        record[column] for column in ('first_name', 'last_name', 'email', 'phone', 'type', 'status')
+                    )
+            if new_clients:
+                cursor.executemany('''
+                    INSERT INTO clients (first_name, last_name, email, phone, type, status)
+                    VALUES (%s, %s, %s, %s, %s, %s)
+                ''', list(new_clients.values()))
+                # Les id d'un INSERT multi-lignes ne sont pas forcément contigus : on les relit
+                cursor.execute(
+                    f"SELECT email, id FROM clients WHERE email IN ({', '.join(['%s'] * len(new_clients))})",
+                    tuple(new_clients)
+                )
+                client_ids.update((email.lower(), client_id) for email, client_id in cursor.fetchall())
+                result['clients_created'] = len(new_clients)
+
+            iban_rows = []
+            for record in records:
+                if not record.get('iban'):
+                    continue
+                client_id = client_ids[record['email']]
+                owner_id = iban_owners.get(record['iban_key'])
+                if owner_id is None:
+                    iban_owners[record['iban_key']] = client_id
+                    iban_rows.append((client_id, record['iban'], record['currency'],
+                                      record['account_type'], cents_to_decimal(record['balance_cents'])))
+                elif owner_id == client_id:
+                    result['ibans_existing'] += 1
+                else:
+                    result['rejected'].append((record, "IBAN déjà attribué à un autre client"))
+            if iban_rows:
+                cursor.executemany('''
+                    INSERT INTO ibans (client_id, iban, currency, type, balance)
+                    VALUES (%s, %s, %s, %s, %s)
+                ''', iban_rows)
+                result['ibans_created'] = len(iban_rows)
+            conn.commit()
+
+        if new_clients or iban_rows:
+            self.cache.bump('clients', 'ibans')
+        if new_clients:
+            CLIENT_INDEX.invalidate()
+        return result
+
+    @cached_read('ibans', 'clients')
+    def get_all_ibans(self) -> List[Dict[str, Any]]:
+        return _with_balances(self._fetch_all(f'''
+            SELECT {IBAN_COLUMNS}, CONCAT(c.first_name, ' ', c.last_name) AS client_name
+            FROM ibans i
+            JOIN clients c ON c.id = i.client_id
+            ORDER BY i.id
+        '''))
+
+    def _iban_search(self, query: str, limit: int, offset: int) -> Tuple[str, Tuple]:
+        where, params = ("", [])
+        if query.strip():
+            clause, params = iban_search_clause(query)
+            where = f"WHERE {clause}"
+        return (f'''
+            SELECT {IBAN_COLUMNS}, CONCAT(c.first_name, ' ', c.last_name) AS client_name
+            FROM ibans i
+            JOIN clients c ON c.id = i.client_id
+            {where}
+            ORDER BY i.id
+            LIMIT %s OFFSET %s
+        ''', tuple(params) + (limit, offset))
+
+    def search_ibans(self, query: str = "", limit: int = DEFAULT_PAGE_SIZE,
+                     offset: int = 0) -> List[Dict[str, Any]]:
+        """Page d'IBAN correspondant à la recherche (tous les IBAN si elle est vide)"""
+        return _with_balances(self._fetch_all(*self._iban_search(query, limit, offset)))
+
+    def search_ibans_frame(self, query: str = "", limit: int = DEFAULT_PAGE_SIZE,
+                           offset: int = 0) -> pd.DataFrame:
+        """Comme search_ibans, en DataFrame typé pour l'affichage"""
+        return self._fetch_frame(*self._iban_search(query, limit, offset), IBAN_SCHEMA)
+
+    @cached_read('ibans')
+    def get_ibans_by_client(self, client_id) -> List[Dict[str, Any]]:
+        return _with_balances(self._fetch_all(
+            f"SELECT {IBAN_COLUMNS} FROM ibans i WHERE i.client_id = %s ORDER BY i.id", (client_id,)
+        ))
+
+    @cached_read('ibans')
+    def get_iban_by_id(self, iban_id) -> Optional[Dict[str, Any]]:
+        row = self._fetch_one(f"SELECT {IBAN_COLUMNS} FROM ibans i WHERE i.id = %s", (iban_id,))
+        return _with_balances([row])[0] if row else None
+
+    # ------------------------------------------------------------------
+    # Transactions
+    # ------------------------------------------------------------------
+
+    def _count(self, counter: str):
+        with self._counters_lock:
+            self.tx_counters[counter] += 1
+
+    def transaction_metrics(self) -> Dict[str, int]:
+        """Interblocages, délais de verrou et rejeux observés sur les mouvements"""
+        with self._counters_lock:
+            return dict(self.tx_counters)
+
+    def _apply_movement(self, iban_id, cents: int, description, transaction_type) -> Dict[str, Any]:
+        """
+        Un mouvement en une transaction courte : le solde est modifié par un
+        UPDATE conditionnel (qui verrouille la ligne et vérifie la provision
+        d'un seul coup), puis le mouvement et son agrégat sont insérés.
+        """
+        amount = cents_to_decimal(cents)
+        with self._cursor() as (conn, cursor):
+            if transaction_type == WITHDRAWAL:
+                cursor.execute(
+                    "UPDATE ibans SET balance = balance - %s WHERE id = %s AND balance >= %s",
+                    (amount, iban_id, amount)
+                )
+            else:
+                cursor.execute(
+                    "UPDATE ibans SET balance = balance + %s WHERE id = %s",
+                    (amount, iban_id)
+                )
+            if cursor.rowcount == 0:
+                conn.rollback()
+                cursor.execute("SELECT 1 FROM ibans WHERE id = %s", (iban_id,))
+                exists = cursor.fetchone() is not None
+                return {'status': TX_INSUFFICIENT_FUNDS if exists else TX_UNKNOWN_IBAN,
+                        'transaction_id': None}
+
+            cursor.execute('''
+                INSERT INTO transactions (iban_id, client_id, type, amount, description)
+                SELECT id, client_id, %s, %s, %s FROM ibans WHERE id = %s
+            ''', (transaction_type, amount, description, iban_id))
+            transaction_id = cursor.lastrowid
+            # Agrégat du jour mis à jour en dernier, dans la même transaction que le mouvement
+            cursor.execute('''
+                INSERT INTO daily_stats (stat_date, currency, type, slot, tx_count, total_amount)
+                SELECT DATE(t.date), COALESCE(i.currency, %s), t.type, %s, 1, t.amount
+                FROM transactions t
+                JOIN ibans i ON i.id = t.iban_id
+                WHERE t.id = %s
+                ON DUPLICATE KEY UPDATE tx_count = tx_count + 1,
+                                        total_amount = total_amount + VALUES(total_amount)
+            ''', (NO_CURRENCY, iban_id % STATS_SLOTS, transaction_id))
+            conn.commit()
+            return {'status': TX_OK, 'transaction_id': transaction_id}
+
+    def _record_transaction(self, iban_id, amount, description, transaction_type) -> Dict[str, Any]:
+        """
+        Applique le mouvement en rejouant les interblocages ; renvoie {'status', 'transaction_id'}.
+        `amount` est en unités (float saisi, Decimal) ou un Money, converti une fois en centimes.
+        """
+        cents = to_cents(amount)
+        if cents <= 0:
+            raise ValueError("Le montant doit être strictement positif")
+        for attempt in range(1, MAX_TX_ATTEMPTS + 1):
+            try:
+                result = self._apply_movement(iban_id, cents, description, transaction_type)
+                break
+            except Error as e:
+                if e.errno not in RETRYABLE_ERRORS or attempt == MAX_TX_ATTEMPTS:
+                    raise
+                self._count('deadlocks' if e.errno == errorcode.ER_LOCK_DEADLOCK else 'lock_timeouts')
+                self._count('retries')
+                time.sleep(random.uniform(0, 0.01 * attempt))
+
+        if result['status'] == TX_OK:
+            self.cache.bump('ibans', 'transactions', 'daily_stats')
+        return result
+
+    def deposit(self, iban_id, amount, description="") -> Dict[str, Any]:
+        return self._record_transaction(iban_id, amount, description, DEPOSIT)
+
+    def withdraw(self, iban_id, amount, description="") -> Dict[str, Any]:
+        """Retrait si la provision suffit ; sinon status vaut TX_INSUFFICIENT_FUNDS"""
+        return self._record_transaction(iban_id, amount, description, WITHDRAWAL)
+
+    def import_postings(self, postings: List[Dict[str, Any]]) -> List[Tuple[Dict[str, Any], str]]:
+        """
+        Enregistre un lot de mouvements validés (iban, type, amount_cents,
+        description, date) en une seule transaction, avec un nombre de requêtes fixe :
+        les IBAN du lot sont résolus et verrouillés ensemble, les mouvements
+        insérés par executemany, puis les soldes et les agrégats mis à jour par
+        une requête groupée chacun.
+
+        Renvoie les mouvements refusés (IBAN inconnu, provision insuffisante)
+        avec leur motif ; les autres sont validés.
+        """
+        if not postings:
+            return []
+        # posting['iban'] est la forme compacte, comparée à la colonne générée
+        # iban_key : l'espacement enregistré n'a pas d'importance
+        iban_keys = sorted({posting['iban'] for posting in postings})
+        rejected, rows, deltas, stats = [], [], {}, {}
+        with self._cursor() as (conn, cursor):
+            # Verrouillage dans l'ordre des id, comme les autres lots, pour éviter les interblocages
+            cursor.execute(f'''
+                SELECT iban_key, id, client_id, COALESCE(currency, %s), CAST(balance * 100 AS SIGNED) FROM ibans
+                WHERE iban_key IN ({', '.join(['%s'] * len(iban_keys))})
+                ORDER BY id FOR UPDATE
+            ''', (NO_CURRENCY, *iban_keys))
+            accounts = {row[0]: row[1:] for row in cursor.fetchall()}
+            balances = {iban_id: balance for iban_id, _, _, balance in accounts.values()}
+
+            # Les mouvements sont appliqués dans l'ordre du fichier : un retrait
+            # peut s'appuyer sur un dépôt qui le précède dans le même lot
+            for posting in postings:
+                account = accounts.get(posting['iban'])
+                if account is None:
+                    rejected.append((posting, "IBAN inconnu"))
+                    continue
+                iban_id, client_id, currency, _ = account
+                cents = posting['amount_cents']
+                signed = cents if posting['type'] == DEPOSIT else -cents
+                if balances[iban_id] + signed < 0:
+                    rejected.append((posting, "Solde insuffisant"))
+                    continue
+                balances[iban_id] += signed
+                deltas[iban_id] = deltas.get(iban_id, 0) + signed
+                key = (posting['date'].date(), currency, posting['type'], iban_id % STATS_SLOTS)
+                count, total = stats.get(key, (0, 0))
+                stats[key] = (count + 1, total + cents)
+                rows.append((iban_id, client_id, posting['type'], cents_to_decimal(cents),
+                             posting['description'], posting['date']))
+
+            if rows:
+                cursor.executemany('''
+                    INSERT INTO transactions (iban_id, client_id, type, amount, description, date)
+                    VALUES (%s, %s, %s, %s, %s, %s)
+                ''', rows)
+                deltas_table = " UNION ALL ".join(
+                    ["SELECT %s AS id, CAST(%s AS DECIMAL(20,2)) AS delta"] * len(deltas)
+                )
+                cursor.execute(f'''
+                    UPDATE ibans i JOIN ({deltas_table}) d ON d.id = i.id
+                    SET i.balance = i.balance + d.delta
+                ''', [value for iban_id, delta in sorted(deltas.items())
+                      for value in (iban_id, cents_to_decimal(delta))])
+                cursor.executemany('''
+                    INSERT INTO daily_stats (stat_date, currency, type, slot, tx_count, total_amount)
+                    VALUES (%s, %s, %s, %s, %s, %s)
+                    ON DUPLICATE KEY UPDATE tx_count = tx_count + VALUES(tx_count),
+                                            total_amount = total_amount + VALUES(total_amount)
+                ''', [key + (count, cents_to_decimal(total)) for key, (count, total) in sorted(stats.items())])
+            conn.commit()
+
+        if rows:
+            self.cache.bump('ibans', 'transactions', 'daily_stats')
+        return rejected
+
+    def get_all_transactions(self) -> List[Dict[str, Any]]:
+        return _transaction_dicts(*self._fetch_rows(
+            f"SELECT {TRANSACTION_COLUMNS} {TRANSACTION_JOINS} ORDER BY t.date DESC, t.id DESC"
+        ))
+
+    def get_recent_transactions(self, limit: int = 10, search: str = "", frame: bool = False):
+        return self.get_transactions_page(limit, frame=frame, search=search)['rows']
+
+    @cached_read('transactions', 'transaction_archives', 'ibans')
+    def get_transaction_by_id(self, transaction_id) -> Optional[Dict[str, Any]]:
+        """Transaction avec son montant en Money (devise du compte) ; la date est au format texte"""
+        transaction = self._fetch_one('''
+            SELECT t.id, t.iban_id, t.client_id, t.type, CAST(t.amount * 100 AS SIGNED) AS amount_cents,
+                   t.description, DATE_FORMAT(t.date, '%%Y-%%m-%%d %%H:%%i:%%s') AS date, i.currency
+            FROM transactions t
+            LEFT JOIN ibans i ON i.id = t.iban_id
+            WHERE t.id = %s
+        ''', (transaction_id,))
+        archives = self.get_transaction_archives()
+        if transaction is None and archives:
+            transaction = find_archived_transaction(archives, int(transaction_id))
+            if transaction is not None:
+                transaction['date'] = transaction['date'].strftime('%Y-%m-%d %H:%M:%S')
+                iban = self.get_iban_by_id(transaction['iban_id'])
+                transaction['currency'] = iban['currency'] if iban else None
+        if transaction is not None:
+            transaction['amount'] = Money(transaction.pop('amount_cents'), transaction['currency'])
+        return transaction
+
+    # ------------------------------------------------------------------
+    # Mois archivés (partitions.py)
+    # ------------------------------------------------------------------
+
+    @cached_read('transaction_archives')
+    def get_transaction_archives(self) -> List[Dict[str, Any]]:
+        return self._fetch_all(
+            "SELECT month, path, row_count, size_bytes, archived_at FROM transaction_archives ORDER BY month"
+        )
+
+    def archive_horizon(self) -> Optional[date]:
+        """Premier mois encore en base : toutes les lignes archivées lui sont antérieures"""
+        archives = self.get_transaction_archives()
+        return add_months(archives[-1]['month'], 1) if archives else None
+
+    def _archive_criteria(self, filters: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """
+        Filtres de l'historique traduits pour les fichiers d'archive (None si
+        aucune ligne ne peut correspondre). Les clients et IBAN recherchés
+        sont résolus en base, par les mêmes index plein texte qu'en SQL.
+        """
+        criteria = {name: filters.get(name) for name in ('date_from', 'date_to', 'type', 'client_id', 'iban_id')}
+        for name in ('amount_min', 'amount_max'):
+            criteria[name] = _amount_param(filters.get(name))
+        if filters.get('iban'):
+            iban_id = self._fetch_scalar("SELECT id FROM ibans WHERE iban_key = %s",
+                                          (normalize_iban(filters['iban']),), None)
+            if iban_id is None or (criteria['iban_id'] and int(criteria['iban_id']) != iban_id):
+                return None
+            criteria['iban_id'] = iban_id
+        if (filters.get('search') or '').strip():
+            terms = parse_search(filters['search'])
+            client_ids, iban_ids = [], []
+            if terms['words']:
+                against = boolean_query(terms['words'])
+                client_ids = [row['id'] for row in self._fetch_all(
+                    "SELECT id FROM clients WHERE MATCH(first_name, last_name, email) AGAINST (%s IN BOOLEAN MODE)",
+                    (against,))]
+                iban_ids = [row['id'] for row in self._fetch_all(
+                    "SELECT id FROM ibans WHERE MATCH(iban) AGAINST (%s IN BOOLEAN MODE)", (against,))]
+            criteria['search'] = {'words': terms['words'], 'client_ids': client_ids, 'iban_ids': iban_ids,
+                                  'ids': terms['ids'], 'amounts': terms['amounts']}
+        return criteria
+
+    def _describe_archived(self, rows: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Complète des lignes archivées avec l'IBAN, la devise et le titulaire, comme TRANSACTION_COLUMNS"""
+        if not rows:
+            return rows
+        iban_ids = sorted({row['iban_id'] for row in rows})
+        client_ids = sorted({row['client_id'] for row in rows})
+        ibans = {row['id']: row for row in self._fetch_all(
+            f"SELECT id, iban, currency FROM ibans WHERE id IN ({', '.join(['%s'] * len(iban_ids))})",
+            tuple(iban_ids))}
+        names = {row['id']: row['client_name'] for row in self._fetch_all(
+            "SELECT id, CONCAT(first_name, ' ', last_name) AS client_name FROM clients "
+            f"WHERE id IN ({', '.join(['%s'] * len(client_ids))})", tuple(client_ids))}
+        for row in rows:
+            iban = ibans.get(row['iban_id'], {})
+            row.update(iban=iban.get('iban'), currency=iban.get('currency'), client_name=names.get(row['client_id']))
+        return rows
+
+    def _archived_criteria_for(self, filters: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """Critères de lecture des archives, ou None si les filtres les excluent"""
+        horizon = self.archive_horizon()
+        if horizon is None or (filters.get('date_from') and _as_date(filters['date_from']) >= horizon):
+            return None
+        return self._archive_criteria(filters)
+
+    def _archived_rows(self, filters: Dict[str, Any], limit: int, key, ascending: bool) -> List[Tuple]:
+        criteria = self._archived_criteria_for(filters)
+        if criteria is None:
+            return []
+        rows = read_archived_transactions(self.get_transaction_archives(), criteria, limit, key, ascending)
+        return [tuple(row[field] for field in TRANSACTION_FIELDS) for row in self._describe_archived(rows)]
+
+    def _transaction_filters(self, filters: Dict[str, Any]) -> Tuple[List[str], List[Any]]:
+        """Traduit les filtres de l'historique en clauses WHERE paramétrées"""
+        clauses, params = [], []
+        if filters.get('date_from'):
+            clauses.append("t.date >= %s")
+            params.append(filters['date_from'])
+        if filters.get('date_to'):
+            # Borne exclusive : on inclut toute la journée de fin
+            clauses.append("t.date < %s + INTERVAL 1 DAY")
+            params.append(filters['date_to'])
+        if filters.get('type'):
+            clauses.append("t.type = %s")
+            params.append(filters['type'])
+        if filters.get('client_id'):
+            clauses.append("t.client_id = %s")
+            params.append(filters['client_id'])
+        if filters.get('iban_id'):
+            clauses.append("t.iban_id = %s")
+            params.append(filters['iban_id'])
+        if filters.get('iban'):
+            # Comparé à iban_key : l'espacement saisi n'a pas d'importance
+            clauses.append("t.iban_id = (SELECT id FROM ibans WHERE iban_key = %s)")
+            params.append(normalize_iban(filters['iban']))
+        if filters.get('amount_min') is not None:
+            clauses.append("t.amount >= %s")
+            params.append(_amount_param(filters['amount_min']))
+        if filters.get('amount_max') is not None:
+            clauses.append("t.amount <= %s")
+            params.append(_amount_param(filters['amount_max']))
+        if (filters.get('search') or '').strip():
+            clause, clause_params = transaction_search_clause(filters['search'])
+            clauses.append(clause)
+            params.extend(clause_params)
+        return clauses, params
+
+    def get_transactions_page(self, page_size: int = DEFAULT_PAGE_SIZE,
+                              after: Optional[Tuple[datetime, int]] = None,
+                              before: Optional[Tuple[datetime, int]] = None,
+                              frame: bool = False, **filters) -> Dict[str, Any]:
+        """
+        Renvoie une page de l'historique triée par (date, id) décroissants.
+
+        La pagination se fait par clé (keyset) : `after` est la clé (date, id)
+        de la dernière ligne de la page courante pour aller à la page suivante,
+        `before` celle de la première ligne pour revenir à la page précédente.
+        Le coût d'une page ne dépend donc pas de sa position dans l'historique.
+
+        Les mois archivés étant tous antérieurs aux partitions en base, une
+        page qui atteint le bout de la base se complète dans les archives.
+        Les lignes sont des dictionnaires dont le montant est un Money ; avec
+        `frame`, un DataFrame typé (TRANSACTION_SCHEMA, montants en centimes int64).
+        """
+        clauses, params = self._transaction_filters(filters)
+
+        if before is not None:
+            clauses.append("(t.date > %s OR (t.date = %s AND t.id > %s))")
+            params.extend([before[0], before[0], before[1]])
+            order = "t.date ASC, t.id ASC"
+        else:
+            if after is not None:
+                clauses.append("(t.date < %s OR (t.date = %s AND t.id < %s))")
+                params.extend([after[0], after[0], after[1]])
+            order = "t.date DESC, t.id DESC"
+
+        where = f"WHERE {' AND '.join(clauses)}" if clauses else ""
+        # Une ligne de plus que demandé pour savoir s'il reste une page
+        columns, rows = self._fetch_rows(
+            f"SELECT {TRANSACTION_COLUMNS} {TRANSACTION_JOINS} {where} "
+            f"ORDER BY {order} LIMIT %s",
+            tuple(params) + (page_size + 1,)
+        )
+        if self.get_transaction_archives():
+            rows = self._with_archived_rows(rows, page_size + 1, filters, after, before)
+        has_more = len(rows) > page_size
+        rows = rows[:page_size]
+
+        if before is not None:
+            rows.reverse()
+            has_prev, has_next = has_more, True
+        else:
+            has_prev, has_next = after is not None, has_more
+
+        return {
+            'rows': (frame_from_rows(columns, rows, TRANSACTION_SCHEMA) if frame
+                     else _transaction_dicts(columns, rows)),
+            'has_prev': has_prev and bool(rows),
+            'has_next': has_next and bool(rows),
+            'first_key': (rows[0][1], rows[0][0]) if rows else None,
+            'last_key': (rows[-1][1], rows[-1][0]) if rows else None,
+        }
+
+    def _with_archived_rows(self, rows: List[Tuple], limit: int, filters: Dict[str, Any],
+                            after, before) -> List[Tuple]:
+        horizon = datetime.combine(self.archive_horizon(), datetime.min.time())
+        if before is not None:
+            # Ordre croissant : les lignes archivées précèdent celles de la base
+            if before[0] >= horizon:
+                return rows
+            return (self._archived_rows(filters, limit, before, ascending=True) + rows)[:limit]
+        if len(rows) >= limit:
+            return rows
+        return rows + self._archived_rows(filters, limit - len(rows), after, ascending=False)
+
+    def estimate_transactions_count(self, **filters) -> int:
+        """
+        Estimation du nombre de transactions correspondant aux filtres.
+
+        Sans filtre, on lit les statistiques InnoDB ; sinon on s'appuie sur
+        l'estimation de l'optimiseur (EXPLAIN) plutôt que sur un COUNT(*).
+        """
+        clauses, params = self._transaction_filters(filters)
+        if not clauses:
+            return self._fetch_scalar('''
+                SELECT TABLE_ROWS FROM information_schema.TABLES
+                WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = 'transactions'
+            ''')
+
+        plan = self._fetch_all(
+            f"EXPLAIN SELECT t.id FROM transactions t WHERE {' AND '.join(clauses)}",
+            tuple(params)
+        )
+        for step in plan:
+            if step.get('table') == 't':
+                rows = step.get('rows') or 0
+                filtered = step.get('filtered') or 100
+                return int(rows * float(filtered) / 100)
+        return 0
+
+    def iter_transactions(self, chunk_size: int = 10_000, **filters) -> Iterator[List[Tuple]]:
+        """
+        Tout l'historique correspondant aux filtres de get_transactions_page, du
+        plus ancien au plus récent, par blocs de `chunk_size` lignes (tuples dans
+        l'ordre de TRANSACTION_FIELDS) : mois archivés d'abord, puis la base.
+
+        Le curseur est sans tampon : le serveur envoie les lignes au fil de la
+        lecture et la mémoire ne dépend que de `chunk_size`. La connexion reste
+        empruntée jusqu'à la fin de l'itération.
+        """
+        criteria = self._archived_criteria_for(filters)
+        if criteria is not None:
+            for rows in iter_archived_transactions(self.get_transaction_archives(), criteria, chunk_size):
+                yield [tuple(row[field] for field in TRANSACTION_FIELDS) for row in self._describe_archived(rows)]
+
+        clauses, params = self._transaction_filters(filters)
+        where = f"WHERE {' AND '.join(clauses)}" if clauses else ""
+        yield from self._stream_rows(
+            f"SELECT {TRANSACTION_COLUMNS} {TRANSACTION_JOINS} {where} ORDER BY t.date, t.id",
+            tuple(params), chunk_size
+        )
+
+    def count_transactions(self, **filters) -> int:
+        """Nombre exact de transactions en base correspondant aux filtres (COUNT(*))"""
+        clauses, params = self._transaction_filters(filters)
+        where = f"WHERE {' AND '.join(clauses)}" if clauses else ""
+        return self._fetch_scalar(f"SELECT COUNT(*) FROM transactions t {where}", tuple(params))
+
+    def iter_receipt_rows(self, chunk_size: int = 1000, **filters) -> Iterator[List[Tuple]]:
+        """
+        Données des reçus des transactions en base correspondant aux filtres
+        (tuples dans l'ordre de RECEIPT_COLUMNS, montant en centimes), par
+        blocs de `chunk_size`, en une seule requête de jointure sans tampon.
+        Les mois archivés n'en font pas partie.
+        """
+        clauses, params = self._transaction_filters(filters)
+        where = f"WHERE {' AND '.join(clauses)}" if clauses else ""
+        yield from self._stream_rows(
+            f"SELECT {RECEIPT_COLUMNS} {TRANSACTION_JOINS} {where} ORDER BY t.date, t.id",
+            tuple(params), chunk_size
+        )
+
+    def _stream_rows(self, query: str, params: Tuple, chunk_size: int) -> Iterator[List[Tuple]]:
+        """
+        Lignes de `query` par blocs, sur un curseur sans tampon : la mémoire ne
+        dépend que de `chunk_size`, la connexion reste empruntée jusqu'à la fin.
+        """
+        with self.db.connection() as conn:
+            cursor = conn.cursor(buffered=False)
+            try:
+                cursor.execute(query, params)
+                while True:
+                    rows = cursor.fetchmany(chunk_size)
+                    if not rows:
+                        break
+                    yield rows
+            finally:
+                try:
+                    cursor.close()
+                except Error:
+                    # Itération abandonnée : le pool purge le résultat non lu en reprenant la connexion
+                    pass
+
+    # ------------------------------------------------------------------
+    # Relevés de compte
+    # ------------------------------------------------------------------
+
+    def _check_statement_period(self, date_from: date):
+        horizon = self.archive_horizon()
+        if horizon is not None and date_from < horizon:
+            raise ValueError(f"Période archivée : les relevés commencent au plus tôt le {horizon:%d/%m/%Y}")
+
+    def get_statement_summary(self, iban_id, date_from: date, date_to: date) -> Optional[Dict[str, Any]]:
+        """
+        En-tête du relevé d'un compte sur [date_from, date_to] : compte,
+        titulaire, solde d'ouverture, totaux et nombre de mouvements, en
+        centimes. Le solde d'ouverture est le solde actuel moins les
+        mouvements depuis date_from, lus dans la même requête (même instantané).
+        """
+        self._check_statement_period(date_from)
+        summary = self._fetch_one('''
+            SELECT i.id, i.iban, COALESCE(i.currency, %s) AS currency, i.type AS account_type,
+                   c.first_name, c.last_name, c.email,
+                   CAST(i.balance * 100 AS SIGNED) AS balance_cents,
+                   COALESCE(m.since_cents, 0) AS since_cents, COALESCE(m.deposits_cents, 0) AS deposits_cents,
+                   COALESCE(m.withdrawals_cents, 0) AS withdrawals_cents, COALESCE(m.movements, 0) AS movements
+            FROM ibans i
+            JOIN clients c ON c.id = i.client_id
+            CROSS JOIN (
+                SELECT CAST(SUM(CASE WHEN type = %s THEN amount ELSE -amount END) * 100 AS SIGNED) AS since_cents,
+                       CAST(SUM(CASE WHEN date < %s + INTERVAL 1 DAY AND type = %s THEN amount ELSE 0 END) * 100
+                            AS SIGNED) AS deposits_cents,
+                       CAST(SUM(CASE WHEN date < %s + INTERVAL 1 DAY AND type = %s THEN amount ELSE 0 END) * 100
+                            AS SIGNED) AS withdrawals_cents,
+                       COUNT(CASE WHEN date < %s + INTERVAL 1 DAY THEN 1 END) AS movements
+                FROM transactions
+                WHERE iban_id = %s AND date >= %s
+            ) m
+            WHERE i.id = %s
+        ''', (NO_CURRENCY, DEPOSIT, date_to, DEPOSIT, date_to, WITHDRAWAL, date_to, iban_id, date_from, iban_id))
+        if summary is None:
+            return None
+        summary['opening_cents'] = summary['balance_cents'] - summary.pop('since_cents')
+        summary['closing_cents'] = (summary['opening_cents'] + summary['deposits_cents']
+                                    - summary['withdrawals_cents'])
+        return summary
+
+    def iter_statement_rows(self, iban_id, date_from: date, date_to: date, opening_cents: int,
+                            chunk_size: int = 2000) -> Iterator[List[Tuple]]:
+        """
+        Mouvements du compte sur la période, dans l'ordre (date, id), par blocs :
+        (id, date, type, amount_cents, description, balance_cents). Le solde
+        après chaque mouvement est calculé par la base (SUM ... OVER), à partir
+        de `opening_cents` ; aucune ligne n'est gardée côté Python.
+        """
+        self._check_statement_period(date_from)
+        yield from self._stream_rows(f'''
+            SELECT t.id, t.date, t.type, CAST(t.amount * 100 AS SIGNED) AS amount_cents, t.description,
+                   {STATEMENT_BALANCE} AS balance_cents
+            FROM transactions t
+            WHERE t.iban_id = %s AND t.date >= %s AND t.date < %s + INTERVAL 1 DAY
+            ORDER BY t.date, t.id
+        ''', (opening_cents, DEPOSIT, iban_id, date_from, date_to), chunk_size)
+
+    def get_statement_iban_ids(self) -> List[int]:
+        """Comptes dont un relevé peut être produit (tous), dans l'ordre des id"""
+        _, rows = self._fetch_rows("SELECT id FROM ibans ORDER BY id")
+        return [row[0] for row in rows]
+
+    # ------------------------------------------------------------------
+    # Registre des reçus
+    # ------------------------------------------------------------------
+
+    def record_receipt(self, transaction_id, options_hash: str, size_bytes: int, storage_path: str):
+        """Inscrit un reçu ; un reçu déjà inscrit (même transaction, mêmes options) garde sa date de création"""
+        self.record_receipts([(transaction_id, options_hash, size_bytes, storage_path)])
+
+    def record_receipts(self, receipts: List[Tuple[int, str, int, str]]):
+        """
+        Inscrit un lot de reçus (transaction_id, options_hash, size_bytes,
+        storage_path) en une transaction, par executemany (INSERT multi-lignes
+        du connecteur). storage_path est la clé du reçu dans le cache
+        (receipt_cache.receipt_key) : la même sur toutes les répliques, et
+        toujours valable après une éviction, le reçu étant alors rendu à nouveau.
+        """
+        if not receipts:
+            return
+        with self._cursor() as (conn, cursor):
+            cursor.executemany('''
+                INSERT INTO receipts (transaction_id, options_hash, size_bytes, storage_path)
+                VALUES (%s, %s, %s, %s)
+                ON DUPLICATE KEY UPDATE size_bytes = VALUES(size_bytes), storage_path = VALUES(storage_path)
+            ''', receipts)
+            conn.commit()
+        self.cache.bump('receipts')
+
+    @cached_read('receipts')
+    def get_receipt_stats(self, days: int = RECEIPT_STATS_DAYS) -> Dict[str, Any]:
+        """Nombre total de reçus et reçus par jour des `days` derniers jours, en une requête agrégée"""
+        _, rows = self._fetch_rows(RECEIPT_STATS_QUERY, (days - 1,))
+        return {
+            'total': sum(n for _, n in rows),
+            'by_day': [{'date': day, 'count': n} for day, n in rows if day is not None],
+        }
+
+    def close(self):
+        """Ferme le pool de connexions (à réserver aux scripts : le service est partagé)"""
+        self.db.close()
+
+
+_kpi_snapshot: Optional[Dict[str, Any]] = None
+
+
+def _amount_param(value):
+    """Montant saisi (float, Decimal, Money) -> paramètre DECIMAL exact, ou None"""
+    return None if value is None else cents_to_decimal(to_cents(value))
+
+
+def _transaction_dicts(columns: List[str], rows: List[Tuple]) -> List[Dict[str, Any]]:
+    """Lignes de TRANSACTION_COLUMNS en dictionnaires, montant en Money dans la devise du compte"""
+    transactions = []
+    for row in rows:
+        transaction = dict(zip(columns, row))
+        transaction['amount'] = Money(transaction.pop('amount_cents'), transaction['currency'])
+        transactions.append(transaction)
+    return transactions
+
+
+def _with_balances(ibans: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """Remplace balance_cents (IBAN_COLUMNS) par le solde en Money"""
+    for iban in ibans:
+        iban['balance'] = Money(iban.pop('balance_cents'), iban['currency'])
+    return ibans
+
+
+def _as_date(value) -> date:
+    if isinstance(value, datetime):
+        return value.date()
+    if isinstance(value, date):
+        return value
+    return date.fromisoformat(str(value)[:10])
+
+
+def save_kpi_snapshot(kpis: Dict[str, Any]):
+    """Mémorise les KPI en mémoire et sur disque (réécrit seulement s'ils changent)"""
+    global _kpi_snapshot
+    if _kpi_snapshot is not None and _kpi_snapshot['kpis'] == kpis:
+        return
+    _kpi_snapshot = {'kpis': kpis, 'updated_at': datetime.now().strftime('%d/%m/%Y %H:%M')}
+    try:
+        with open(KPI_SNAPSHOT_PATH, 'w') as f:
+            json.dump(_kpi_snapshot, f)
+    except OSError as e:
+        logger.warning(f"Impossible d'enregistrer les KPI: {str(e)}")
+
+
+def load_kpi_snapshot() -> Optional[Dict[str, Any]]:
+    """Derniers KPI connus, y compris ceux d'un processus précédent"""
+    global _kpi_snapshot
+    if _kpi_snapshot is None and os.path.exists(KPI_SNAPSHOT_PATH):
+        try:
+            with open(KPI_SNAPSHOT_PATH) as f:
+                _kpi_snapshot = json.load(f)
+        except (OSError, ValueError) as e:
+            logger.warning(f"Impossible de lire les KPI enregistrés: {str(e)}")
+    return _kpi_snapshot
+
+
+# Instance partagée par toutes les sessions et réexécutions du processus
+_bank_database: Optional[BankDatabase] = None
+_bank_database_lock = threading.Lock()
+
+
+def get_bank_database() -> BankDatabase:
+    """Renvoie l'accès aux données unique du processus"""
+    global _bank_database
+    if _bank_database is None:
+        with _bank_database_lock:
+            if _bank_database is None:
+                _bank_database = BankDatabase()
+    return _bank_database
+
+
+class UserManager:
+    def __init__(self, db: MySQLDatabase):
+        self.db = db
+        ensure_schema(db)
+
+    def add_user(self, username, email, password_hash, role='user') -> Optional[int]:
+        try:
+            with self.db.connection() as conn:
+                cursor = conn.cursor()
+                try:
+                    cursor.execute('''
+                        INSERT INTO users (username, email, password_hash, role)
+                        VALUES (%s, %s, %s, %s)
+                    ''', (username, email, password_hash, role))
+                    conn.commit()
+                    return cursor.lastrowid
+                finally:
+                    cursor.close()
+        except Exception as e:
+            logger.error(f"Erreur lors de la création de l'utilisateur: {str(e)}")
+            return None
+
+    def _fetch_user(self, query: str, params: Tuple) -> Optional[Dict[str, Any]]:
+        with self.db.connection() as conn:
+            cursor = conn.cursor(dictionary=True)
+            try:
+                cursor.execute(query, params)
+                return cursor.fetchone()
+            finally:
+                cursor.close()
+
+    def get_user_by_username(self, username) -> Optional[Dict[str, Any]]:
+        return self._fetch_user(
+            "SELECT id, username, email, role FROM users WHERE username = %s",
+            (username,)
+        )
+
+    def verify_user(self, username, password_hash) -> Optional[Dict[str, Any]]:
+        return self._fetch_user('''
+            SELECT id, username, email, role FROM users
+            WHERE username = %s AND password_hash = %s
+        ''', (username, password_hash))
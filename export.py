@@ -0,0 +1,169 @@
+# export.py
+"""
+Export de l'historique des transactions en CSV ou en Parquet.
+
+Les lignes arrivent par blocs de BankDatabase.iter_transactions (curseur sans
+tampon côté serveur, mêmes filtres que l'historique) et sont écrites au fil de
+l'eau dans un fichier temporaire : la mémoire reste la même pour mille ou
+cinquante millions de lignes. Le fichier est ensuite proposé au téléchargement.
+
+Les montants sont lus en centimes : le CSV les écrit en unités (« 1234.50 »),
+le Parquet garde la colonne entière amount_cents.
+
+    python export.py --format parquet --from 2024-01-01 --to 2024-03-31 -o t1.parquet
+"""
+import argparse
+import csv
+import logging
+import os
+import tempfile
+import time
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Tuple
+
+from database import BankDatabase, TRANSACTION_FIELDS
+from money import cents_to_decimal
+
+logger = logging.getLogger(__name__)
+
+# Lignes lues par aller-retour et écrites par bloc
+EXPORT_CHUNK_ROWS = int(os.getenv("EXPORT_CHUNK_ROWS", "10000"))
+
+# Format : (extension, type MIME)
+EXPORT_FORMATS = {
+    'csv': ('.csv', 'text/csv'),
+    'parquet': ('.parquet', 'application/vnd.apache.parquet'),
+}
+
+
+class CsvChunkWriter:
+    """CSV en UTF-8 avec BOM, pour une ouverture directe dans Excel"""
+
+    _AMOUNT = TRANSACTION_FIELDS.index('amount_cents')
+
+    def __init__(self, path: str):
+        self._file = open(path, 'w', encoding='utf-8-sig', newline='')
+        self._writer = csv.writer(self._file)
+        self._writer.writerow(['amount' if field == 'amount_cents' else field for field in TRANSACTION_FIELDS])
+
+    def write(self, rows: List[Tuple]):
+        index = self._AMOUNT
+        self._writer.writerows(
+            row[:index] + (cents_to_decimal(row[index]),) + row[index + 1:] for row in rows
+        )
+
+    def close(self):
+        self._file.close()
+
+
+class ParquetChunkWriter:
+    """Parquet compressé (zstd), un groupe de lignes par bloc"""
+
+    def __init__(self, path: str):
+        try:
+            import pyarrow
+            import pyarrow.parquet
+        except ImportError:
+            raise RuntimeError("L'export Parquet nécessite pyarrow (pip install pyarrow)")
+        self._pa = pyarrow
+        self._schema = pyarrow.schema([
+            ('id', pyarrow.int32()),
+            ('date', pyarrow.timestamp('s')),
+            ('type', pyarrow.string()),
+            ('amount_cents', pyarrow.int64()),
+            ('description', pyarrow.string()),
+            ('client_id', pyarrow.int32()),
+            ('iban_id', pyarrow.int32()),
+            ('iban', pyarrow.string()),
+            ('currency', pyarrow.string()),
+            ('client_name', pyarrow.string()),
+        ])
+        self._writer = pyarrow.parquet.ParquetWriter(path, self._schema, compression='zstd')
+
+    def write(self, rows: List[Tuple]):
+        pa = self._pa
+        columns = list(zip(*rows))
+        self._writer.write_table(pa.Table.from_arrays(
+            [pa.array(values, type=field.type) for values, field in zip(columns, self._schema)],
+            schema=self._schema
+        ))
+
+    def close(self):
+        self._writer.close()
+
+
+WRITERS = {'csv': CsvChunkWriter, 'parquet': ParquetChunkWriter}
+
+
+def export_transactions(bank: BankDatabase, file_format: str = 'csv', path: Optional[str] = None,
+                        chunk_size: int = EXPORT_CHUNK_ROWS, **filters) -> Dict[str, Any]:
+    """
+    Écrit l'historique filtré dans `path` (un fichier temporaire par défaut,
+    à supprimer par l'appelant) et renvoie le chemin, le volume et le débit.
+    """
+    if file_format not in EXPORT_FORMATS:
+        raise ValueError(f"Format d'export inconnu: {file_format}")
+    if path is None:
+        handle, path = tempfile.mkstemp(prefix="transactions_", suffix=EXPORT_FORMATS[file_format][0])
+        os.close(handle)
+
+    start = time.perf_counter()
+    rows = 0
+    writer = WRITERS[file_format](path)
+    try:
+        for chunk in bank.iter_transactions(chunk_size, **filters):
+            writer.write(chunk)
+            rows += len(chunk)
+    except BaseException:
+        writer.close()
+        os.remove(path)
+        raise
+    writer.close()
+
+    seconds = time.perf_counter() - start
+    size = os.path.getsize(path)
+    rows_per_s = rows / seconds if seconds else 0.0
+    logger.info(f"Export {file_format}: {rows} lignes, {size / 1024 / 1024:.1f} Mo en {seconds:.1f} s "
+                f"({rows_per_s:,.0f} lignes/s)")
+    return {
+        'path': path,
+        'format': file_format,
+        'rows': rows,
+        'size_bytes': size,
+        'seconds': round(seconds, 2),
+        'rows_per_s': round(rows_per_s, 1),
+    }
+
+
+def main():
+    from mysql_config import MySQLDatabase
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(message)s")
+    day = lambda s: datetime.strptime(s, "%Y-%m-%d").date()
+    parser = argparse.ArgumentParser(description="Exporte l'historique des transactions")
+    parser.add_argument("--format", choices=sorted(EXPORT_FORMATS), default='csv')
+    parser.add_argument("-o", "--output", required=True, help="Fichier à écrire")
+    parser.add_argument("--from", dest="date_from", type=day, help="Premier jour (AAAA-MM-JJ)")
+    parser.add_argument("--to", dest="date_to", type=day, help="Dernier jour inclus (AAAA-MM-JJ)")
+    parser.add_argument("--type", help="deposit ou withdrawal")
+    parser.add_argument("--client-id", type=int)
+    parser.add_argument("--iban")
+    parser.add_argument("--search", default="")
+    parser.add_argument("--chunk-size", type=int, default=EXPORT_CHUNK_ROWS)
+    args = parser.parse_args()
+
+    db = MySQLDatabase()
+    try:
+        report = export_transactions(
+            BankDatabase(db), args.format, args.output, args.chunk_size,
+            date_from=args.date_from, date_to=args.date_to, type=args.type,
+            client_id=args.client_id, iban=args.iban, search=args.search,
+        )
+    finally:
+        db.close()
+    print(f"{report['rows']} lignes exportées dans {report['path']} en {report['seconds']} s "
+          f"({report['rows_per_s']:,.0f} lignes/s)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,34 @@
+# ibans.py
+"""
+Numéros fictifs des comptes : IBAN au format français, espacé comme
+l'application l'enregistre, et numéro de compte interne. Partagés par le
+formulaire de création de compte (main.py) et le générateur de données.
+
+Forme compacte des IBAN, celle de la colonne ibans.iban_key : toute
+recherche d'un IBAN saisi ou importé passe par normalize_iban.
+"""
+import random
+
+
+def normalize_iban(text: str) -> str:
+    """Forme compacte (sans espaces, majuscules) servant à comparer les IBAN"""
+    return ''.join((text or '').split()).upper()
+
+
+def generate_iban(country_code="FR", account_number=None):
+    """IBAN fictif ; `account_number` (11 chiffres) est tiré au hasard s'il n'est pas donné"""
+    bank_code = f"{random.randrange(10 ** 4, 10 ** 5):05d}"
+    branch_code = f"{random.randrange(10 ** 4, 10 ** 5):05d}"
+    account_number = account_number or f"{random.randrange(10 ** 10, 10 ** 11):011d}"
+    national_check = f"{random.randrange(10, 100):02d}"
+
+    # Calcul des chiffres de contrôle IBAN
+    bban = bank_code + branch_code + account_number + national_check + "00"
+    check_digits = 98 - (int(bban) % 97)
+
+    return f"{country_code}{check_digits:02d} {bank_code} {branch_code} {account_number} {national_check}"
+
+
+def generate_account_number():
+    """Numéro de compte interne fictif (C suivi de 10 chiffres)"""
+    return f"C{random.randrange(10 ** 9, 10 ** 10):010d}"
@@ -1,16 +1,25 @@
 import streamlit as st
-from streamlit_option_menu import option_menu
 import pandas as pd
 import plotly.express as px
 from auth import check_authentication
-from database import BankDatabase
-from mysql_config import MySQLDatabase
-from receipt_generator import generate_receipt_pdf
-from faker import Faker
+from database import (get_bank_database, load_kpi_snapshot, DEFAULT_PAGE_SIZE, DEPOSIT, WITHDRAWAL,
+                      TX_OK, TX_INSUFFICIENT_FUNDS)
+from receipt_cache import get_receipt_cache
+from receipt_generator import generate_receipt
+from receipt_batch import generate_receipt_batch
+from statement_generator import generate_statement
+from client_index import get_client_index
+from data_loader import load_concurrently
+from transaction_import import import_transactions
+from export import EXPORT_FORMATS, export_transactions
+from frames import with_units
+from money import Money, format_cents, format_totals
+from ibans import generate_iban, generate_account_number, normalize_iban
 import time
 import base64
+import io
 import os
-from datetime import datetime
+from datetime import date
 
 check_authentication()
 
@@ -22,9 +31,12 @@ st.set_page_config(
     initial_sidebar_state="expanded"
 )
 
-# Initialisation de la base de données
-db = MySQLDatabase()
-fake = Faker()
+# Accès aux données partagé par toutes les sessions (créé une seule fois par processus)
+try:
+    db = get_bank_database()
+except (ConnectionError, RuntimeError):
+    # Base injoignable ou configuration invalide (get_database) : la page s'affiche en mode dégradé
+    db = None
 
 # Style CSS personnalisé
 def local_css(file_name):
@@ -33,24 +45,89 @@ def local_css(file_name):
 
 local_css("assets/styles.css")
 
-# Fonction pour générer un IBAN fictif plus robuste
-def generate_iban(country_code="FR"):
-    # Génération selon le format IBAN français
-    bank_code = f"{fake.random_number(digits=5, fix_len=True):05d}"
-    branch_code = f"{fake.random_number(digits=5, fix_len=True):05d}"
-    account_number = f"{fake.random_number(digits=11, fix_len=True):011d}"
-    national_check = f"{fake.random_number(digits=2, fix_len=True):02d}"
-    
-    # Calcul des chiffres de contrôle IBAN
-    bban = bank_code + branch_code + account_number + national_check + "00"
-    bban_digits = int(bban)
-    check_digits = 98 - (bban_digits % 97)
-    
-    return f"{country_code}{check_digits:02d} {bank_code} {branch_code} {account_number} {national_check}"
+# Pages du menu principal et leur icône ; le menu est un widget Streamlit (clé "menu"),
+# que les exécutions sans navigateur de benchmarks/suite.py sélectionnent comme un utilisateur
+MENU_PAGES = {"Tableau de Bord": "📊", "Gestion Clients": "👥", "Gestion IBAN": "💳",
+              "Transactions": "⇄", "Générer Reçu": "🧾"}
+
+# Types de transaction proposés dans les filtres de l'historique
+TRANSACTION_TYPES = {"Tous": None, "Dépôt": DEPOSIT, "Retrait": WITHDRAWAL}
+
+# Filtres de l'historique, appliqués côté serveur
+def transaction_filters_form(key):
+    with st.expander("Filtres"):
+        col1, col2, col3 = st.columns(3)
+        with col1:
+            date_range = st.date_input("Période", value=(), key=f"{key}_dates")
+            type_label = st.selectbox("Type", list(TRANSACTION_TYPES.keys()), key=f"{key}_type")
+        with col2:
+            client_id = st.number_input("ID Client", min_value=0, step=1, key=f"{key}_client")
+            iban = st.text_input("IBAN", key=f"{key}_iban")
+        with col3:
+            amount_min = st.number_input("Montant minimum", min_value=0.0, value=0.0, step=50.0, key=f"{key}_min")
+            amount_max = st.number_input("Montant maximum", min_value=0.0, value=0.0, step=50.0, key=f"{key}_max")
+
+    return {
+        'date_from': date_range[0] if len(date_range) > 0 else None,
+        'date_to': date_range[1] if len(date_range) > 1 else None,
+        'type': TRANSACTION_TYPES[type_label],
+        'client_id': int(client_id) or None,
+        'iban': normalize_iban(iban) or None,
+        'amount_min': amount_min or None,
+        'amount_max': amount_max or None,
+    }
+
+# Pagination par clé (date, id) : une seule page est chargée à chaque exécution ;
+# `estimate` évite de réestimer le nombre de transactions déjà estimé par la page
+def transaction_pager(key, filters, page_size=DEFAULT_PAGE_SIZE, frame=False, estimate=None):
+    state = st.session_state.setdefault(key, {'filters': None, 'after': None, 'before': None})
+    if state['filters'] != filters:
+        state.update(filters=filters, after=None, before=None)
+
+    page = db.get_transactions_page(page_size, after=state['after'], before=state['before'],
+                                    frame=frame, **filters)
+
+    col1, col2, col3 = st.columns([1, 4, 1])
+    with col1:
+        if st.button("◀ Précédent", key=f"{key}_prev", disabled=not page['has_prev']):
+            state.update(after=None, before=page['first_key'])
+            st.rerun()
+    with col2:
+        if estimate is None:
+            estimate = db.estimate_transactions_count(**filters)
+        st.caption(f"Environ {estimate:,} transactions")
+    with col3:
+        if st.button("Suivant ▶", key=f"{key}_next", disabled=not page['has_next']):
+            state.update(after=page['last_key'], before=None)
+            st.rerun()
 
-# Fonction pour générer un numéro de compte unique
-def generate_account_number():
-    return f"C{fake.random_number(digits=10, fix_len=True):010d}"
+    return page['rows']
+
+# Sélecteur de client avec recherche à la saisie sur l'index partagé en mémoire
+def client_picker(key, label="Rechercher un client"):
+    search_query = st.text_input(label, "", key=f"{key}_search")
+    matches = get_client_index(db).search(search_query)
+    client_options = {f"{c['first_name']} {c['last_name']} (ID: {c['id']})": c['id'] for c in matches}
+    selected_client = st.selectbox("Sélectionner un Client", options=list(client_options.keys()), key=f"{key}_select")
+    return client_options.get(selected_client)
+
+# Total d'un KPI : centimes par devise, ou float d'un instantané antérieur aux centimes
+def format_kpi_total(total):
+    if isinstance(total, dict):
+        return format_totals(total)
+    return f"${total:,.2f}"
+
+# Indicateurs clés du tableau de bord
+def show_kpis(kpis):
+    col1, col2, col3, col4 = st.columns(4)
+    with col1:
+        st.metric("Clients Actifs", kpis['active_clients'], "+5%")
+    with col2:
+        st.metric("Transactions Journalières", kpis['daily_transactions'], "12%")
+    with col3:
+        st.metric("Dépôts Totaux", format_kpi_total(kpis['total_deposits']), "8%")
+    with col4:
+        st.metric("Retraits Totaux", format_kpi_total(kpis['total_withdrawals']), "3%")
 
 # Barre latérale avec le menu
 with st.sidebar:
@@ -63,100 +140,126 @@ with st.sidebar:
             st.session_state['authenticated'] = False
             st.rerun()
     
-    selected = option_menu(
-        menu_title="Menu Principal",
-        options=["Tableau de Bord", "Gestion Clients", "Gestion IBAN", "Transactions", "Générer Reçu"],
-        icons=["speedometer", "people", "credit-card", "arrow-left-right", "receipt"],
-        default_index=0,
-    )
+    selected = st.radio("Menu Principal", list(MENU_PAGES), key="menu",
+                        format_func=lambda page: f"{MENU_PAGES[page]} {page}")
+
+    # Métriques du pool de connexions partagé
+    if db:
+        with st.expander("État du pool de connexions"):
+            st.json(db.db.pool_metrics())
+        with st.expander("État du cache de lecture"):
+            st.json(db.cache.stats())
+        with st.expander("État du cache des reçus"):
+            st.json(get_receipt_cache().stats())
+
+# Mode dégradé : la base est injoignable, on affiche sans attendre les derniers KPI connus
+if db is None or not db.db.is_available():
+    st.warning("Base de données momentanément indisponible. La connexion est rétablie en arrière-plan.")
+    snapshot = load_kpi_snapshot()
+    if snapshot:
+        st.caption(f"Derniers indicateurs connus ({snapshot['updated_at']})")
+        show_kpis(snapshot['kpis'])
+    if st.button("Réessayer"):
+        st.rerun()
+    st.stop()
 
 # Page Tableau de Bord
 if selected == "Tableau de Bord":
     st.title("📊 Tableau de Bord Bancaire")
     
-    # KPI
-    col1, col2, col3, col4 = st.columns(4)
-    with col1:
-        st.metric("Clients Actifs", db.count_active_clients(), "+5%")
-    with col2:
-        st.metric("Transactions Journalières", db.count_daily_transactions(), "12%")
-    with col3:
-        st.metric("Dépôts Totaux", f"${db.total_deposits():,.2f}", "8%")
-    with col4:
-        st.metric("Retraits Totaux", f"${db.total_withdrawals():,.2f}", "3%")
+    # Emplacements remplis au fur et à mesure de l'arrivée des données
+    kpi_panel = st.empty()
     
     # Graphiques
     col1, col2 = st.columns(2)
 
     with col1:
         st.subheader("Dépôts vs Retraits (7 jours)")
-        df_trans = pd.DataFrame(db.get_last_week_transactions())
-        if not df_trans.empty:
-            fig = px.bar(df_trans, x="date", y=["deposit", "withdrawal"], 
-                        barmode="group", color_discrete_sequence=["#4CAF50", "#F44336"])
-            st.plotly_chart(fig, use_container_width=True)
-        else:
-            st.warning("Pas de transactions disponibles pour les 7 derniers jours.")
+        week_panel = st.empty()
 
     with col2:
         st.subheader("Répartition des Clients par Type")
-        data = db.get_clients_by_type()
-        df_clients = pd.DataFrame(data)
-
-        if not df_clients.empty:
-            if len(df_clients.columns) == 2:
-                df_clients.columns = ["Type de Client", "count"]
-
-            fig = px.pie(df_clients, values="count", names="Type de Client", 
-                        color_discrete_sequence=px.colors.qualitative.Pastel)
-            st.plotly_chart(fig, use_container_width=True)
-        else:
-            st.warning("Pas de données clients disponibles.")
+        clients_panel = st.empty()
 
     # Nouveau graphique pour les reçus générés
     st.subheader("Reçus Générés (30 derniers jours)")
-    
-    # Compter les reçus générés (simulation - à adapter avec votre système de stockage)
-    receipts_dir = "receipts"
-    if os.path.exists(receipts_dir):
-        receipt_files = [f for f in os.listdir(receipts_dir) if f.endswith('.pdf')]
-        receipt_dates = [datetime.fromtimestamp(os.path.getmtime(os.path.join(receipts_dir, f))) for f in receipt_files]
-        
-        if receipt_dates:
-            df_receipts = pd.DataFrame({
-                'date': [d.date() for d in receipt_dates],
-                'count': 1
-            })
-            df_receipts = df_receipts.groupby('date').sum().reset_index()
-            
-            fig = px.line(df_receipts, x='date', y='count', 
-                         title="Nombre de reçus générés par jour",
-                         labels={'date': 'Date', 'count': 'Nombre de reçus'},
-                         markers=True)
-            st.plotly_chart(fig, use_container_width=True)
-        else:
-            st.warning("Aucun reçu généré dans les 30 derniers jours.")
-    else:
-        st.warning("Aucun répertoire de reçus trouvé.")
+    receipts_panel = st.empty()
 
     # Dernières transactions avec barre de recherche
     st.subheader("Dernières Transactions")
     
     # Barre de recherche
     search_query = st.text_input("Rechercher dans les transactions", "")
-    
-    transactions = db.get_recent_transactions(50)  # On charge plus de transactions pour la recherche
-    if transactions:
-        df_transactions = pd.DataFrame(transactions)
-        
-        # Filtrage basé sur la recherche
-        if search_query:
-            mask = df_transactions.apply(lambda row: row.astype(str).str.contains(search_query, case=False).any(), axis=1)
-            df_transactions = df_transactions[mask]
-        
-        st.dataframe(df_transactions, use_container_width=True, hide_index=True)
-    else:
-        st.warning("Aucune transaction trouvée.")
+    recent_panel = st.empty()
+
+    # Chargements indépendants exécutés en parallèle, chacun sur sa propre connexion :
+    # la page attend la plus lente des requêtes au lieu de leur somme
+    loaders = {
+        'stats': db.get_dashboard_stats,
+        # Registre des reçus : une requête agrégée au lieu du parcours de receipts/
+        'receipts': db.get_receipt_stats,
+        # Recherche exécutée par la base (index FULLTEXT)
+        'recent': lambda: db.get_recent_transactions(50, search=search_query, frame=True),
+    }
+    for name, data, error in load_concurrently(loaders):
+        if name == 'stats':
+            if error:
+                snapshot = load_kpi_snapshot()
+                with kpi_panel.container():
+                    st.error(f"Indicateurs indisponibles: {error}")
+                    if snapshot:
+                        st.caption(f"Derniers indicateurs connus ({snapshot['updated_at']})")
+                        show_kpis(snapshot['kpis'])
+                week_panel.warning("Données indisponibles.")
+                clients_panel.warning("Données indisponibles.")
+                continue
+
+            # KPI et graphiques issus d'une seule requête sur les agrégats journaliers
+            with kpi_panel.container():
+                show_kpis(data['kpis'])
+
+            df_trans = pd.DataFrame(data['last_week'])
+            if not df_trans.empty:
+                # Centimes -> unités, sur les colonnes entières
+                df_trans[["deposit", "withdrawal"]] = df_trans[["deposit", "withdrawal"]] / 100
+                fig = px.bar(df_trans, x="date", y=["deposit", "withdrawal"], 
+                            barmode="group", color_discrete_sequence=["#4CAF50", "#F44336"])
+                week_panel.plotly_chart(fig, use_container_width=True)
+            else:
+                week_panel.warning("Pas de transactions disponibles pour les 7 derniers jours.")
+
+            df_clients = pd.DataFrame(data['clients_by_type'])
+            if not df_clients.empty:
+                if len(df_clients.columns) == 2:
+                    df_clients.columns = ["Type de Client", "count"]
+
+                fig = px.pie(df_clients, values="count", names="Type de Client", 
+                            color_discrete_sequence=px.colors.qualitative.Pastel)
+                clients_panel.plotly_chart(fig, use_container_width=True)
+            else:
+                clients_panel.warning("Pas de données clients disponibles.")
+
+        elif name == 'receipts':
+            if error:
+                receipts_panel.error(f"Reçus indisponibles: {error}")
+            elif data['by_day']:
+                df_receipts = pd.DataFrame(data['by_day'])
+                
+                fig = px.line(df_receipts, x='date', y='count', 
+                             title="Nombre de reçus générés par jour",
+                             labels={'date': 'Date', 'count': 'Nombre de reçus'},
+                             markers=True)
+                receipts_panel.plotly_chart(fig, use_container_width=True)
+            else:
+                receipts_panel.warning("Aucun reçu généré dans les 30 derniers jours.")
+
+        elif name == 'recent':
+            if error:
+                recent_panel.error(f"Transactions indisponibles: {error}")
+            elif not data.empty:
+                recent_panel.dataframe(with_units(data), use_container_width=True, hide_index=True)
+            else:
+                recent_panel.warning("Aucune transaction trouvée.")
 
 # Page Gestion Clients
 elif selected == "Gestion Clients":
@@ -170,16 +273,12 @@ elif selected == "Gestion Clients":
         # Barre de recherche
         search_query = st.text_input("Rechercher un client", "")
         
-        clients = db.get_all_clients()
-        if clients:
-            df = pd.DataFrame(clients)
-            
-            # Filtrage basé sur la recherche
-            if search_query:
-                mask = df.apply(lambda row: row.astype(str).str.contains(search_query, case=False).any(), axis=1)
-                df = df[mask]
-            
-            st.dataframe(df, use_container_width=True, hide_index=True)
+        page = st.number_input("Page", min_value=1, value=1, step=1, key="clients_list_page")
+        
+        # Recherche exécutée par la base (index FULLTEXT)
+        clients = db.search_clients_frame(search_query, DEFAULT_PAGE_SIZE, (page - 1) * DEFAULT_PAGE_SIZE)
+        if not clients.empty:
+            st.dataframe(clients, use_container_width=True, hide_index=True)
         else:
             st.warning("Aucun client trouvé.")
     
@@ -197,28 +296,20 @@ elif selected == "Gestion Clients":
                 status = st.selectbox("Statut", ["Actif", "Inactif"])
             
             if st.form_submit_button("Ajouter Client"):
-                client_id = db.add_client(
-                    first_name, last_name, email, phone, client_type, status
-                )
-                st.success(f"Client ajouté avec succès! ID: {client_id}")
+                try:
+                    client_id = db.add_client(
+                        first_name, last_name, email, phone, client_type, status
+                    )
+                    st.success(f"Client ajouté avec succès! ID: {client_id}")
+                except ValueError as e:
+                    st.error(str(e))
     
     with tab3:
         st.subheader("Modifier un Client Existant")
-        clients = db.get_all_clients()
-        if clients:
-            # Barre de recherche pour trouver un client
-            search_query = st.text_input("Rechercher un client à modifier", "")
+        if len(get_client_index(db)):
+            client_id = client_picker("update_client", "Rechercher un client à modifier")
             
-            if search_query:
-                filtered_clients = [c for c in clients if search_query.lower() in f"{c['first_name']} {c['last_name']}".lower()]
-            else:
-                filtered_clients = clients
-                
-            client_options = {f"{c['first_name']} {c['last_name']} (ID: {c['id']})": c['id'] for c in filtered_clients}
-            selected_client = st.selectbox("Sélectionner un Client", options=list(client_options.keys()))
-            
-            if selected_client:
-                client_id = client_options[selected_client]
+            if client_id:
                 client_data = db.get_client_by_id(client_id)
                 
                 with st.form("update_client_form"):
@@ -237,13 +328,16 @@ elif selected == "Gestion Clients":
                                                 index=["Actif", "Inactif"].index(client_data['status']))
                     
                     if st.form_submit_button("Mettre à Jour"):
-                        db.update_client(
-                            client_id, new_first_name, new_last_name, 
-                            new_email, new_phone, new_client_type, new_status
-                        )
-                        st.success("Client mis à jour avec succès!")
-                        time.sleep(1)
-                        st.rerun()
+                        try:
+                            db.update_client(
+                                client_id, new_first_name, new_last_name, 
+                                new_email, new_phone, new_client_type, new_status
+                            )
+                            st.success("Client mis à jour avec succès!")
+                            time.sleep(1)
+                            st.rerun()
+                        except ValueError as e:
+                            st.error(str(e))
         else:
             st.warning("Aucun client à modifier.")
 
@@ -251,7 +345,7 @@ elif selected == "Gestion Clients":
 elif selected == "Gestion IBAN":
     st.title("💳 Gestion des IBAN")
     
-    tab1, tab2 = st.tabs(["Liste IBAN", "Associer IBAN"])
+    tab1, tab2, tab3 = st.tabs(["Liste IBAN", "Associer IBAN", "Relevés"])
     
     with tab1:
         st.subheader("Liste des Comptes IBAN")
@@ -259,37 +353,21 @@ elif selected == "Gestion IBAN":
         # Barre de recherche
         search_query = st.text_input("Rechercher un compte IBAN", "")
         
-        ibans = db.get_all_ibans()
-        if ibans:
-            df = pd.DataFrame(ibans)
-            
-            # Filtrage basé sur la recherche
-            if search_query:
-                mask = df.apply(lambda row: row.astype(str).str.contains(search_query, case=False).any(), axis=1)
-                df = df[mask]
-            
-            st.dataframe(df, use_container_width=True, hide_index=True)
+        page = st.number_input("Page", min_value=1, value=1, step=1, key="ibans_list_page")
+        
+        # Recherche exécutée par la base (index FULLTEXT)
+        ibans = db.search_ibans_frame(search_query, DEFAULT_PAGE_SIZE, (page - 1) * DEFAULT_PAGE_SIZE)
+        if not ibans.empty:
+            st.dataframe(with_units(ibans), use_container_width=True, hide_index=True)
         else:
             st.warning("Aucun IBAN trouvé.")
     
     with tab2:
         st.subheader("Associer un IBAN à un Client")
-        clients = db.get_all_clients()
-        if clients:
-            # Barre de recherche pour trouver un client
-            search_query = st.text_input("Rechercher un client", "")
-            
-            if search_query:
-                filtered_clients = [c for c in clients if search_query.lower() in f"{c['first_name']} {c['last_name']}".lower()]
-            else:
-                filtered_clients = clients
-                
-            client_options = {f"{c['first_name']} {c['last_name']} (ID: {c['id']})": c['id'] for c in filtered_clients}
-            selected_client = st.selectbox("Sélectionner un Client", options=list(client_options.keys()))
+        if len(get_client_index(db)):
+            client_id = client_picker("add_iban")
             
-            if selected_client:
-                client_id = client_options[selected_client]
-                
+            if client_id:
                 with st.form("add_iban_form"):
                     col1, col2 = st.columns(2)
                     with col1:
@@ -311,8 +389,51 @@ elif selected == "Gestion IBAN":
                         balance = st.number_input("Solde Initial", min_value=0.0, value=1000.0, step=100.0)
                     
                     if st.form_submit_button("Associer IBAN"):
-                        db.add_iban(client_id, iban, currency, account_type, balance)
-                        st.success("IBAN associé avec succès!")
+                        try:
+                            db.add_iban(client_id, iban, currency, account_type, balance)
+                            st.success("IBAN associé avec succès!")
+                        except ValueError as e:
+                            st.error(str(e))
+        else:
+            st.warning("Aucun client disponible. Veuillez d'abord ajouter des clients.")
+
+    with tab3:
+        st.subheader("Relevé de Compte")
+        if len(get_client_index(db)):
+            client_id = client_picker("statement")
+
+            if client_id:
+                client_ibans = db.get_ibans_by_client(client_id)
+
+                if client_ibans:
+                    iban_options = {i['iban']: i['id'] for i in client_ibans}
+                    selected_iban = st.selectbox("Sélectionner un IBAN", options=list(iban_options.keys()),
+                                                 key="statement_iban")
+                    today = date.today()
+                    period = st.date_input("Période", value=(today.replace(day=1), today), key="statement_period")
+
+                    # Le dernier relevé n'est proposé que pour le compte et la période qui l'ont produit
+                    statement_key = (iban_options[selected_iban], *period)
+
+                    # Soldes calculés par la base, PDF écrit page par page dans statements/
+                    if len(period) == 2 and st.button("Générer le Relevé"):
+                        try:
+                            with st.spinner("Génération du relevé..."):
+                                st.session_state['statement'] = (statement_key,
+                                                                 generate_statement(db, *statement_key))
+                        except ValueError as e:
+                            st.error(str(e))
+
+                    key, statement = st.session_state.get('statement', (None, None))
+                    if key == statement_key and statement and os.path.exists(statement['path']):
+                        st.caption(f"{statement['iban']}: {statement['movements']:,} mouvements, "
+                                   f"{statement['pages']} pages, solde de clôture "
+                                   f"{format_cents(statement['closing_cents'], statement['currency'])}")
+                        with open(statement['path'], 'rb') as f:
+                            st.download_button("Télécharger le Relevé", f, file_name=os.path.basename(statement['path']),
+                                               mime="application/pdf")
+                else:
+                    st.warning("Ce client n'a aucun IBAN associé.")
         else:
             st.warning("Aucun client disponible. Veuillez d'abord ajouter des clients.")
 
@@ -320,50 +441,54 @@ elif selected == "Gestion IBAN":
 elif selected == "Transactions":
     st.title("⇄ Gestion des Transactions")
     
-    tab1, tab2 = st.tabs(["Historique", "Nouvelle Transaction"])
+    tab1, tab2, tab3 = st.tabs(["Historique", "Nouvelle Transaction", "Import de Masse"])
     
     with tab1:
         st.subheader("Historique des Transactions")
         
         # Barre de recherche
         search_query = st.text_input("Rechercher dans les transactions", "")
+        filters = transaction_filters_form("history")
+        filters['search'] = search_query
         
-        transactions = db.get_all_transactions()
-        if transactions:
-            df = pd.DataFrame(transactions)
-            
-            # Filtrage basé sur la recherche
-            if search_query:
-                mask = df.apply(lambda row: row.astype(str).str.contains(search_query, case=False).any(), axis=1)
-                df = df[mask]
-            
-            st.dataframe(df, use_container_width=True, hide_index=True)
+        transactions = transaction_pager("history_page", filters, frame=True)
+        if not transactions.empty:
+            st.dataframe(with_units(transactions), use_container_width=True, hide_index=True)
         else:
             st.warning("Aucune transaction trouvée.")
+
+        # Export complet avec les mêmes filtres, écrit par blocs dans un fichier temporaire
+        with st.expander("Exporter l'historique filtré"):
+            export_format = st.radio("Format", list(EXPORT_FORMATS), horizontal=True,
+                                     format_func=str.upper, key="export_format")
+            if st.button("Préparer l'export"):
+                previous = st.session_state.pop('history_export', None)
+                if previous and os.path.exists(previous['path']):
+                    os.remove(previous['path'])
+                with st.spinner("Export en cours..."):
+                    st.session_state['history_export'] = export_transactions(db, export_format, **filters)
+
+            export = st.session_state.get('history_export')
+            if export and os.path.exists(export['path']):
+                st.caption(f"{export['rows']:,} lignes, {export['size_bytes'] / 1024 / 1024:.1f} Mo "
+                           f"({export['rows_per_s']:,.0f} lignes/s)")
+                extension, mime = EXPORT_FORMATS[export['format']]
+                with open(export['path'], 'rb') as f:
+                    st.download_button("Télécharger", f, file_name=f"transactions{extension}", mime=mime)
     
     with tab2:
         st.subheader("Effectuer une Transaction")
         transaction_type = st.radio("Type de Transaction", ["Dépôt", "Retrait"], horizontal=True)
         
-        clients = db.get_all_clients()
-        if clients:
-            # Barre de recherche pour trouver un client
-            search_query = st.text_input("Rechercher un client", "")
-            
-            if search_query:
-                filtered_clients = [c for c in clients if search_query.lower() in f"{c['first_name']} {c['last_name']}".lower()]
-            else:
-                filtered_clients = clients
-                
-            client_options = {f"{c['first_name']} {c['last_name']} (ID: {c['id']})": c['id'] for c in filtered_clients}
-            selected_client = st.selectbox("Sélectionner un Client", options=list(client_options.keys()))
+        if len(get_client_index(db)):
+            client_id = client_picker("transaction")
             
-            if selected_client:
-                client_id = client_options[selected_client]
+            if client_id:
                 client_ibans = db.get_ibans_by_client(client_id)
                 
                 if client_ibans:
                     iban_options = {i['iban']: i['id'] for i in client_ibans}
+                    iban_currencies = {i['iban']: i['currency'] for i in client_ibans}
                     selected_iban = st.selectbox("Sélectionner un IBAN", options=list(iban_options.keys()))
                     
                     with st.form("transaction_form"):
@@ -372,17 +497,18 @@ elif selected == "Transactions":
                         
                         if st.form_submit_button("Exécuter la Transaction"):
                             iban_id = iban_options[selected_iban]
+                            # Le solde est vérifié par la base au moment du retrait
                             if transaction_type == "Dépôt":
-                                db.deposit(iban_id, amount, description)
-                                st.success(f"Dépôt de ${amount:,.2f} effectué avec succès!")
+                                result = db.deposit(iban_id, amount, description)
                             else:
-                                # Vérifier le solde avant retrait
-                                iban_data = next(i for i in client_ibans if i['id'] == iban_id)
-                                if iban_data['balance'] >= amount:
-                                    db.withdraw(iban_id, amount, description)
-                                    st.success(f"Retrait de ${amount:,.2f} effectué avec succès!")
-                                else:
-                                    st.error("Solde insuffisant pour effectuer ce retrait.")
+                                result = db.withdraw(iban_id, amount, description)
+                            if result['status'] == TX_OK:
+                                st.success(f"{transaction_type} de {Money.of(amount, iban_currencies[selected_iban])} "
+                                           "effectué avec succès!")
+                            elif result['status'] == TX_INSUFFICIENT_FUNDS:
+                                st.error("Solde insuffisant pour effectuer ce retrait.")
+                            else:
+                                st.error("Cet IBAN n'existe plus.")
                             time.sleep(1)
                             st.rerun()
                 else:
@@ -390,29 +516,80 @@ elif selected == "Transactions":
         else:
             st.warning("Aucun client disponible. Veuillez d'abord ajouter des clients.")
 
+    with tab3:
+        st.subheader("Importer un Fichier de Mouvements")
+        st.caption("CSV (iban, type, amount, description, date) ou relevé bancaire (Date;Libellé;Débit;Crédit)")
+        uploaded = st.file_uploader("Fichier", type=["csv", "txt"])
+        file_format = st.radio("Format", ["csv", "statement"], horizontal=True,
+                               format_func=lambda f: "CSV" if f == "csv" else "Relevé bancaire")
+
+        if uploaded is not None and st.button("Lancer l'Import"):
+            rejects = io.StringIO()
+            with st.spinner("Import en cours..."):
+                report = import_transactions(db, io.TextIOWrapper(uploaded, encoding="utf-8-sig", newline=""),
+                                             file_format, rejects=rejects)
+            st.success(f"{report['imported']} mouvements importés sur {report['read']} lignes "
+                       f"en {report['seconds']} s ({report['rows_per_s']:,.0f} lignes/s)")
+            if report['rejected']:
+                st.warning(f"{report['rejected']} lignes rejetées")
+                st.download_button("Télécharger les rejets", rejects.getvalue(),
+                                   file_name=f"rejets_{uploaded.name}", mime="text/csv")
+
 # Page Générer Reçu
 elif selected == "Générer Reçu":
     st.title("🧾 Générer un Reçu")
     
-    # Statistiques des reçus générés
-    receipts_dir = "receipts"
-    if os.path.exists(receipts_dir):
-        receipt_count = len([f for f in os.listdir(receipts_dir) if f.endswith('.pdf')])
-        st.metric("Total des reçus générés", receipt_count)
+    # Statistiques des reçus générés (registre des reçus)
+    st.metric("Total des reçus générés", db.get_receipt_stats()['total'])
     
-    transactions = db.get_all_transactions()
+    # Barre de recherche pour trouver une transaction
+    search_query = st.text_input("Rechercher une transaction", "")
+    filters = transaction_filters_form("receipt")
+    filters['search'] = search_query
+    # Estimation partagée par l'export en masse et la pagination
+    estimate = db.estimate_transactions_count(**filters)
+    
+    # Reçus de toutes les transactions filtrées, rendus en parallèle dans une archive ZIP
+    with st.expander("Reçus en masse (ZIP)"):
+        st.caption(f"Environ {estimate:,} transactions avec les filtres actuels")
+        with st.form("receipt_batch_form"):
+            batch_company = st.text_input("Nom de la Banque", value="Banque Virtuelle", key="batch_company")
+            batch_logo = st.file_uploader("Logo de la Banque", type=["png", "jpg"], key="batch_logo")
+            batch_notes = st.text_area("Notes Additionnelles", value="Merci pour votre confiance.", key="batch_notes")
+            batch_signature = st.checkbox("Inclure une signature", value=True, key="batch_signature")
+            start_batch = st.form_submit_button("Générer les reçus")
+        if start_batch:
+            previous = st.session_state.pop('receipt_batch', None)
+            if previous and os.path.exists(previous['path']):
+                os.remove(previous['path'])
+            progress_bar = st.progress(0.0, text="Préparation...")
+            started = time.perf_counter()
+
+            def show_progress(done, total):
+                rate = done / (time.perf_counter() - started)
+                progress_bar.progress(done / total, text=f"{done:,} / {total:,} reçus ({rate:,.1f} reçus/s)")
+
+            options = {'company_name': batch_company,
+                       'logo': batch_logo.getvalue() if batch_logo else None,
+                       'additional_notes': batch_notes,
+                       'include_signature': batch_signature}
+            st.session_state['receipt_batch'] = generate_receipt_batch(db, options, progress=show_progress,
+                                                                       **filters)
+            progress_bar.empty()
+
+        batch = st.session_state.get('receipt_batch')
+        if batch and os.path.exists(batch['path']):
+            st.caption(f"{batch['receipts']:,} reçus dont {batch['cached']:,} déjà en cache, "
+                       f"{batch['size_bytes'] / 1024 / 1024:.1f} Mo "
+                       f"en {batch['seconds']} s ({batch['receipts_per_s']:,.1f} reçus/s)")
+            with open(batch['path'], 'rb') as f:
+                st.download_button("Télécharger l'archive", f, file_name="recus.zip", mime="application/zip")
+    
+    transactions = transaction_pager("receipt_page", filters, estimate=estimate)
     if transactions:
-        # Barre de recherche pour trouver une transaction
-        search_query = st.text_input("Rechercher une transaction", "")
-        
-        if search_query:
-            filtered_transactions = [t for t in transactions if search_query.lower() in str(t).lower()]
-        else:
-            filtered_transactions = transactions
-            
         transaction_options = {
-            f"Transaction #{t['id']} - {t['type']} de ${t['amount']} le {t['date']}": t['id'] 
-            for t in filtered_transactions
+            f"Transaction #{t['id']} - {t['type']} de {t['amount']} le {t['date']}": t['id'] 
+            for t in transactions
         }
         selected_transaction = st.selectbox(
             "Sélectionner une Transaction", 
@@ -437,7 +614,7 @@ elif selected == "Générer Reçu":
                 with col2:
                     st.subheader("Détails Transaction")
                     st.write(f"**Type:** {transaction_data['type']}")
-                    st.write(f"**Montant:** ${transaction_data['amount']:,.2f}")
+                    st.write(f"**Montant:** {transaction_data['amount']}")
                     st.write(f"**Date:** {transaction_data['date']}")
                     st.write(f"**IBAN:** {iban_data['iban']}")
                     st.write(f"**Description:** {transaction_data['description']}")
@@ -456,29 +633,27 @@ elif selected == "Générer Reçu":
                     include_signature = st.checkbox("Inclure une signature", value=True)
                 
                 if st.form_submit_button("Générer le Reçu"):
-                    # Chemin temporaire pour le logo
-                    logo_path = "assets/logo.png"
-                    if company_logo:
-                        with open(logo_path, "wb") as f:
-                            f.write(company_logo.getbuffer())
-                    
-                    # Générer le PDF
-                    pdf_path = generate_receipt_pdf(
-                        transaction_data=transaction_data,
-                        client_data=client_data,
-                        iban_data=iban_data,
+                    # Reçu déjà produit avec les mêmes données et options : relu depuis le cache, sans ReportLab ;
+                    # inscrit au registre des reçus lu par le tableau de bord
+                    receipt = generate_receipt(
+                        transaction_data,
+                        client_data,
+                        iban_data,
+                        bank=db,
                         company_name=company_name,
-                        logo_path=logo_path if company_logo else None,
+                        logo=company_logo.getvalue() if company_logo else None,
                         receipt_title=receipt_title,
                         additional_notes=additional_notes,
                         include_signature=include_signature
                     )
+                    pdf_data = receipt['pdf']
+                    cache_stats = get_receipt_cache().stats()
+                    st.caption(f"{'Reçu servi depuis le cache' if receipt['cached'] else 'Reçu généré'} "
+                               f"(taux de succès du cache: {cache_stats['hit_ratio']:.0%})")
                     
-                    # Téléchargement du PDF
-                    with open(pdf_path, "rb") as f:
-                        pdf_data = f.read()
+                    # Téléchargement du PDF (lien direct : st.download_button n'est pas admis dans un formulaire)
                     b64 = base64.b64encode(pdf_data).decode()
-                    href = f'<a href="data:application/octet-stream;base64,{b64}" download="receipt_{transaction_id}.pdf">Télécharger le Reçu</a>'
+                    href = f'<a href="data:application/pdf;base64,{b64}" download="receipt_{transaction_id}.pdf">Télécharger le Reçu</a>'
                     st.markdown(href, unsafe_allow_html=True)
                     
                     # Aperçu du PDF
@@ -486,6 +661,7 @@ elif selected == "Générer Reçu":
                     st.write("Aperçu du reçu (les couleurs et polices peuvent varier dans le PDF final):")
                     
                     # Simulation d'aperçu
+                    notes_html = additional_notes.replace('\n', '<br>')
                     with st.container():
                         st.markdown(f"""
                         <div class="receipt-preview">
@@ -503,12 +679,12 @@ elif selected == "Générer Reçu":
                                 <div class="receipt-section">
                                     <h3>Détails de la Transaction</h3>
                                     <p><strong>Type:</strong> {transaction_data['type']}</p>
-                                    <p><strong>Montant:</strong> ${transaction_data['amount']:,.2f}</p>
+                                    <p><strong>Montant:</strong> {transaction_data['amount']}</p>
                                     <p><strong>Date:</strong> {transaction_data['date']}</p>
                                     <p><strong>Référence:</strong> {transaction_id}</p>
                                 </div>
                                 <div class="receipt-notes">
-                                    <p>{additional_notes.replace('\n', '<br>')}</p>
+                                    <p>{notes_html}</p>
                                 </div>
                                 {'''<div class="receipt-signature">
                                     <p>Signature</p>
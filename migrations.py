@@ -0,0 +1,554 @@
+# migrations.py
+"""
+Migrations versionnées du schéma.
+
+Chaque migration a un numéro, un nom et une fonction qui reçoit un curseur.
+Les numéros appliqués sont enregistrés dans schema_migrations ; migrate()
+applique dans l'ordre celles qui manquent, sous un verrou nommé MySQL pour
+que deux processus qui démarrent ensemble ne migrent pas en même temps.
+Le DDL MySQL n'étant pas transactionnel, chaque étape vérifie l'existant
+avant d'agir : une migration interrompue peut être relancée sans risque.
+
+    python migrations.py            # applique les migrations en attente
+    python migrations.py --status   # liste les migrations et leur état
+    python migrations.py --explain  # vérifie les index des requêtes fréquentes
+"""
+import argparse
+import logging
+import os
+import re
+import threading
+import time
+import weakref
+from datetime import date, datetime
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from mysql.connector import Error, errorcode
+
+from partitions import PARTITIONS_AHEAD, add_months, month_range, month_start, partition_definitions
+
+logger = logging.getLogger(__name__)
+
+# Verrou nommé pris pendant l'application des migrations
+LOCK_NAME = 'ecocapital_schema_migrations'
+LOCK_TIMEOUT = 60
+
+# Bases dont le schéma a déjà été vérifié par ce processus
+_checked = weakref.WeakSet()
+_checked_lock = threading.Lock()
+
+# Index FULLTEXT du schéma d'origine, ajoutés par 001 aux bases créées avant la recherche
+_001_FULLTEXT_INDEXES = [
+    ('clients', 'ft_clients_search', 'first_name, last_name, email'),
+    ('ibans', 'ft_ibans_iban', 'iban'),
+    ('transactions', 'ft_transactions_description', 'description'),
+]
+
+
+def _index_columns(cursor, table: str) -> Dict[str, List[str]]:
+    """Index de la table et leurs colonnes, dans l'ordre"""
+    cursor.execute('''
+        SELECT INDEX_NAME, COLUMN_NAME FROM information_schema.STATISTICS
+        WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = %s
+        ORDER BY INDEX_NAME, SEQ_IN_INDEX
+    ''', (table,))
+    indexes: Dict[str, List[str]] = {}
+    for name, column in cursor.fetchall():
+        indexes.setdefault(name, []).append(column)
+    return indexes
+
+
+def _add_index(cursor, table: str, name: str, columns: str):
+    if name not in _index_columns(cursor, table):
+        logger.info(f"Création de l'index {name} sur {table} ({columns})")
+        cursor.execute(f"ALTER TABLE {table} ADD INDEX {name} ({columns})")
+
+
+def _drop_redundant_index(cursor, table: str, name: str, column: str):
+    """Supprime l'index créé d'office pour une clé étrangère, une fois couvert par un index composite"""
+    if _index_columns(cursor, table).get(name) == [column]:
+        logger.info(f"Suppression de l'index redondant {name} sur {table}")
+        cursor.execute(f"ALTER TABLE {table} DROP INDEX {name}")
+
+
+# ----------------------------------------------------------------------
+# Migrations
+# ----------------------------------------------------------------------
+
+def _001_base_tables(cursor):
+    """Tables métier, recherche plein texte et agrégats journaliers (schéma antérieur aux migrations)"""
+    cursor.execute('''
+    CREATE TABLE IF NOT EXISTS clients (
+        id INT AUTO_INCREMENT PRIMARY KEY,
+        first_name VARCHAR(255) NOT NULL,
+        last_name VARCHAR(255) NOT NULL,
+        email VARCHAR(255) UNIQUE,
+        phone VARCHAR(50),
+        type VARCHAR(50),
+        status VARCHAR(50),
+        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        FULLTEXT KEY ft_clients_search (first_name, last_name, email)
+    ) ENGINE=InnoDB
+    ''')
+    cursor.execute('''
+    CREATE TABLE IF NOT EXISTS ibans (
+        id INT AUTO_INCREMENT PRIMARY KEY,
+        client_id INT NOT NULL,
+        iban VARCHAR(34) UNIQUE NOT NULL,
+        currency VARCHAR(3),
+        type VARCHAR(50),
+        balance DECIMAL(15,2) DEFAULT 0,
+        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        FULLTEXT KEY ft_ibans_iban (iban),
+        FOREIGN KEY (client_id) REFERENCES clients (id) ON DELETE CASCADE
+    ) ENGINE=InnoDB
+    ''')
+    cursor.execute('''
+    CREATE TABLE IF NOT EXISTS transactions (
+        id INT AUTO_INCREMENT PRIMARY KEY,
+        iban_id INT NOT NULL,
+        client_id INT NOT NULL,
+        type VARCHAR(50) NOT NULL,
+        amount DECIMAL(15,2) NOT NULL,
+        description TEXT,
+        date TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        FULLTEXT KEY ft_transactions_description (description),
+        FOREIGN KEY (iban_id) REFERENCES ibans (id) ON DELETE CASCADE,
+        FOREIGN KEY (client_id) REFERENCES clients (id) ON DELETE CASCADE
+    ) ENGINE=InnoDB
+    ''')
+    # Agrégats journaliers maintenus par deposit/withdraw, répartis sur plusieurs lignes (slot)
+    cursor.execute('''
+    CREATE TABLE IF NOT EXISTS daily_stats (
+        stat_date DATE NOT NULL,
+        currency VARCHAR(3) NOT NULL,
+        type VARCHAR(50) NOT NULL,
+        slot TINYINT UNSIGNED NOT NULL DEFAULT 0,
+        tx_count INT NOT NULL DEFAULT 0,
+        total_amount DECIMAL(20,2) NOT NULL DEFAULT 0,
+        PRIMARY KEY (stat_date, currency, type, slot)
+    ) ENGINE=InnoDB
+    ''')
+    cursor.execute('''
+    CREATE TABLE IF NOT EXISTS users (
+        id INT AUTO_INCREMENT PRIMARY KEY,
+        username VARCHAR(255) UNIQUE NOT NULL,
+        email VARCHAR(255) UNIQUE NOT NULL,
+        password_hash VARCHAR(255) NOT NULL,
+        role VARCHAR(50) DEFAULT 'user',
+        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    ) ENGINE=InnoDB
+    ''')
+
+    # Bases créées avant la recherche plein texte ou la répartition des agrégats
+    cursor.execute('''
+        SELECT DISTINCT INDEX_NAME FROM information_schema.STATISTICS
+        WHERE TABLE_SCHEMA = DATABASE() AND INDEX_TYPE = 'FULLTEXT'
+    ''')
+    existing = {row[0] for row in cursor.fetchall()}
+    for table, name, columns in _001_FULLTEXT_INDEXES:
+        if name not in existing:
+            logger.info(f"Création de l'index {name} sur {table}")
+            cursor.execute(f"ALTER TABLE {table} ADD FULLTEXT INDEX {name} ({columns})")
+
+    cursor.execute('''
+        SELECT COUNT(*) FROM information_schema.COLUMNS
+        WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = 'daily_stats' AND COLUMN_NAME = 'slot'
+    ''')
+    if not cursor.fetchone()[0]:
+        logger.info("Ajout de la colonne slot à daily_stats")
+        cursor.execute('''
+            ALTER TABLE daily_stats
+            ADD COLUMN slot TINYINT UNSIGNED NOT NULL DEFAULT 0 AFTER type,
+            DROP PRIMARY KEY,
+            ADD PRIMARY KEY (stat_date, currency, type, slot)
+        ''')
+
+
+def _002_hot_query_indexes(cursor):
+    """
+    Index des requêtes fréquentes : l'historique trié par date (seul ou filtré
+    par client ou par IBAN) et la répartition des clients par statut et type.
+    L'id étant la clé primaire, chaque index secondaire se termine
+    implicitement par id : (date) sert donc le tri (date, id) de la pagination.
+    """
+    _add_index(cursor, 'transactions', 'idx_transactions_date', 'date')
+    _add_index(cursor, 'transactions', 'idx_transactions_client_date', 'client_id, date')
+    _add_index(cursor, 'transactions', 'idx_transactions_iban_date', 'iban_id, date')
+    _add_index(cursor, 'clients', 'idx_clients_status_type', 'status, type')
+    # Les index créés d'office pour les clés étrangères sont désormais des préfixes inutiles
+    _drop_redundant_index(cursor, 'transactions', 'client_id', 'client_id')
+    _drop_redundant_index(cursor, 'transactions', 'iban_id', 'iban_id')
+
+
+def _003_partition_transactions(cursor):
+    """
+    Partitionnement mensuel de transactions (voir partitions.py).
+
+    MySQL n'admet ni clé étrangère ni index FULLTEXT sur une table
+    partitionnée, et exige la colonne de partitionnement dans la clé
+    primaire. La recherche dans les descriptions passe donc par
+    transaction_texts, alimentée par un trigger ; les clés étrangères sont
+    supprimées (aucun client ni IBAN n'est jamais supprimé par l'application ;
+    les dépôts et retraits passent par INSERT ... SELECT FROM ibans, l'import
+    de relevés insère des comptes lus et verrouillés dans la même
+    transaction, le générateur de données les comptes qu'il vient de créer) ;
+    la clé primaire devient (id, date). La conversion recopie la table une fois.
+    """
+    cursor.execute('''
+    CREATE TABLE IF NOT EXISTS transaction_texts (
+        transaction_id INT PRIMARY KEY,
+        description TEXT,
+        FULLTEXT KEY ft_transaction_texts_description (description)
+    ) ENGINE=InnoDB
+    ''')
+    cursor.execute('''
+    CREATE TABLE IF NOT EXISTS transaction_archives (
+        month DATE PRIMARY KEY,
+        path VARCHAR(500) NOT NULL,
+        row_count INT NOT NULL,
+        size_bytes BIGINT NOT NULL,
+        archived_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    ) ENGINE=InnoDB
+    ''')
+    cursor.execute('''
+        SELECT COUNT(*) FROM information_schema.TRIGGERS
+        WHERE TRIGGER_SCHEMA = DATABASE() AND TRIGGER_NAME = 'trg_transactions_texts'
+    ''')
+    if not cursor.fetchone()[0]:
+        # Trigger créé avant la recopie : aucune insertion concurrente n'est perdue
+        cursor.execute('''
+            CREATE TRIGGER trg_transactions_texts AFTER INSERT ON transactions FOR EACH ROW
+            INSERT INTO transaction_texts (transaction_id, description) VALUES (NEW.id, NEW.description)
+        ''')
+    cursor.execute('''
+        INSERT IGNORE INTO transaction_texts (transaction_id, description)
+        SELECT id, description FROM transactions
+    ''')
+
+    cursor.execute('''
+        SELECT COUNT(*) FROM information_schema.PARTITIONS
+        WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = 'transactions' AND PARTITION_NAME IS NOT NULL
+    ''')
+    if cursor.fetchone()[0]:
+        return
+
+    cursor.execute('''
+        SELECT CONSTRAINT_NAME FROM information_schema.TABLE_CONSTRAINTS
+        WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = 'transactions' AND CONSTRAINT_TYPE = 'FOREIGN KEY'
+    ''')
+    foreign_keys = [row[0] for row in cursor.fetchall()]
+    if foreign_keys:
+        logger.info(f"Suppression des clés étrangères de transactions: {', '.join(foreign_keys)}")
+        cursor.execute(f"ALTER TABLE transactions {', '.join(f'DROP FOREIGN KEY {fk}' for fk in foreign_keys)}")
+    if 'ft_transactions_description' in _index_columns(cursor, 'transactions'):
+        cursor.execute("ALTER TABLE transactions DROP INDEX ft_transactions_description")
+
+    cursor.execute("UPDATE transactions SET date = CURRENT_TIMESTAMP WHERE date IS NULL")
+    cursor.execute("SELECT MIN(date) FROM transactions")
+    first = cursor.fetchone()[0] or date.today()
+    months = month_range(month_start(first), add_months(month_start(date.today()), PARTITIONS_AHEAD))
+    logger.info(f"Partitionnement de transactions en {len(months)} mois")
+    cursor.execute(f'''
+        ALTER TABLE transactions
+        MODIFY date TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+        DROP PRIMARY KEY,
+        ADD PRIMARY KEY (id, date)
+        PARTITION BY RANGE (UNIX_TIMESTAMP(date)) ({partition_definitions(months)})
+    ''')
+
+
+def _004_receipts(cursor):
+    """
+    Registre des reçus générés, lu par le tableau de bord à la place du
+    parcours du répertoire receipts/. Un reçu par transaction et jeu
+    d'options de rendu ; created_at est indexé pour la série par jour. Les
+    reçus receipt_<id>.pdf déjà présents dans le répertoire local sont
+    inscrits avec la date de leur fichier (options inconnues : empreinte vide).
+    """
+    cursor.execute('''
+    CREATE TABLE IF NOT EXISTS receipts (
+        id BIGINT AUTO_INCREMENT PRIMARY KEY,
+        transaction_id INT NOT NULL,
+        options_hash CHAR(64) NOT NULL,
+        size_bytes INT NOT NULL,
+        storage_path VARCHAR(500) NOT NULL,
+        created_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+        UNIQUE KEY uq_receipts_transaction_options (transaction_id, options_hash),
+        KEY idx_receipts_created_at (created_at)
+    ) ENGINE=InnoDB
+    ''')
+    receipts_dir = os.getenv("RECEIPTS_DIR", "receipts")
+    if not os.path.isdir(receipts_dir):
+        return
+    existing = []
+    with os.scandir(receipts_dir) as files:
+        for entry in files:
+            match = re.fullmatch(r'receipt_(\d+)\.pdf', entry.name)
+            if match:
+                stat = entry.stat()
+                existing.append((int(match.group(1)), '', stat.st_size, entry.path,
+                                 datetime.fromtimestamp(stat.st_mtime)))
+    if existing:
+        logger.info(f"Inscription de {len(existing)} reçus existants au registre")
+        cursor.executemany('''
+            INSERT IGNORE INTO receipts (transaction_id, options_hash, size_bytes, storage_path, created_at)
+            VALUES (%s, %s, %s, %s, %s)
+        ''', existing)
+
+
+def _005_iban_key(cursor):
+    """
+    Forme compacte de l'IBAN (majuscules, sans espaces) en colonne générée,
+    avec un index unique. L'application enregistre les IBAN espacés par
+    groupes de quatre, les fichiers d'import les donnent sous toutes les
+    formes : les recherches et le contrôle des doublons portent sur iban_key.
+    Des IBAN déjà enregistrés en double sous deux formes différentes
+    bloquent la migration : ils sont à fusionner à la main.
+    """
+    cursor.execute('''
+        SELECT COUNT(*) FROM information_schema.COLUMNS
+        WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = 'ibans' AND COLUMN_NAME = 'iban_key'
+    ''')
+    if not cursor.fetchone()[0]:
+        logger.info("Ajout de la colonne iban_key à ibans")
+        cursor.execute('''
+            ALTER TABLE ibans
+            ADD COLUMN iban_key VARCHAR(34) AS (REPLACE(UPPER(iban), ' ', '')) STORED AFTER iban
+        ''')
+    if 'uq_ibans_iban_key' in _index_columns(cursor, 'ibans'):
+        return
+    cursor.execute('''
+        SELECT iban_key, GROUP_CONCAT(id ORDER BY id) FROM ibans
+        GROUP BY iban_key HAVING COUNT(*) > 1 LIMIT 10
+    ''')
+    duplicates = cursor.fetchall()
+    if duplicates:
+        raise RuntimeError("IBAN enregistrés en double sous des formes différentes (iban_key: id): "
+                           + ", ".join(f"{key}: {ids}" for key, ids in duplicates))
+    logger.info("Création de l'index uq_ibans_iban_key sur ibans (iban_key)")
+    cursor.execute("ALTER TABLE ibans ADD UNIQUE INDEX uq_ibans_iban_key (iban_key)")
+
+
+# (numéro, nom, fonction) ; ne jamais renuméroter ni modifier une migration publiée
+MIGRATIONS: List[Tuple[int, str, Callable[[Any], None]]] = [
+    (1, 'base_tables', _001_base_tables),
+    (2, 'hot_query_indexes', _002_hot_query_indexes),
+    (3, 'partition_transactions', _003_partition_transactions),
+    (4, 'receipts', _004_receipts),
+    (5, 'iban_key', _005_iban_key),
+]
+
+LATEST_VERSION = MIGRATIONS[-1][0]
+
+
+# ----------------------------------------------------------------------
+# Exécution
+# ----------------------------------------------------------------------
+
+def _ensure_migrations_table(cursor):
+    cursor.execute('''
+    CREATE TABLE IF NOT EXISTS schema_migrations (
+        version INT PRIMARY KEY,
+        name VARCHAR(100) NOT NULL,
+        duration_ms INT NOT NULL DEFAULT 0,
+        applied_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    ) ENGINE=InnoDB
+    ''')
+
+
+def migrate(db, target: Optional[int] = None) -> List[int]:
+    """Applique les migrations en attente (jusqu'à `target`) et renvoie les numéros appliqués"""
+    applied_now = []
+    with db.connection() as conn:
+        cursor = conn.cursor()
+        try:
+            cursor.execute("SELECT GET_LOCK(%s, %s)", (LOCK_NAME, LOCK_TIMEOUT))
+            if cursor.fetchone()[0] != 1:
+                raise RuntimeError(f"Verrou {LOCK_NAME} indisponible après {LOCK_TIMEOUT} s")
+            try:
+                _ensure_migrations_table(cursor)
+                cursor.execute("SELECT version FROM schema_migrations")
+                applied = {row[0] for row in cursor.fetchall()}
+                for version, name, apply in MIGRATIONS:
+                    if version in applied or (target is not None and version > target):
+                        continue
+                    logger.info(f"Migration {version:03d} {name}...")
+                    start = time.perf_counter()
+                    apply(cursor)
+                    duration_ms = int((time.perf_counter() - start) * 1000)
+                    cursor.execute(
+                        "INSERT INTO schema_migrations (version, name, duration_ms) VALUES (%s, %s, %s)",
+                        (version, name, duration_ms)
+                    )
+                    conn.commit()
+                    applied_now.append(version)
+                    logger.info(f"Migration {version:03d} {name} appliquée en {duration_ms} ms")
+            finally:
+                cursor.execute("SELECT RELEASE_LOCK(%s)", (LOCK_NAME,))
+                cursor.fetchall()
+        finally:
+            cursor.close()
+    return applied_now
+
+
+def schema_version(db) -> int:
+    """Dernière migration appliquée (0 si la base n'a jamais été migrée), sans DDL"""
+    with db.connection() as conn:
+        cursor = conn.cursor()
+        try:
+            cursor.execute("SELECT MAX(version) FROM schema_migrations")
+            return cursor.fetchone()[0] or 0
+        except Error as e:
+            if e.errno == errorcode.ER_NO_SUCH_TABLE:
+                return 0
+            raise
+        finally:
+            cursor.close()
+
+
+def ensure_schema(db) -> None:
+    """
+    Vérifie une seule fois par processus et par service de base que le schéma
+    est à jour, sans jamais le migrer.
+
+    Ce contrôle est sur le chemin de la page de connexion : il ne lit que le
+    numéro de version. Les migrations, qui prennent des verrous de
+    métadonnées, sont appliquées par `python migrations.py` ou
+    create_tables.py lors du déploiement. Un schéma en retard lève
+    RuntimeError : l'application passe en mode dégradé.
+    """
+    if db in _checked:
+        return
+    with _checked_lock:
+        if db in _checked:
+            return
+        version = schema_version(db)
+        if version < LATEST_VERSION:
+            logger.error(f"Schéma en version {version}, version {LATEST_VERSION} attendue : "
+                         f"appliquez les migrations (python migrations.py)")
+            raise RuntimeError(f"Schéma de la base en version {version}, migrations en attente")
+        _checked.add(db)
+
+
+def migration_status(db) -> List[Dict[str, Any]]:
+    """Toutes les migrations connues, avec leur date d'application (None si en attente)"""
+    with db.connection() as conn:
+        cursor = conn.cursor()
+        try:
+            _ensure_migrations_table(cursor)
+            cursor.execute("SELECT version, applied_at, duration_ms FROM schema_migrations")
+            applied = {version: (applied_at, duration_ms) for version, applied_at, duration_ms in cursor.fetchall()}
+        finally:
+            cursor.close()
+    return [
+        {'version': version, 'name': name,
+         'applied_at': applied.get(version, (None, None))[0],
+         'duration_ms': applied.get(version, (None, None))[1]}
+        for version, name, _ in MIGRATIONS
+    ]
+
+
+# ----------------------------------------------------------------------
+# Vérification des plans d'exécution
+# ----------------------------------------------------------------------
+
+def hot_queries() -> List[Tuple[str, str, Tuple, str, Optional[set]]]:
+    """
+    Requêtes fréquentes de l'application : (nom, requête, paramètres, table
+    du plan à contrôler, index attendus). None accepte n'importe quel index.
+    """
+    from database import (DEPOSIT, RECEIPT_STATS_DAYS, RECEIPT_STATS_QUERY, STATEMENT_BALANCE,
+                          TRANSACTION_COLUMNS, TRANSACTION_JOINS)
+
+    now = datetime.now()
+    history = f"SELECT {TRANSACTION_COLUMNS} {TRANSACTION_JOINS}"
+    order = "ORDER BY t.date DESC, t.id DESC LIMIT 51"
+    by_date = {'idx_transactions_date'}
+    return [
+        ('history.first_page', f"{history} {order}", (), 't', by_date),
+        ('history.next_page', f"{history} WHERE (t.date < %s OR (t.date = %s AND t.id < %s)) {order}",
+         (now, now, 2 ** 31 - 1), 't', by_date),
+        ('history.date_range', f"{history} WHERE t.date >= %s AND t.date < %s + INTERVAL 1 DAY {order}",
+         (now.date(), now.date()), 't', by_date),
+        ('history.client', f"{history} WHERE t.client_id = %s {order}", (1,), 't',
+         {'idx_transactions_client_date'}),
+        ('history.iban', f"{history} WHERE t.iban_id = %s {order}", (1,), 't',
+         {'idx_transactions_iban_date'}),
+        ('daily_stats.rebuild', "SELECT COUNT(*) FROM transactions t WHERE t.date >= %s",
+         (now.date(),), 't', by_date),
+        ('receipt.transaction', "SELECT * FROM transactions WHERE id = %s", (1,), 'transactions', {'PRIMARY'}),
+        ('dashboard.active_clients', "SELECT COUNT(*) FROM clients WHERE status = 'Actif'", (),
+         'clients', {'idx_clients_status_type'}),
+        ('dashboard.clients_by_type', "SELECT type, status, COUNT(*) FROM clients GROUP BY type, status", (),
+         'clients', {'idx_clients_status_type'}),
+        ('dashboard.last_week', "SELECT SUM(total_amount) FROM daily_stats "
+                                "WHERE stat_date >= CURDATE() - INTERVAL 6 DAY AND type = %s",
+         (DEPOSIT,), 'daily_stats', {'PRIMARY'}),
+        ('dashboard.receipts', RECEIPT_STATS_QUERY, (RECEIPT_STATS_DAYS - 1,), 'receipts',
+         {'idx_receipts_created_at'}),
+        ('statement.rows', f"SELECT t.id, {STATEMENT_BALANCE} FROM transactions t "
+                           "WHERE t.iban_id = %s AND t.date >= %s AND t.date < %s + INTERVAL 1 DAY ORDER BY t.date, t.id",
+         (0, DEPOSIT, 1, now.date(), now.date()), 't', {'idx_transactions_iban_date'}),
+        ('ibans.by_client', "SELECT * FROM ibans WHERE client_id = %s", (1,), 'ibans', None),
+        ('ibans.by_key', "SELECT id, client_id FROM ibans WHERE iban_key IN (%s, %s)",
+         ('FR7630006000011234567890189', 'FR7610107001011234567890129'), 'ibans', {'uq_ibans_iban_key'}),
+    ]
+
+
+def explain_hot_queries(db) -> List[Dict[str, Any]]:
+    """
+    Plan (EXPLAIN) de chaque requête fréquente et son verdict : l'accès à la
+    table contrôlée doit passer par un des index attendus, sans parcours
+    complet. Sur une table presque vide l'optimiseur préfère souvent le
+    parcours complet : la vérification n'a de sens que sur des données réalistes.
+    """
+    report = []
+    with db.connection() as conn:
+        cursor = conn.cursor(dictionary=True)
+        try:
+            for name, query, params, table, expected in hot_queries():
+                cursor.execute(f"EXPLAIN {query}", params)
+                plan = cursor.fetchall()
+                step = next((row for row in plan if row['table'] == table), plan[0])
+                key = step.get('key')
+                ok = step.get('type') != 'ALL' and key is not None and (expected is None or key in expected)
+                report.append({
+                    'name': name, 'table': table, 'access': step.get('type'), 'key': key,
+                    'expected': sorted(expected) if expected else None, 'rows': step.get('rows'),
+                    'extra': step.get('Extra'), 'ok': ok,
+                })
+        finally:
+            cursor.close()
+    return report
+
+
+if __name__ == "__main__":
+    from mysql_config import MySQLDatabase
+
+    parser = argparse.ArgumentParser(description="Migrations versionnées du schéma")
+    parser.add_argument("--status", action="store_true", help="Affiche l'état des migrations sans rien appliquer")
+    parser.add_argument("--target", type=int, help="Dernière migration à appliquer")
+    parser.add_argument("--explain", action="store_true", help="Vérifie les index utilisés par les requêtes fréquentes")
+    args = parser.parse_args()
+
+    db = MySQLDatabase()
+    try:
+        if args.status:
+            for item in migration_status(db):
+                state = f"appliquée le {item['applied_at']} ({item['duration_ms']} ms)" if item['applied_at'] else "en attente"
+                print(f"{item['version']:03d} {item['name']:<25} {state}")
+        elif not args.explain:
+            applied = migrate(db, args.target)
+            print(f"Migrations appliquées: {', '.join(f'{v:03d}' for v in applied)}" if applied
+                  else "Schéma à jour")
+        if args.explain:
+            failures = 0
+            for item in explain_hot_queries(db):
+                failures += not item['ok']
+                print(f"{'OK ' if item['ok'] else 'KO '} {item['name']:<28} {item['access'] or '-':<7} "
+                      f"index={item['key']} lignes≈{item['rows']} {item['extra'] or ''}")
+            if failures:
+                raise SystemExit(f"{failures} requête(s) sans l'index attendu")
+    finally:
+        db.close()
@@ -0,0 +1,149 @@
+# money.py
+"""
+Montants en centimes entiers, accompagnés de leur devise ISO 4217.
+
+Les colonnes DECIMAL(15,2) sont lues directement en centimes
+(CAST(montant * 100 AS SIGNED)) : les totaux, comparaisons et agrégats
+DataFrame se font sur des entiers, exacts et vectorisables, sans Decimal ni
+float entre la base et l'affichage. Les saisies (float de st.number_input,
+Decimal d'un import, chaîne) sont converties une seule fois par to_cents,
+arrondies au demi supérieur ; les paramètres SQL repassent en
+Decimal par cents_to_decimal, sans perte.
+
+Les DataFrames portent les colonnes `amount_cents` / `balance_cents` (int64)
+et la colonne `currency` ; les dictionnaires portent un Money.
+"""
+from decimal import Decimal, InvalidOperation, ROUND_HALF_UP
+from typing import Mapping, Union
+
+# Devise des lignes sans compte (statistiques, mouvements orphelins)
+NO_CURRENCY = 'XXX'
+
+_CENT = Decimal("0.01")
+
+
+def to_cents(value: Union['Money', int, float, Decimal, str]) -> int:
+    """Centimes entiers d'un montant saisi en unités (int, float, Decimal ou chaîne)"""
+    if isinstance(value, Money):
+        return value.cents
+    if isinstance(value, bool):
+        raise ValueError(f"Montant invalide: {value!r}")
+    if isinstance(value, int):
+        return value * 100
+    try:
+        # repr d'un float est sa plus courte écriture décimale : 0.1 donne 10 centimes
+        amount = Decimal(repr(value)) if isinstance(value, float) else Decimal(value)
+    except (InvalidOperation, TypeError, ValueError):
+        raise ValueError(f"Montant invalide: {value!r}")
+    if not amount.is_finite():
+        raise ValueError(f"Montant invalide: {value!r}")
+    return int(amount.quantize(_CENT, rounding=ROUND_HALF_UP).scaleb(2))
+
+
+def cents_to_decimal(cents: int) -> Decimal:
+    """Decimal à deux décimales, pour les paramètres des colonnes DECIMAL(15,2)"""
+    return Decimal(cents).scaleb(-2)
+
+
+def format_cents(cents: int, currency: str = '') -> str:
+    """1234567 -> '12,345.67 EUR'"""
+    sign = '-' if cents < 0 else ''
+    units, rest = divmod(abs(cents), 100)
+    text = f"{sign}{units:,}.{rest:02d}"
+    return f"{text} {currency}" if currency else text
+
+
+def format_totals(totals: Mapping[str, int]) -> str:
+    """Totaux par devise ({'EUR': 1250, 'USD': 300}) -> '12.50 EUR · 3.00 USD'"""
+    if not totals:
+        return format_cents(0)
+    return " · ".join(format_cents(cents, currency) for currency, cents in sorted(totals.items()))
+
+
+class Money:
+    """Montant immuable : centimes entiers et devise"""
+
+    __slots__ = ('cents', 'currency')
+
+    def __init__(self, cents: int, currency: str = NO_CURRENCY):
+        object.__setattr__(self, 'cents', int(cents))
+        object.__setattr__(self, 'currency', currency or NO_CURRENCY)
+
+    @classmethod
+    def of(cls, value, currency: str = NO_CURRENCY) -> 'Money':
+        """Money d'un montant en unités (voir to_cents)"""
+        return cls(to_cents(value), currency)
+
+    def __setattr__(self, name, value):
+        raise AttributeError("Money est immuable")
+
+    def __reduce__(self):
+        return (Money, (self.cents, self.currency))
+
+    def _cents_of(self, other) -> int:
+        if isinstance(other, Money):
+            if other.currency != self.currency:
+                raise ValueError(f"Devises différentes: {self.currency} et {other.currency}")
+            return other.cents
+        if isinstance(other, int) and not isinstance(other, bool) and other == 0:
+            return 0
+        return NotImplemented
+
+    def __add__(self, other) -> 'Money':
+        cents = self._cents_of(other)
+        if cents is NotImplemented:
+            return NotImplemented
+        return Money(self.cents + cents, self.currency)
+
+    __radd__ = __add__  # sum() commence à 0
+
+    def __sub__(self, other) -> 'Money':
+        cents = self._cents_of(other)
+        if cents is NotImplemented:
+            return NotImplemented
+        return Money(self.cents - cents, self.currency)
+
+    def __neg__(self) -> 'Money':
+        return Money(-self.cents, self.currency)
+
+    def __eq__(self, other) -> bool:
+        if not isinstance(other, Money):
+            return NotImplemented
+        return self.cents == other.cents and self.currency == other.currency
+
+    def __hash__(self) -> int:
+        return hash((self.cents, self.currency))
+
+    def __lt__(self, other) -> bool:
+        cents = self._cents_of(other)
+        return NotImplemented if cents is NotImplemented else self.cents < cents
+
+    def __le__(self, other) -> bool:
+        cents = self._cents_of(other)
+        return NotImplemented if cents is NotImplemented else self.cents <= cents
+
+    def __gt__(self, other) -> bool:
+        cents = self._cents_of(other)
+        return NotImplemented if cents is NotImplemented else self.cents > cents
+
+    def __ge__(self, other) -> bool:
+        cents = self._cents_of(other)
+        return NotImplemented if cents is NotImplemented else self.cents >= cents
+
+    def __bool__(self) -> bool:
+        return self.cents != 0
+
+    def to_decimal(self) -> Decimal:
+        return cents_to_decimal(self.cents)
+
+    def __format__(self, spec: str) -> str:
+        # f"{m:,.2f}" formate le montant en unités, comme pour un Decimal
+        if not spec:
+            return str(self)
+        return format(self.to_decimal(), spec)
+
+    def __str__(self) -> str:
+        return format_cents(self.cents, self.currency)
+
+    def __repr__(self) -> str:
+        return f"Money({self.cents}, {self.currency!r})"
@@ -1,10 +1,14 @@
 import mysql.connector
-from mysql.connector import pooling, Error
+from mysql.connector import Error
+from mysql.connector.errors import PoolError, InterfaceError, OperationalError
 import os
 from dotenv import load_dotenv
 import logging
+import threading
 import time
-from typing import Optional, Dict, Any
+from collections import deque
+from contextlib import contextmanager
+from typing import Optional, Dict, Any, List
 
 # Configuration du logging
 logging.basicConfig(
@@ -19,13 +23,363 @@ logger = logging.getLogger(__name__)
 
 load_dotenv()
 
+# Intervalle (secondes) entre deux contrôles de santé du pool
+HEALTH_CHECK_INTERVAL = 30
+
+# Réglages du pool par défaut, surchargeables par variables d'environnement
+POOL_DEFAULTS = {
+    'min_size': 1,            # MYSQL_POOL_MIN
+    'max_size': 10,           # MYSQL_POOL_MAX
+    'wait_timeout': 10.0,     # MYSQL_POOL_WAIT_TIMEOUT : attente maximale d'une connexion (s)
+    'max_waiters': 50,        # MYSQL_POOL_MAX_WAITERS : taille de la file d'attente
+    'idle_ping_after': 30.0,  # MYSQL_POOL_IDLE_PING_AFTER : ping seulement après cette inactivité (s)
+    'idle_timeout': 300.0,    # MYSQL_POOL_IDLE_TIMEOUT : fermeture des connexions en surplus (s)
+}
+
+# Nombre d'échantillons conservés pour les percentiles de latence
+METRICS_WINDOW = 1000
+
+# Délai de connexion (s) : une base lente doit échouer vite plutôt que bloquer l'affichage
+CONNECT_TIMEOUT = 5
+
+
+class DatabaseUnavailableError(ConnectionError):
+    """La base n'est pas (encore) joignable : l'appelant doit basculer en mode dégradé"""
+
+
+class CircuitBreaker:
+    """
+    Disjoncteur protégeant l'accès à la base.
+
+    Après `failure_threshold` échecs consécutifs il s'ouvre : les appels
+    échouent immédiatement pendant `reset_timeout` secondes. Il passe ensuite
+    en semi-ouvert et laisse passer un seul appel d'essai, dont le résultat
+    le referme ou le rouvre.
+    """
+
+    CLOSED, OPEN, HALF_OPEN = 'closed', 'open', 'half_open'
+
+    def __init__(self, failure_threshold: int = 3, reset_timeout: float = 30.0):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self._lock = threading.Lock()
+        self._state = self.CLOSED
+        self._failures = 0
+        self._opened_at = 0.0
+        self._probe_in_flight = False
+
+    @property
+    def state(self) -> str:
+        with self._lock:
+            if self._state == self.OPEN and time.monotonic() - self._opened_at >= self.reset_timeout:
+                return self.HALF_OPEN
+            return self._state
+
+    def allow(self) -> bool:
+        """Indique si un appel peut être tenté maintenant"""
+        with self._lock:
+            if self._state == self.CLOSED:
+                return True
+            if self._probe_in_flight:
+                return False
+            if time.monotonic() - self._opened_at >= self.reset_timeout:
+                self._state = self.HALF_OPEN
+                self._probe_in_flight = True
+                return True
+            return False
+
+    def record_success(self):
+        with self._lock:
+            if self._state != self.CLOSED:
+                logger.info("Disjoncteur refermé: base de données de nouveau joignable")
+            self._state = self.CLOSED
+            self._failures = 0
+            self._probe_in_flight = False
+
+    def record_failure(self):
+        with self._lock:
+            self._failures += 1
+            if self._state == self.HALF_OPEN or self._failures >= self.failure_threshold:
+                self._open()
+
+    def trip(self):
+        """Ouvre le disjoncteur immédiatement"""
+        with self._lock:
+            self._open()
+
+    def _open(self):
+        if self._state != self.OPEN:
+            logger.warning(f"Disjoncteur ouvert pour {self.reset_timeout:.0f} s")
+        self._state = self.OPEN
+        self._opened_at = time.monotonic()
+        self._probe_in_flight = False
+
+
+def _percentile(samples: List[float], fraction: float) -> float:
+    if not samples:
+        return 0.0
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+
+class PooledConnection:
+    """Connexion prêtée par ConnectionPool : close() la rend au pool au lieu de la fermer"""
+
+    def __init__(self, pool: 'ConnectionPool', cnx):
+        self._pool = pool
+        self._cnx = cnx
+
+    def __getattr__(self, name):
+        return getattr(self._cnx, name)
+
+    def close(self):
+        if self._cnx is not None:
+            cnx, self._cnx = self._cnx, None
+            self._pool._release(cnx)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+class _Waiter:
+    """Demande de connexion en attente, servie dans l'ordre d'arrivée"""
+
+    def __init__(self):
+        self.event = threading.Event()
+        self.served = False
+        self.cnx = None  # None une fois servi : droit d'ouvrir une nouvelle connexion
+        self.last_used = None
+
+
+class ConnectionPool:
+    """
+    Pool de connexions à taille variable.
+
+    Le pool grandit à la demande entre `min_size` et `max_size`. Une fois plein,
+    les demandes attendent dans une file FIFO bornée pendant au plus
+    `wait_timeout` secondes. Une connexion n'est pingée que si elle est restée
+    inactive plus de `idle_ping_after` secondes.
+    """
+
+    def __init__(self, config: Dict[str, Any], min_size: int = 1, max_size: int = 10,
+                 wait_timeout: float = 10.0, max_waiters: int = 50,
+                 idle_ping_after: float = 30.0, idle_timeout: float = 300.0):
+        if max_size < 1 or not 0 <= min_size <= max_size:
+            raise ValueError(f"Tailles de pool invalides: min={min_size}, max={max_size}")
+        self._config = config
+        self.min_size = min_size
+        self.max_size = max_size
+        self.wait_timeout = wait_timeout
+        self.max_waiters = max_waiters
+        self.idle_ping_after = idle_ping_after
+        self.idle_timeout = idle_timeout
+
+        self._lock = threading.Lock()
+        self._idle = deque()     # (connexion, dernier usage) ; la plus récente à droite
+        self._waiters = deque()  # _Waiter, dans l'ordre d'arrivée
+        self._size = 0
+        self._in_use = 0
+        self._closed = False
+        self._counters = {
+            'checkouts': 0, 'exhausted': 0, 'timeouts': 0, 'rejected': 0,
+            'created': 0, 'discarded': 0, 'pings': 0,
+        }
+        self._checkout_ms = deque(maxlen=METRICS_WINDOW)
+        self._wait_ms = deque(maxlen=METRICS_WINDOW)
+
+        for _ in range(min_size):
+            self._size += 1
+            self._idle.append((self._connect(), time.monotonic()))
+
+    def _connect(self):
+        cnx = mysql.connector.connect(**self._config)
+        with self._lock:
+            self._counters['created'] += 1
+        return cnx
+
+    def get_connection(self, timeout: Optional[float] = None) -> PooledConnection:
+        """Prête une connexion, en attendant son tour si le pool est plein"""
+        start = time.perf_counter()
+        cnx, last_used, waiter = None, None, None
+
+        with self._lock:
+            if self._closed:
+                raise PoolError("Pool de connexions fermé")
+            self._counters['checkouts'] += 1
+            if self._idle:
+                cnx, last_used = self._idle.pop()
+                self._in_use += 1
+            elif self._size < self.max_size:
+                # Croissance : la connexion est ouverte hors du verrou
+                self._size += 1
+                self._in_use += 1
+            else:
+                self._counters['exhausted'] += 1
+                if len(self._waiters) >= self.max_waiters:
+                    self._counters['rejected'] += 1
+                    raise PoolError("File d'attente du pool de connexions pleine")
+                waiter = _Waiter()
+                self._waiters.append(waiter)
+
+        if waiter is not None:
+            waiter.event.wait(self.wait_timeout if timeout is None else timeout)
+            with self._lock:
+                if not waiter.served:
+                    if self._closed:
+                        raise PoolError("Pool de connexions fermé")
+                    self._waiters.remove(waiter)
+                    self._counters['timeouts'] += 1
+                    raise PoolError("Délai d'attente d'une connexion dépassé")
+                self._wait_ms.append((time.perf_counter() - start) * 1000)
+            cnx, last_used = waiter.cnx, waiter.last_used
+
+        try:
+            if cnx is None:
+                cnx = self._connect()
+            elif time.monotonic() - last_used > self.idle_ping_after:
+                with self._lock:
+                    self._counters['pings'] += 1
+                cnx.ping(reconnect=True, attempts=1, delay=0)
+        except Exception:
+            self._discard(cnx)
+            raise
+
+        with self._lock:
+            self._checkout_ms.append((time.perf_counter() - start) * 1000)
+        return PooledConnection(self, cnx)
+
+    def _hand_over(self, cnx) -> bool:
+        """Confie une connexion (ou une place libre si cnx est None) au premier en attente"""
+        if not self._waiters:
+            return False
+        waiter = self._waiters.popleft()
+        waiter.cnx, waiter.last_used, waiter.served = cnx, time.monotonic(), True
+        self._in_use += 1
+        if cnx is None:
+            self._size += 1
+        waiter.event.set()
+        return True
+
+    def _discard(self, cnx):
+        """Ferme une connexion inutilisable et libère sa place"""
+        if cnx is not None:
+            try:
+                cnx.close()
+            except Exception:
+                pass
+        with self._lock:
+            self._size -= 1
+            self._in_use -= 1
+            self._counters['discarded'] += 1
+            if not self._closed:
+                self._hand_over(None)
+
+    def _release(self, cnx):
+        """Reprend une connexion prêtée"""
+        try:
+            if cnx.in_transaction:
+                cnx.rollback()
+        except Exception:
+            self._discard(cnx)
+            return
+
+        with self._lock:
+            if not self._closed:
+                self._in_use -= 1
+                if not self._hand_over(cnx):
+                    self._idle.append((cnx, time.monotonic()))
+                return
+        self._discard(cnx)
+
+    def maintain(self):
+        """
+        Entretien périodique : ferme les connexions en surplus inactives depuis
+        `idle_timeout` et pingue celles inactives depuis `idle_ping_after`.
+        """
+        now = time.monotonic()
+        to_close, to_ping = [], []
+        with self._lock:
+            while self._idle and self._size > self.min_size and now - self._idle[0][1] > self.idle_timeout:
+                to_close.append(self._idle.popleft()[0])
+                self._size -= 1
+            while self._idle and now - self._idle[0][1] > self.idle_ping_after:
+                to_ping.append(self._idle.popleft()[0])
+                self._in_use += 1
+
+        for cnx in to_close:
+            try:
+                cnx.close()
+            except Exception:
+                pass
+        for cnx in to_ping:
+            try:
+                with self._lock:
+                    self._counters['pings'] += 1
+                cnx.ping(reconnect=True, attempts=1, delay=0)
+            except Exception as e:
+                logger.warning(f"Connexion inactive hors service, fermée: {str(e)}")
+                self._discard(cnx)
+                continue
+            self._release(cnx)
+
+    def metrics(self) -> Dict[str, Any]:
+        """Instantané des compteurs et latences du pool"""
+        with self._lock:
+            checkout_ms = list(self._checkout_ms)
+            wait_ms = list(self._wait_ms)
+            return {
+                'size': self._size,
+                'min_size': self.min_size,
+                'max_size': self.max_size,
+                'idle': len(self._idle),
+                'in_use': self._in_use,
+                'waiting': len(self._waiters),
+                **self._counters,
+                'checkout_ms_avg': sum(checkout_ms) / len(checkout_ms) if checkout_ms else 0.0,
+                'checkout_ms_p99': _percentile(checkout_ms, 0.99),
+                'wait_ms_avg': sum(wait_ms) / len(wait_ms) if wait_ms else 0.0,
+                'wait_ms_p99': _percentile(wait_ms, 0.99),
+            }
+
+    def closeall(self):
+        """Ferme les connexions inactives ; celles prêtées seront fermées à leur retour"""
+        with self._lock:
+            self._closed = True
+            idle = [cnx for cnx, _ in self._idle]
+            self._idle.clear()
+            self._size -= len(idle)
+            waiters = list(self._waiters)
+            self._waiters.clear()
+        for waiter in waiters:
+            waiter.event.set()
+        for cnx in idle:
+            try:
+                cnx.close()
+            except Exception:
+                pass
+
+
 class MySQLDatabase:
-    def __init__(self, max_retries: int = 3, retry_delay: int = 2):
-        """Initialise la connexion avec reprise automatique"""
+    def __init__(self, max_retries: int = 3, retry_delay: int = 2, lazy: bool = False,
+                 health_check_interval: float = HEALTH_CHECK_INTERVAL,
+                 pool_settings: Optional[Dict[str, Any]] = None):
+        """Initialise la connexion avec reprise automatique (à la première demande si lazy)"""
         self.max_retries = max_retries
         self.retry_delay = retry_delay
+        self.health_check_interval = health_check_interval
+        self.pool_settings = pool_settings or {}
         self.pool = None
-        self._initialize()
+        self.breaker = CircuitBreaker()
+        self._lock = threading.Lock()
+        self._ready = threading.Event()
+        self._stop_event = threading.Event()
+        self._health_thread = None
+        self._warm_up_thread = None
+        if not lazy:
+            self._initialize()
 
     def _get_validated_config(self) -> Dict[str, Any]:
         """Valide et retourne la configuration de connexion"""
@@ -37,13 +391,11 @@ class MySQLDatabase:
             'password': os.getenv("MYSQL_PASSWORD"),
             'ssl_disabled': True,  # Railway nécessite SSL
             'ssl_ca': '/etc/ssl/cert.pem',
-            'connect_timeout': 20,
+            'connect_timeout': self._parse_timeout(os.getenv("MYSQL_CONNECT_TIMEOUT")),
             'auth_plugin': 'mysql_native_password',
-            'pool_name': 'railway_pool',
-            'pool_size': 5
         }
 
-        missing = [k for k, v in config.items() if not v and k not in ['ssl_ca', 'pool_name', 'pool_size']]
+        missing = [k for k, v in config.items() if not v and k not in ['ssl_ca']]
         if missing:
             raise ValueError(f"Configuration manquante: {', '.join(missing)}")
 
@@ -61,28 +413,60 @@ class MySQLDatabase:
             logger.warning(f"Port invalide '{port_str}', utilisation du port par défaut 3306")
             return 3306
 
+    def _parse_timeout(self, timeout_str: Optional[str]) -> int:
+        """Convertit le délai de connexion, avec repli sur CONNECT_TIMEOUT"""
+        if timeout_str is None:
+            return CONNECT_TIMEOUT
+        try:
+            return max(1, int(timeout_str))
+        except ValueError:
+            logger.warning(f"Délai invalide '{timeout_str}', utilisation de {CONNECT_TIMEOUT} s")
+            return CONNECT_TIMEOUT
+
+    def _get_pool_settings(self) -> Dict[str, Any]:
+        """Réglages du pool : arguments explicites, puis environnement, puis valeurs par défaut"""
+        settings = {}
+        for key, default in POOL_DEFAULTS.items():
+            env_name = f"MYSQL_POOL_{key.upper().replace('_SIZE', '')}"
+            raw = os.getenv(env_name)
+            try:
+                settings[key] = type(default)(raw) if raw is not None else default
+            except ValueError:
+                logger.warning(f"Valeur invalide '{raw}' pour {env_name}, utilisation de {default}")
+                settings[key] = default
+        settings.update(self.pool_settings)
+        return settings
+
     def _initialize(self):
         """Établit la connexion avec mécanisme de reprise"""
         config = self._get_validated_config()
+        settings = self._get_pool_settings()
         
         for attempt in range(1, self.max_retries + 1):
+            pool = None
             try:
-                self.pool = pooling.MySQLConnectionPool(**config)
+                pool = ConnectionPool(config, **settings)
                 
                 # Test de connexion immédiat
-                with self._test_connection() as conn:
+                with self._test_connection(pool) as conn:
                     logger.info(f"Connexion établie (tentative {attempt}/{self.max_retries})")
                 
+                # Le pool n'est publié qu'une fois validé
+                self.pool = pool
+                self._ready.set()
+                self._start_health_check()
                 return  # Succès - sortie de la boucle
                 
             except Exception as e:
+                if pool:
+                    pool.closeall()
                 self._handle_connection_error(attempt, e)
         
         raise RuntimeError(f"Échec après {self.max_retries} tentatives")
 
-    def _test_connection(self):
+    def _test_connection(self, pool: ConnectionPool):
         """Teste la connexion avec ping"""
-        conn = self.pool.get_connection()
+        conn = pool.get_connection()
         try:
             conn.ping(reconnect=True, attempts=3, delay=1)
             return conn
@@ -96,9 +480,8 @@ class MySQLDatabase:
         logger.warning(f"Tentative {attempt}/{self.max_retries} échouée: {error_msg}")
         
         if attempt < self.max_retries:
-            time.sleep(self.retry_delay * attempt)  # Backoff exponentiel
-            if self.pool:
-                self.pool.closeall()
+            # Backoff exponentiel, interrompu si le service est fermé entre-temps
+            self._stop_event.wait(self.retry_delay * attempt)
 
     def _format_error(self, error: Exception) -> str:
         """Formatte les messages d'erreur de manière cohérente"""
@@ -106,21 +489,106 @@ class MySQLDatabase:
             return getattr(error, 'msg', str(error))
         return str(error)
 
+    def _start_health_check(self):
+        """Lance le contrôle de santé périodique en arrière-plan (une seule fois)"""
+        if self._health_thread is None and self.health_check_interval:
+            self._health_thread = threading.Thread(
+                target=self._health_check_loop, name="mysql-health-check", daemon=True
+            )
+            self._health_thread.start()
+
+    def _health_check_loop(self):
+        """Pingue les connexions inactives et réduit le pool à intervalle régulier"""
+        while not self._stop_event.wait(self.health_check_interval):
+            pool = self.pool
+            if pool is None:
+                continue
+            try:
+                pool.maintain()
+            except Exception as e:
+                logger.warning(f"Contrôle de santé échoué: {self._format_error(e)}")
+
+    def warm_up(self):
+        """Établit les connexions dans un thread d'arrière-plan, sans bloquer l'appelant"""
+        with self._lock:
+            if self.pool is not None or self._stop_event.is_set():
+                return
+            if self._warm_up_thread is not None and self._warm_up_thread.is_alive():
+                return
+            if not self.breaker.allow():
+                return
+            self._warm_up_thread = threading.Thread(
+                target=self._warm_up, name="mysql-warm-up", daemon=True
+            )
+            self._warm_up_thread.start()
+
+    def _warm_up(self):
+        try:
+            self._initialize()
+            self.breaker.record_success()
+        except Exception as e:
+            logger.error(f"Échec de la connexion en arrière-plan: {self._format_error(e)}")
+            self.breaker.trip()
+
+    def wait_until_ready(self, timeout: Optional[float] = None) -> bool:
+        """Attend la fin de l'initialisation (pour les scripts qui peuvent bloquer)"""
+        self.warm_up()
+        return self._ready.wait(timeout)
+
+    def is_available(self) -> bool:
+        """Vrai si des requêtes peuvent être tentées ; lance l'initialisation sinon"""
+        if self.pool is None:
+            self.warm_up()
+            return False
+        return self.breaker.state != CircuitBreaker.OPEN
+
     def get_connection(self):
-        """Obtient une connexion active avec gestion d'erreur"""
-        if not self.pool:
-            raise RuntimeError("Pool de connexions non initialisé")
+        """Obtient une connexion active, ou échoue immédiatement si la base est indisponible"""
+        if self.pool is None:
+            self.warm_up()
+            raise DatabaseUnavailableError("Connexion à la base de données en cours d'établissement")
+        if not self.breaker.allow():
+            raise DatabaseUnavailableError("Base de données indisponible (disjoncteur ouvert)")
             
         try:
             conn = self.pool.get_connection()
-            conn.ping(reconnect=True)
-            return conn
+        except PoolError as e:
+            # Pool saturé : le serveur répond, ce n'est pas une panne
+            self.breaker.record_success()
+            logger.error(f"Échec d'obtention de connexion: {self._format_error(e)}")
+            raise ConnectionError("Échec de connexion à la base de données") from e
         except Exception as e:
+            self.breaker.record_failure()
             logger.error(f"Échec d'obtention de connexion: {self._format_error(e)}")
             raise ConnectionError("Échec de connexion à la base de données") from e
+        self.breaker.record_success()
+        return conn
+
+    def pool_metrics(self) -> Dict[str, Any]:
+        """Métriques du pool (taille, connexions prêtées, attentes, latences)"""
+        return self.pool.metrics() if self.pool else {}
+
+    @contextmanager
+    def connection(self):
+        """Prête une connexion du pool et la rend dans tous les cas"""
+        conn = self.get_connection()
+        try:
+            yield conn
+        except Exception as e:
+            if isinstance(e, (InterfaceError, OperationalError)):
+                # Connexion perdue en cours de requête : compte comme un échec
+                self.breaker.record_failure()
+            try:
+                conn.rollback()
+            except Exception:
+                pass
+            raise
+        finally:
+            conn.close()
 
     def close(self):
         """Ferme toutes les connexions proprement"""
+        self._stop_event.set()
         if self.pool:
             try:
                 self.pool.closeall()
@@ -128,12 +596,24 @@ class MySQLDatabase:
             except Exception as e:
                 logger.error(f"Erreur lors de la fermeture: {str(e)}")
 
+# Service partagé par toutes les sessions et réexécutions du processus
+_database: Optional[MySQLDatabase] = None
+_database_lock = threading.Lock()
+
 def get_database() -> MySQLDatabase:
-    """Factory pour obtenir une instance de base de données"""
-    try:
-        db = MySQLDatabase(max_retries=5, retry_delay=3)  # Augmentation des tentatives
-        logger.info("Connexion à la base de données établie avec succès")
-        return db
-    except Exception as e:
-        logger.critical(f"Échec critique d'initialisation: {str(e)}")
-        raise RuntimeError("Service de base de données indisponible") from e
\ No newline at end of file
+    """Renvoie le service de base de données unique du processus"""
+    global _database
+    if _database is None:
+        with _database_lock:
+            if _database is None:
+                try:
+                    # Les connexions sont ouvertes en arrière-plan : l'appelant n'attend pas
+                    database = MySQLDatabase(max_retries=5, retry_delay=3, lazy=True)
+                    database._get_validated_config()
+                    database.warm_up()
+                except Exception as e:
+                    logger.critical(f"Échec critique d'initialisation: {str(e)}")
+                    raise RuntimeError("Service de base de données indisponible") from e
+                # Publié seulement une fois la configuration validée
+                _database = database
+    return _database
\ No newline at end of file
@@ -0,0 +1,502 @@
+# partitions.py
+"""
+Partitionnement mensuel de la table transactions et archivage des mois anciens.
+
+transactions est partitionnée par mois sur `date` (RANGE sur
+UNIX_TIMESTAMP(date), seule fonction de partitionnement admise pour une
+colonne TIMESTAMP) : une requête filtrée par date ne lit que les partitions
+concernées. La dernière partition, p_future, reçoit tout ce qui dépasse le
+dernier mois créé ; la commande de maintenance la découpe à l'avance pour
+que chaque mois ait sa partition avant d'arriver.
+
+Les mois plus anciens que ARCHIVE_AFTER_MONTHS sont exportés en Parquet
+compressé (zstd) dans ARCHIVE_DIR, retirés de la base (DROP PARTITION, sans
+parcours de la table) puis enregistrés dans transaction_archives. BankDatabase
+relit ces fichiers quand une lecture de l'historique porte sur une période
+archivée. Les archives nécessitent pyarrow (pip install pyarrow).
+
+    python partitions.py --status    # partitions et archives
+    python partitions.py             # partitions à venir + archivage (mensuel, par cron)
+    python partitions.py --dry-run   # affiche ce qui serait fait
+"""
+import argparse
+import logging
+import os
+import re
+import time
+from datetime import date, datetime, timedelta
+from decimal import Decimal
+from typing import Any, Dict, Iterator, List, Optional
+
+logger = logging.getLogger(__name__)
+
+FUTURE_PARTITION = 'p_future'
+
+# Mois créés à l'avance, âge d'archivage (en mois) et répertoire des archives
+PARTITIONS_AHEAD = int(os.getenv("PARTITIONS_AHEAD", "3"))
+ARCHIVE_AFTER_MONTHS = int(os.getenv("ARCHIVE_AFTER_MONTHS", "24"))
+ARCHIVE_DIR = os.getenv("ARCHIVE_DIR", os.path.join("archives", "transactions"))
+
+# Lignes lues par aller-retour et écrites par groupe de lignes Parquet
+EXPORT_BATCH = 50_000
+
+ARCHIVE_COLUMNS = ('id', 'iban_id', 'client_id', 'type', 'amount', 'description', 'date')
+
+_MONTHLY_PARTITION = re.compile(r'p(\d{4})(\d{2})')
+_ARCHIVE_FILE = re.compile(r'transactions_(\d{4})_(\d{2})\.parquet')
+
+
+def _pyarrow():
+    try:
+        import pyarrow
+        import pyarrow.compute
+        import pyarrow.dataset
+        import pyarrow.parquet
+    except ImportError:
+        raise RuntimeError("Les archives de transactions nécessitent pyarrow (pip install pyarrow)")
+    return pyarrow
+
+
+def _archive_schema():
+    pa = _pyarrow()
+    return pa.schema([
+        ('id', pa.int32()),
+        ('iban_id', pa.int32()),
+        ('client_id', pa.int32()),
+        ('type', pa.string()),
+        ('amount', pa.decimal128(15, 2)),
+        ('description', pa.string()),
+        ('date', pa.timestamp('s')),
+    ])
+
+
+# ----------------------------------------------------------------------
+# Mois et définitions de partitions
+# ----------------------------------------------------------------------
+
+def month_start(day) -> date:
+    return date(day.year, day.month, 1)
+
+
+def add_months(month: date, count: int) -> date:
+    index = month.year * 12 + month.month - 1 + count
+    return date(index // 12, index % 12 + 1, 1)
+
+
+def partition_name(month: date) -> str:
+    return f"p{month:%Y%m}"
+
+
+def partition_month(name: str) -> Optional[date]:
+    """Mois d'une partition mensuelle (None pour p_future)"""
+    match = _MONTHLY_PARTITION.fullmatch(name or '')
+    return date(int(match.group(1)), int(match.group(2)), 1) if match else None
+
+
+def partition_definitions(months: List[date], with_future: bool = True) -> str:
+    """Clauses PARTITION des `months` donnés, suivies de p_future si demandé"""
+    definitions = [
+        f"PARTITION {partition_name(month)} VALUES LESS THAN "
+        f"(UNIX_TIMESTAMP('{add_months(month, 1):%Y-%m-%d} 00:00:00'))"
+        for month in months
+    ]
+    if with_future:
+        definitions.append(f"PARTITION {FUTURE_PARTITION} VALUES LESS THAN MAXVALUE")
+    return ', '.join(definitions)
+
+
+def month_range(first: date, last: date) -> List[date]:
+    months, month = [], month_start(first)
+    while month <= last:
+        months.append(month)
+        month = add_months(month, 1)
+    return months
+
+
+def list_partitions(cursor) -> List[Dict[str, Any]]:
+    """Partitions de transactions dans l'ordre, avec leur nombre de lignes estimé"""
+    cursor.execute('''
+        SELECT PARTITION_NAME, TABLE_ROWS FROM information_schema.PARTITIONS
+        WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = 'transactions'
+          AND PARTITION_NAME IS NOT NULL
+        ORDER BY PARTITION_ORDINAL_POSITION
+    ''')
+    return [
+        {'name': name, 'month': partition_month(name), 'rows': rows or 0}
+        for name, rows in cursor.fetchall()
+    ]
+
+
+def _archive_horizon(cursor) -> Optional[date]:
+    """Premier mois encore en base après les mois archivés (None sans archive)"""
+    cursor.execute("SELECT MAX(month) FROM transaction_archives")
+    last = cursor.fetchone()[0]
+    return add_months(last, 1) if last else None
+
+
+# ----------------------------------------------------------------------
+# Maintenance
+# ----------------------------------------------------------------------
+
+def create_future_partitions(db, months_ahead: int = PARTITIONS_AHEAD, today: Optional[date] = None,
+                             dry_run: bool = False) -> List[str]:
+    """Découpe p_future pour que les `months_ahead` prochains mois aient leur partition"""
+    target = add_months(month_start(today or date.today()), months_ahead)
+    with db.connection() as conn:
+        cursor = conn.cursor()
+        try:
+            months = [p['month'] for p in list_partitions(cursor) if p['month']]
+            if not months:
+                raise RuntimeError("La table transactions n'est pas partitionnée : appliquez les migrations")
+            new = month_range(add_months(max(months), 1), target)
+            if new and not dry_run:
+                # p_future est vide en temps normal : la réorganisation ne copie rien
+                cursor.execute(
+                    f"ALTER TABLE transactions REORGANIZE PARTITION {FUTURE_PARTITION} "
+                    f"INTO ({partition_definitions(new)})"
+                )
+        finally:
+            cursor.close()
+    return [partition_name(month) for month in new]
+
+
+def split_oldest_partition(db, dry_run: bool = False) -> List[str]:
+    """
+    Redécoupe par mois la plus ancienne partition quand elle contient des
+    lignes antérieures à son mois (historique importé ou généré après la
+    migration), sans redescendre sous les mois déjà archivés.
+    """
+    with db.connection() as conn:
+        cursor = conn.cursor()
+        try:
+            monthly = [p for p in list_partitions(cursor) if p['month']]
+            if not monthly:
+                return []
+            oldest = monthly[0]
+            cursor.execute(f"SELECT MIN(date) FROM transactions PARTITION ({oldest['name']})")
+            first = cursor.fetchone()[0]
+            if first is None or month_start(first) >= oldest['month']:
+                return []
+            first = month_start(first)
+            horizon = _archive_horizon(cursor)
+            if horizon is not None:
+                first = max(first, horizon)
+            months = month_range(first, oldest['month'])
+            if len(months) > 1 and not dry_run:
+                cursor.execute(
+                    f"ALTER TABLE transactions REORGANIZE PARTITION {oldest['name']} "
+                    f"INTO ({partition_definitions(months, with_future=False)})"
+                )
+        finally:
+            cursor.close()
+    return [partition_name(month) for month in months[:-1]]
+
+
+def _export_partition(cursor, name: str, path: str) -> int:
+    """Écrit la partition dans `path` par groupes de EXPORT_BATCH lignes, sans tout charger"""
+    pa = _pyarrow()
+    schema = _archive_schema()
+    rows = 0
+    cursor.execute(f"SELECT {', '.join(ARCHIVE_COLUMNS)} FROM transactions PARTITION ({name}) ORDER BY date, id")
+    writer = pa.parquet.ParquetWriter(path, schema, compression='zstd')
+    try:
+        while True:
+            batch = cursor.fetchmany(EXPORT_BATCH)
+            if not batch:
+                break
+            columns = list(zip(*batch))
+            writer.write_table(pa.Table.from_arrays(
+                [pa.array(values, type=field.type) for values, field in zip(columns, schema)], schema=schema
+            ))
+            rows += len(batch)
+    finally:
+        writer.close()
+    return rows
+
+
+def _archive_path(month: date, directory: str) -> str:
+    return os.path.join(directory, f"transactions_{month:%Y_%m}.parquet")
+
+
+def _delete_texts(cursor, path: str):
+    """Retire de transaction_texts les descriptions des transactions archivées dans `path`"""
+    for batch in _pyarrow().parquet.ParquetFile(path).iter_batches(batch_size=EXPORT_BATCH, columns=['id']):
+        ids = batch.column(0).to_pylist()
+        cursor.execute(f"DELETE FROM transaction_texts WHERE transaction_id IN ({', '.join(['%s'] * len(ids))})",
+                       ids)
+
+
+def archive_partition(db, month: date, directory: str = ARCHIVE_DIR) -> Dict[str, Any]:
+    """
+    Exporte le mois dans un fichier Parquet, vérifie le nombre de lignes,
+    supprime la partition, puis enregistre l'archive dans transaction_archives
+    et retire les descriptions du mois de transaction_texts. Le mois n'est
+    jamais lu à la fois en base et dans l'archive. Une archive interrompue
+    peut être relancée : tant que la partition existe le fichier est réécrit,
+    ensuite le fichier déjà vérifié est enregistré.
+    """
+    name = partition_name(month)
+    os.makedirs(directory, exist_ok=True)
+    path = _archive_path(month, directory)
+    temporary = path + '.tmp'
+    start = time.perf_counter()
+    with db.connection() as conn:
+        cursor = conn.cursor()
+        try:
+            if any(partition['name'] == name for partition in list_partitions(cursor)):
+                try:
+                    rows = _export_partition(cursor, name, temporary)
+                    written = _pyarrow().parquet.ParquetFile(temporary).metadata.num_rows
+                    cursor.execute(f"SELECT COUNT(*) FROM transactions PARTITION ({name})")
+                    count = cursor.fetchone()[0]
+                    if not rows == written == count:
+                        raise RuntimeError(f"Archive {name} incomplète: {rows} lues, {written} écrites, {count} en base")
+                except Exception:
+                    if os.path.exists(temporary):
+                        os.remove(temporary)
+                    raise
+                os.replace(temporary, path)
+                cursor.execute(f"ALTER TABLE transactions DROP PARTITION {name}")
+            elif not os.path.exists(path):
+                raise RuntimeError(f"Partition {name} absente et aucune archive {path}")
+            else:
+                logger.info(f"Partition {name} déjà supprimée: enregistrement de {path}")
+            rows = _pyarrow().parquet.ParquetFile(path).metadata.num_rows
+            size = os.path.getsize(path)
+
+            cursor.execute('''
+                INSERT INTO transaction_archives (month, path, row_count, size_bytes)
+                VALUES (%s, %s, %s, %s)
+                ON DUPLICATE KEY UPDATE path = VALUES(path), row_count = VALUES(row_count),
+                                        size_bytes = VALUES(size_bytes), archived_at = CURRENT_TIMESTAMP
+            ''', (month, path, rows, size))
+            _delete_texts(cursor, path)
+            conn.commit()
+        finally:
+            cursor.close()
+    seconds = time.perf_counter() - start
+    logger.info(f"Partition {name} archivée: {rows} lignes, {size / 1024 / 1024:.1f} Mo en {seconds:.1f} s")
+    return {'partition': name, 'path': path, 'rows': rows, 'size_bytes': size, 'seconds': round(seconds, 2)}
+
+
+def _unregistered_archives(cursor, directory: str, partitions: List[Dict[str, Any]]) -> List[date]:
+    """Mois dont la partition a été supprimée sans que l'archive soit enregistrée (archivage interrompu)"""
+    if not os.path.isdir(directory):
+        return []
+    cursor.execute("SELECT month FROM transaction_archives")
+    done = {row[0] for row in cursor.fetchall()} | {partition['month'] for partition in partitions}
+    months = []
+    for entry in os.listdir(directory):
+        match = _ARCHIVE_FILE.fullmatch(entry)
+        if match:
+            month = date(int(match.group(1)), int(match.group(2)), 1)
+            if month not in done:
+                months.append(month)
+    return sorted(months)
+
+
+def archive_partitions(db, older_than_months: int = ARCHIVE_AFTER_MONTHS, directory: str = ARCHIVE_DIR,
+                       today: Optional[date] = None, dry_run: bool = False) -> List[Dict[str, Any]]:
+    """
+    Archive les partitions mensuelles antérieures à `older_than_months` mois,
+    après avoir terminé les archivages interrompus
+    """
+    cutoff = add_months(month_start(today or date.today()), -older_than_months)
+    with db.connection() as conn:
+        cursor = conn.cursor()
+        try:
+            partitions = list_partitions(cursor)
+            interrupted = _unregistered_archives(cursor, directory, partitions)
+        finally:
+            cursor.close()
+    monthly = [p for p in partitions if p['month']]
+    # La dernière partition mensuelle reste toujours en base
+    candidates = [p for p in monthly[:-1] if p['month'] < cutoff]
+    if dry_run:
+        return ([{'partition': partition_name(month), 'rows': '?'} for month in interrupted]
+                + [{'partition': p['name'], 'rows': p['rows']} for p in candidates])
+    return [archive_partition(db, month, directory)
+            for month in interrupted + [p['month'] for p in candidates]]
+
+
+def maintain(db, months_ahead: int = PARTITIONS_AHEAD, older_than_months: int = ARCHIVE_AFTER_MONTHS,
+             directory: str = ARCHIVE_DIR, dry_run: bool = False) -> Dict[str, List[Any]]:
+    """Maintenance complète : découpage de l'historique, mois à venir, archivage"""
+    return {
+        'split': split_oldest_partition(db, dry_run),
+        'created': create_future_partitions(db, months_ahead, dry_run=dry_run),
+        'archived': archive_partitions(db, older_than_months, directory, dry_run=dry_run),
+    }
+
+
+# ----------------------------------------------------------------------
+# Lecture des archives
+# ----------------------------------------------------------------------
+
+def _as_datetime(day) -> datetime:
+    return day if isinstance(day, datetime) else datetime.combine(day, datetime.min.time())
+
+
+def _in_cents(table):
+    """
+    Remplace la colonne décimale `amount` des fichiers par `amount_cents`
+    (int64), la forme lue en base par BankDatabase : multiplication et
+    conversion vectorisées, sans Decimal par ligne.
+    """
+    pa = _pyarrow()
+    pc = pa.compute
+    index = table.schema.get_field_index('amount')
+    cents = pc.cast(pc.multiply(table.column(index), pa.scalar(Decimal(100), pa.decimal128(3, 0))), pa.int64())
+    return table.set_column(index, 'amount_cents', cents)
+
+
+def _archive_filter(criteria: Dict[str, Any], key, ascending: bool):
+    """Expression pyarrow équivalente aux filtres SQL de l'historique"""
+    pc = _pyarrow().compute
+    field = pc.field
+    conditions = []
+    if criteria.get('date_from'):
+        conditions.append(field('date') >= _as_datetime(criteria['date_from']))
+    if criteria.get('date_to'):
+        # Borne exclusive : on inclut toute la journée de fin, comme en SQL
+        conditions.append(field('date') < _as_datetime(criteria['date_to']) + timedelta(days=1))
+    for column in ('type', 'client_id', 'iban_id'):
+        if criteria.get(column):
+            conditions.append(field(column) == criteria[column])
+    if criteria.get('amount_min') is not None:
+        conditions.append(field('amount') >= criteria['amount_min'])
+    if criteria.get('amount_max') is not None:
+        conditions.append(field('amount') <= criteria['amount_max'])
+
+    search = criteria.get('search')
+    if search is not None:
+        alternatives = []
+        if search['words']:
+            matches = [pc.match_substring(field('description'), word, ignore_case=True) for word in search['words']]
+            description = matches[0]
+            for match in matches[1:]:
+                description = description & match
+            alternatives.append(description)
+        for column, values in (('client_id', search['client_ids']), ('iban_id', search['iban_ids']),
+                               ('id', search['ids']), ('amount', search['amounts'])):
+            if values:
+                alternatives.append(field(column).isin(values))
+        if not alternatives:
+            return None
+        combined = alternatives[0]
+        for alternative in alternatives[1:]:
+            combined = combined | alternative
+        conditions.append(combined)
+
+    if key is not None:
+        key_date, key_id = key
+        if ascending:
+            conditions.append((field('date') > key_date) | ((field('date') == key_date) & (field('id') > key_id)))
+        else:
+            conditions.append((field('date') < key_date) | ((field('date') == key_date) & (field('id') < key_id)))
+
+    expression = pc.scalar(True)
+    for condition in conditions:
+        expression = expression & condition
+    return expression
+
+
+def read_archived_transactions(archives: List[Dict[str, Any]], criteria: Dict[str, Any], limit: int,
+                               key=None, ascending: bool = False) -> List[Dict[str, Any]]:
+    """
+    Lignes archivées correspondant aux critères, triées par (date, id) et
+    reprises après la clé `key`, jusqu'à `limit`. Les fichiers sont lus du
+    plus récent au plus ancien (l'inverse en ordre croissant) et seulement
+    jusqu'à obtenir assez de lignes ; les statistiques Parquet écartent les
+    groupes de lignes hors des filtres sans les décompresser. Les montants
+    sont renvoyés en centimes (`amount_cents`), comme les lectures en base.
+    """
+    parquet = _pyarrow().parquet
+    expression = _archive_filter(criteria, key, ascending)
+    if expression is None:
+        return []
+    order = 'ascending' if ascending else 'descending'
+    rows = []
+    for archive in sorted(archives, key=lambda a: a['month'], reverse=not ascending):
+        table = parquet.read_table(archive['path'], filters=expression)
+        if table.num_rows:
+            table = table.sort_by([('date', order), ('id', order)]).slice(0, limit - len(rows))
+            rows.extend(_in_cents(table).to_pylist())
+        if len(rows) >= limit:
+            break
+    return rows
+
+
+def iter_archived_transactions(archives: List[Dict[str, Any]], criteria: Dict[str, Any],
+                               batch_size: int) -> Iterator[List[Dict[str, Any]]]:
+    """
+    Toutes les lignes archivées correspondant aux critères, du plus ancien au
+    plus récent, par blocs d'au plus `batch_size` lignes : les fichiers sont
+    lus groupe de lignes par groupe de lignes, sans être chargés en entier.
+    """
+    dataset = _pyarrow().dataset
+    expression = _archive_filter(criteria, None, True)
+    if expression is None:
+        return
+    for archive in sorted(archives, key=lambda a: a['month']):
+        for batch in dataset.dataset(archive['path'], format='parquet').to_batches(
+                filter=expression, batch_size=batch_size):
+            if batch.num_rows:
+                yield _in_cents(_pyarrow().Table.from_batches([batch])).to_pylist()
+
+
+def find_archived_transaction(archives: List[Dict[str, Any]], transaction_id: int) -> Optional[Dict[str, Any]]:
+    """Transaction archivée par identifiant, en commençant par les mois récents"""
+    parquet = _pyarrow().parquet
+    expression = _pyarrow().compute.field('id') == transaction_id
+    for archive in sorted(archives, key=lambda a: a['month'], reverse=True):
+        table = parquet.read_table(archive['path'], filters=expression)
+        if table.num_rows:
+            return _in_cents(table).to_pylist()[0]
+    return None
+
+
+def main():
+    from mysql_config import MySQLDatabase
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(message)s")
+    parser = argparse.ArgumentParser(description="Partitions mensuelles et archivage de la table transactions")
+    parser.add_argument("--ahead", type=int, default=PARTITIONS_AHEAD, help="Mois à créer à l'avance")
+    parser.add_argument("--archive-after", type=int, default=ARCHIVE_AFTER_MONTHS,
+                        help="Âge en mois au-delà duquel une partition est archivée")
+    parser.add_argument("--archive-dir", default=ARCHIVE_DIR, help="Répertoire des fichiers Parquet")
+    parser.add_argument("--dry-run", action="store_true", help="N'affiche que ce qui serait fait")
+    parser.add_argument("--status", action="store_true", help="Liste les partitions et les archives")
+    args = parser.parse_args()
+
+    db = MySQLDatabase()
+    try:
+        if args.status:
+            with db.connection() as conn:
+                cursor = conn.cursor()
+                try:
+                    partitions = list_partitions(cursor)
+                    cursor.execute("SELECT month, row_count, size_bytes, path FROM transaction_archives ORDER BY month")
+                    archives = cursor.fetchall()
+                finally:
+                    cursor.close()
+            for partition in partitions:
+                print(f"{partition['name']:<10} ~{partition['rows']} lignes")
+            for month, rows, size, path in archives:
+                print(f"archivé {month:%Y-%m}: {rows} lignes, {size / 1024 / 1024:.1f} Mo ({path})")
+            return
+
+        report = maintain(db, args.ahead, args.archive_after, args.archive_dir, args.dry_run)
+        prefix = "[simulation] " if args.dry_run else ""
+        print(f"{prefix}Partitions redécoupées: {', '.join(report['split']) or 'aucune'}")
+        print(f"{prefix}Partitions créées: {', '.join(report['created']) or 'aucune'}")
+        for archived in report['archived']:
+            print(f"{prefix}Archivée: {archived['partition']} ({archived['rows']} lignes)")
+        if not report['archived']:
+            print(f"{prefix}Aucune partition à archiver")
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,200 @@
+# receipt_batch.py
+"""
+Génération de reçus en masse (fin de mois) dans une archive ZIP.
+
+Les transactions à traiter sont lues par blocs depuis une seule requête de
+jointure (BankDatabase.iter_receipt_rows : transaction, compte et titulaire
+sur la même ligne), découpées en lots et rendues en PDF dans un pool de
+processus : la mise en page ReportLab, coûteuse en CPU, ne tourne ni dans
+le thread Streamlit ni sous le GIL du serveur. Chaque processus garde son
+propre ReceiptRenderer (styles et logo préparés une fois) et passe par le
+cache des reçus (receipt_cache.py) : un reçu déjà produit avec les mêmes
+données n'est pas rendu à nouveau. Les reçus de chaque lot sont inscrits
+au registre `receipts` par le processus principal, en une requête par lot.
+
+Les PDF sont écrits dans le ZIP au fil de l'eau, dans l'ordre des
+transactions. Le nombre de lots en cours est borné : la mémoire dépend de
+la taille des lots et du nombre de processus, pas du nombre de reçus.
+
+    python receipt_batch.py --from 2024-12-01 --to 2024-12-31 -o recus_decembre.zip
+"""
+import argparse
+import logging
+import multiprocessing
+import os
+import tempfile
+import time
+import zipfile
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from money import Money
+
+logger = logging.getLogger(__name__)
+
+# Transactions lues par aller-retour, reçus par lot envoyé à un processus
+RECEIPT_FETCH_ROWS = int(os.getenv("RECEIPT_FETCH_ROWS", "1000"))
+RECEIPT_BATCH_SIZE = int(os.getenv("RECEIPT_BATCH_SIZE", "50"))
+RECEIPT_WORKERS = int(os.getenv("RECEIPT_WORKERS", str(os.cpu_count() or 2)))
+
+# Lots en cours par processus : assez pour ne jamais laisser un processus sans travail
+_IN_FLIGHT_PER_WORKER = 2
+
+# Rappel de progression : (reçus écrits, reçus à produire)
+Progress = Callable[[int, int], None]
+
+
+def _receipt_documents(row: Tuple) -> Tuple[Dict[str, Any], Dict[str, Any], Dict[str, Any]]:
+    """Ligne de RECEIPT_COLUMNS -> (transaction, client, compte) attendus par ReceiptRenderer"""
+    (transaction_id, moment, transaction_type, amount_cents, description,
+     iban, currency, first_name, last_name, client_type, email, phone) = row
+    transaction = {'id': transaction_id, 'date': moment.strftime('%Y-%m-%d %H:%M:%S'),
+                   'type': transaction_type, 'amount': Money(amount_cents, currency),
+                   'description': description}
+    client = {'first_name': first_name, 'last_name': last_name, 'type': client_type,
+              'email': email, 'phone': phone}
+    return transaction, client, {'iban': iban, 'currency': currency}
+
+
+def _render_batch(rows: List[Tuple], options: Dict[str, Any]) -> Tuple[List[Tuple[int, str, bytes]], int]:
+    """
+    Exécuté dans un processus du pool : (transaction, clé de cache, PDF) de
+    chaque ligne du lot, via le cache, et nombre de reçus déjà en cache
+    """
+    from receipt_cache import get_receipt_cache
+    from receipt_generator import get_receipt_renderer
+
+    renderer = get_receipt_renderer()
+    cache = get_receipt_cache()
+    receipts, cached = [], 0
+    for row in rows:
+        transaction, client, iban = _receipt_documents(row)
+        pdf, key, hit = cache.get_or_render(renderer, transaction, client, iban, **options)
+        receipts.append((transaction['id'], key, pdf))
+        cached += hit
+    return receipts, cached
+
+
+def _batches(bank, fetch_rows: int, batch_size: int, filters: Dict[str, Any]):
+    batch = []
+    for rows in bank.iter_receipt_rows(fetch_rows, **filters):
+        for row in rows:
+            batch.append(row)
+            if len(batch) == batch_size:
+                yield batch
+                batch = []
+    if batch:
+        yield batch
+
+
+def generate_receipt_batch(bank, options: Dict[str, Any], path: Optional[str] = None,
+                           workers: int = RECEIPT_WORKERS, batch_size: int = RECEIPT_BATCH_SIZE,
+                           progress: Optional[Progress] = None, **filters) -> Dict[str, Any]:
+    """
+    Écrit dans `path` (un fichier temporaire par défaut, à supprimer par
+    l'appelant) un ZIP des reçus des transactions correspondant aux filtres
+    de l'historique (date_from, date_to, client_id, iban...). `options` sont
+    les options de ReceiptRenderer.render (company_name, logo en octets,
+    receipt_title, additional_notes, include_signature). Renvoie le chemin,
+    le nombre de reçus (et combien venaient du cache), la taille et le débit.
+    """
+    from receipt_cache import options_hash
+    from receipt_generator import RENDER_DEFAULTS
+
+    # Mêmes options complétées que generate_receipt : mêmes clés de cache et même registre
+    options = {**RENDER_DEFAULTS, **options}
+    options_key = options_hash(options)
+    if path is None:
+        handle, path = tempfile.mkstemp(prefix="recus_", suffix=".zip")
+        os.close(handle)
+
+    total = bank.count_transactions(**filters)
+    start = time.perf_counter()
+    written, cached = 0, 0
+    # spawn : le serveur Streamlit a des threads et des connexions ouvertes qu'un fork recopierait
+    context = multiprocessing.get_context('spawn')
+    try:
+        # Les PDF sont déjà compressés : stockés tels quels
+        with zipfile.ZipFile(path, 'w', zipfile.ZIP_STORED) as archive, \
+                ProcessPoolExecutor(max_workers=workers, mp_context=context) as pool:
+            pending = deque()
+
+            def drain(limit: int):
+                nonlocal written, cached
+                while len(pending) > limit:
+                    receipts, hits = pending.popleft().result()
+                    for transaction_id, _, pdf in receipts:
+                        archive.writestr(f"receipt_{transaction_id}.pdf", pdf)
+                    bank.record_receipts([(transaction_id, options_key, len(pdf), key)
+                                          for transaction_id, key, pdf in receipts])
+                    written += len(receipts)
+                    cached += hits
+                    if progress is not None:
+                        progress(written, max(total, written))
+
+            for batch in _batches(bank, RECEIPT_FETCH_ROWS, batch_size, filters):
+                pending.append(pool.submit(_render_batch, batch, options))
+                drain(workers * _IN_FLIGHT_PER_WORKER)
+            drain(0)
+    except BaseException:
+        os.remove(path)
+        raise
+
+    seconds = time.perf_counter() - start
+    size = os.path.getsize(path)
+    receipts_per_s = written / seconds if seconds else 0.0
+    logger.info(f"Reçus en masse: {written} reçus dont {cached} en cache, {size / 1024 / 1024:.1f} Mo "
+                f"en {seconds:.1f} s ({receipts_per_s:,.1f} reçus/s, {workers} processus)")
+    return {
+        'path': path,
+        'receipts': written,
+        'cached': cached,
+        'size_bytes': size,
+        'seconds': round(seconds, 2),
+        'receipts_per_s': round(receipts_per_s, 1),
+    }
+
+
+def main():
+    from database import BankDatabase
+    from mysql_config import MySQLDatabase
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(message)s")
+    day = lambda s: datetime.strptime(s, "%Y-%m-%d").date()
+    parser = argparse.ArgumentParser(description="Génère les reçus d'une période dans une archive ZIP")
+    parser.add_argument("-o", "--output", required=True, help="Archive ZIP à écrire")
+    parser.add_argument("--from", dest="date_from", type=day, help="Premier jour (AAAA-MM-JJ)")
+    parser.add_argument("--to", dest="date_to", type=day, help="Dernier jour inclus (AAAA-MM-JJ)")
+    parser.add_argument("--client-id", type=int)
+    parser.add_argument("--iban")
+    parser.add_argument("--company", default="Banque Virtuelle", help="Nom de la banque sur les reçus")
+    parser.add_argument("--logo", help="Logo (PNG ou JPEG)")
+    parser.add_argument("--notes", default="", help="Notes additionnelles")
+    parser.add_argument("--no-signature", action="store_true")
+    parser.add_argument("--workers", type=int, default=RECEIPT_WORKERS)
+    parser.add_argument("--batch-size", type=int, default=RECEIPT_BATCH_SIZE)
+    args = parser.parse_args()
+
+    logo = None
+    if args.logo:
+        with open(args.logo, 'rb') as f:
+            logo = f.read()
+    options = {'company_name': args.company, 'logo': logo, 'additional_notes': args.notes,
+               'include_signature': not args.no_signature}
+
+    db = MySQLDatabase()
+    try:
+        report = generate_receipt_batch(
+            BankDatabase(db), options, args.output, args.workers, args.batch_size,
+            date_from=args.date_from, date_to=args.date_to, client_id=args.client_id, iban=args.iban,
+        )
+    finally:
+        db.close()
+    print(f"{report['receipts']} reçus écrits dans {report['path']} en {report['seconds']} s "
+          f"({report['receipts_per_s']:,.1f} reçus/s)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,294 @@
+# receipt_cache.py
+"""
+Cache des reçus PDF adressé par contenu.
+
+La clé d'un reçu est l'empreinte SHA-256 de tout ce qui détermine son rendu :
+transaction, titulaire, compte et options (banque, titre, notes, signature,
+empreinte du logo). Un reçu déjà produit avec les mêmes données est relu
+sans passer par ReportLab ; une donnée modifiée donne une autre clé, sans
+invalidation explicite. Un reçu resservi garde la date de génération de
+son premier rendu dans le pied de page.
+
+Deux niveaux :
+- mémoire : les derniers reçus servis, bornés en octets (RECEIPT_MEMORY_BYTES) ;
+- disque : un fichier <clé>.pdf par reçu dans RECEIPT_CACHE_DIR, borné en
+  octets (RECEIPT_CACHE_MAX_BYTES). Au-delà, les fichiers les moins
+  récemment servis (date de modification, mise à jour à chaque lecture,
+  y compris depuis le niveau mémoire) sont supprimés.
+
+Le répertoire peut être partagé par plusieurs processus (pool de reçus en
+masse, répliques) : chacun suit sa part de l'occupation et l'éviction
+relit le répertoire avant de supprimer.
+
+    python receipt_cache.py --stats
+"""
+import argparse
+import hashlib
+import json
+import logging
+import os
+import re
+import threading
+import time
+from collections import OrderedDict
+from datetime import date, datetime
+from decimal import Decimal
+from typing import Any, Dict, Optional, Tuple
+
+from money import Money
+
+logger = logging.getLogger(__name__)
+
+RECEIPT_CACHE_DIR = os.getenv("RECEIPT_CACHE_DIR", os.getenv("RECEIPTS_DIR", "receipts"))
+RECEIPT_CACHE_MAX_BYTES = int(os.getenv("RECEIPT_CACHE_MAX_BYTES", str(512 * 1024 * 1024)))
+RECEIPT_MEMORY_BYTES = int(os.getenv("RECEIPT_MEMORY_BYTES", str(16 * 1024 * 1024)))
+
+# À changer quand la mise en page des reçus change : les anciens fichiers ne sont plus servis
+RENDER_VERSION = 1
+
+_CACHE_FILE = re.compile(r'[0-9a-f]{64}\.pdf')
+
+
+def _canonical(value):
+    """Valeurs des documents et options sous une forme JSON stable"""
+    if isinstance(value, Money):
+        return [value.cents, value.currency]
+    if isinstance(value, (bytes, bytearray)):
+        return hashlib.sha256(value).hexdigest()
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    if isinstance(value, Decimal):
+        return str(value)
+    raise TypeError(f"Valeur non prise en charge dans une clé de reçu: {type(value).__name__}")
+
+
+# Champs lus par ReceiptRenderer : le reste des lignes (solde du compte, dates de
+# création...) ne change pas le reçu et ne doit pas changer sa clé
+TRANSACTION_FIELDS = ('id', 'date', 'type', 'amount', 'description')
+CLIENT_FIELDS = ('first_name', 'last_name', 'type', 'email', 'phone')
+IBAN_FIELDS = ('iban', 'currency')
+
+
+def _logo_reference(options: Dict[str, Any]) -> Dict[str, Any]:
+    """Logo donné par chemin : un fichier remplacé doit donner une autre clé"""
+    logo = options.get('logo')
+    if isinstance(logo, str) and os.path.exists(logo):
+        return {**options, 'logo': [os.path.abspath(logo), os.path.getmtime(logo)]}
+    return options
+
+
+def options_hash(options: Dict[str, Any]) -> str:
+    """Empreinte des seules options de rendu (banque, titre, notes, signature, logo)"""
+    payload = json.dumps(_logo_reference(options), sort_keys=True, default=_canonical, ensure_ascii=False)
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+
+def receipt_key(transaction: Dict[str, Any], client: Dict[str, Any], iban: Dict[str, Any],
+                options: Dict[str, Any]) -> str:
+    """Empreinte du reçu : mêmes données et mêmes options, même clé"""
+    options = _logo_reference(options)
+    documents = [{field: document.get(field) for field in fields}
+                 for document, fields in ((transaction, TRANSACTION_FIELDS), (client, CLIENT_FIELDS),
+                                          (iban, IBAN_FIELDS))]
+    payload = json.dumps([RENDER_VERSION, documents, options],
+                         sort_keys=True, default=_canonical, ensure_ascii=False)
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+
+class ReceiptCache:
+    def __init__(self, directory: str = RECEIPT_CACHE_DIR, max_bytes: int = RECEIPT_CACHE_MAX_BYTES,
+                 memory_bytes: int = RECEIPT_MEMORY_BYTES):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.memory_bytes = memory_bytes
+        self._lock = threading.Lock()
+        # Une seule éviction à la fois ; les autres appels n'attendent pas
+        self._evicting = threading.Lock()
+        self._memory: 'OrderedDict[str, bytes]' = OrderedDict()
+        self._memory_size = 0
+        self._disk_size: Optional[int] = None
+        self._counters = {'memory_hits': 0, 'disk_hits': 0, 'misses': 0, 'evictions': 0}
+
+    def path(self, key: str) -> str:
+        """Fichier du reçu de clé `key` dans le cache disque"""
+        return os.path.join(self.directory, f"{key}.pdf")
+
+    def _scan(self):
+        """Fichiers du cache (chemin, taille, dernière utilisation), les plus anciens d'abord"""
+        if not os.path.isdir(self.directory):
+            return []
+        entries = []
+        with os.scandir(self.directory) as files:
+            for entry in files:
+                if _CACHE_FILE.fullmatch(entry.name):
+                    try:
+                        stat = entry.stat()
+                    except FileNotFoundError:
+                        continue  # supprimé par un autre processus
+                    entries.append((entry.path, stat.st_size, stat.st_mtime))
+        entries.sort(key=lambda item: item[2])
+        return entries
+
+    def _remember(self, key: str, pdf: bytes):
+        """Place le reçu en tête du niveau mémoire (verrou tenu par l'appelant)"""
+        if len(pdf) > self.memory_bytes:
+            return
+        previous = self._memory.pop(key, None)
+        if previous is not None:
+            self._memory_size -= len(previous)
+        self._memory[key] = pdf
+        self._memory_size += len(pdf)
+        while self._memory_size > self.memory_bytes:
+            _, evicted = self._memory.popitem(last=False)
+            self._memory_size -= len(evicted)
+
+    def get(self, key: str) -> Optional[bytes]:
+        path = self.path(key)
+        with self._lock:
+            pdf = self._memory.get(key)
+            if pdf is not None:
+                self._memory.move_to_end(key)
+                self._counters['memory_hits'] += 1
+        if pdf is not None:
+            # Le fichier d'un reçu servi depuis la mémoire reste récent pour l'éviction disque
+            try:
+                os.utime(path)
+            except FileNotFoundError:
+                pass  # supprimé par un autre processus : resservi depuis la mémoire
+            return pdf
+        try:
+            with open(path, 'rb') as f:
+                pdf = f.read()
+            os.utime(path)  # dernière utilisation, pour l'éviction
+        except FileNotFoundError:
+            with self._lock:
+                self._counters['misses'] += 1
+            return None
+        with self._lock:
+            self._counters['disk_hits'] += 1
+            self._remember(key, pdf)
+        return pdf
+
+    def put(self, key: str, pdf: bytes):
+        os.makedirs(self.directory, exist_ok=True)
+        path = self.path(key)
+        added = 0
+        try:
+            # Adressé par contenu : un fichier déjà présent (autre processus) est ce même reçu
+            os.utime(path)
+        except FileNotFoundError:
+            temporary = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+            with open(temporary, 'wb') as f:
+                f.write(pdf)
+            os.replace(temporary, path)
+            added = len(pdf)
+        # Première mesure de l'occupation hors du verrou : le répertoire peut être grand
+        scanned = sum(size for _, size, _ in self._scan()) if self._disk_size is None else None
+        with self._lock:
+            self._remember(key, pdf)
+            if self._disk_size is None:
+                self._disk_size = scanned  # le fichier écrit est déjà compté
+            else:
+                self._disk_size += added
+            over_budget = self._disk_size > self.max_bytes
+        if over_budget:
+            self.evict()
+
+    def evict(self) -> int:
+        """
+        Supprime les reçus les moins récemment servis jusqu'à repasser sous le
+        budget disque. Le répertoire est relu et les fichiers supprimés hors
+        du verrou du cache : get et put ne sont pas bloqués pendant ce temps.
+        Si une éviction est déjà en cours, l'appel ne fait rien.
+        """
+        if not self._evicting.acquire(blocking=False):
+            return 0
+        try:
+            with self._lock:
+                before = self._disk_size or 0
+            entries = self._scan()
+            total = sum(size for _, size, _ in entries)
+            removed = 0
+            # Marge de 10 % : l'éviction ne se redéclenche pas à chaque nouveau reçu
+            target = self.max_bytes * 0.9
+            for path, size, _ in entries:
+                if total <= target:
+                    break
+                try:
+                    os.remove(path)
+                except FileNotFoundError:
+                    pass
+                total -= size
+                removed += 1
+            with self._lock:
+                # Les reçus ajoutés pendant l'éviction s'ajoutent à l'occupation relue
+                self._disk_size = total + (self._disk_size or 0) - before
+                self._counters['evictions'] += removed
+        finally:
+            self._evicting.release()
+        if removed:
+            logger.info(f"Cache des reçus: {removed} fichiers supprimés, {total / 1024 / 1024:.1f} Mo conservés")
+        return removed
+
+    def get_or_render(self, renderer, transaction: Dict[str, Any], client: Dict[str, Any],
+                      iban: Dict[str, Any], **options) -> Tuple[bytes, str, bool]:
+        """
+        Reçu en octets, sa clé et s'il vient du cache ; sinon rendu par
+        `renderer` (ReceiptRenderer) avec `options` puis enregistré.
+        """
+        key = receipt_key(transaction, client, iban, options)
+        pdf = self.get(key)
+        if pdf is not None:
+            return pdf, key, True
+        pdf = renderer.render(transaction, client, iban, **options)
+        self.put(key, pdf)
+        return pdf, key, False
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            hits = self._counters['memory_hits'] + self._counters['disk_hits']
+            lookups = hits + self._counters['misses']
+            return {
+                **self._counters,
+                'hit_ratio': hits / lookups if lookups else 0.0,
+                'memory_entries': len(self._memory),
+                'memory_bytes': self._memory_size,
+                'disk_bytes': self._disk_size,
+                'max_bytes': self.max_bytes,
+            }
+
+
+_receipt_cache: Optional[ReceiptCache] = None
+_receipt_cache_lock = threading.Lock()
+
+
+def get_receipt_cache() -> ReceiptCache:
+    """Renvoie le cache de reçus unique du processus"""
+    global _receipt_cache
+    if _receipt_cache is None:
+        with _receipt_cache_lock:
+            if _receipt_cache is None:
+                _receipt_cache = ReceiptCache()
+    return _receipt_cache
+
+
+def main():
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(message)s")
+    parser = argparse.ArgumentParser(description="Occupation et purge du cache des reçus")
+    parser.add_argument("--directory", default=RECEIPT_CACHE_DIR)
+    parser.add_argument("--max-mb", type=float, default=RECEIPT_CACHE_MAX_BYTES / 1024 / 1024)
+    parser.add_argument("--stats", action="store_true", help="Affiche l'occupation sans rien supprimer")
+    args = parser.parse_args()
+
+    cache = ReceiptCache(args.directory, int(args.max_mb * 1024 * 1024))
+    entries = cache._scan()
+    total = sum(size for _, size, _ in entries)
+    print(f"{len(entries)} reçus, {total / 1024 / 1024:.1f} Mo sur {args.max_mb:.0f} Mo")
+    if entries:
+        print(f"Plus ancienne utilisation: {time.strftime('%Y-%m-%d %H:%M', time.localtime(entries[0][2]))}")
+    if not args.stats and total > cache.max_bytes:
+        print(f"{cache.evict()} reçus supprimés")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,149 +1,311 @@
-from reportlab.lib.pagesizes import letter
+# receipt_generator.py
+"""
+Reçus de transaction en PDF (ReportLab).
+
+ReceiptRenderer construit une fois les styles de paragraphe, les styles de
+tableau et les logos décodés, puis rend chaque reçu dans un tampon mémoire
+et renvoie ses octets : rien n'est écrit sur disque sauf demande explicite
+(save_receipt). Le logo est réduit à sa résolution d'impression au
+décodage, et ses données sont écrites en binaire (sans ASCII85), ce qui
+allège l'intégration de l'image dans chaque PDF.
+
+generate_receipt passe par le cache des reçus (receipt_cache.py) et inscrit
+chaque reçu au registre `receipts` de la base, lu par le tableau de bord ;
+generate_receipt_pdf en garde l'ancienne interface (chemin du fichier).
+"""
+import hashlib
+import io
+import os
+import threading
+from collections import OrderedDict
+from datetime import datetime
+from typing import Any, Dict, Optional, Union
+
+from reportlab import rl_config
 from reportlab.lib import colors
+from reportlab.lib.pagesizes import letter
 from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
-from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer, Image, Table, TableStyle
 from reportlab.lib.units import inch
-from datetime import datetime
-import os
+from reportlab.lib.utils import ImageReader
+from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer, Image, Table, TableStyle
 
-def generate_receipt_pdf(transaction_data, client_data, iban_data, company_name, 
-                        logo_path=None, receipt_title="REÇU DE TRANSACTION", 
-                        additional_notes="", include_signature=True):
-    # Créer le dossier de sortie s'il n'existe pas
-    os.makedirs("receipts", exist_ok=True)
-    pdf_path = f"receipts/receipt_{transaction_data['id']}.pdf"
-    
-    # Créer le document
-    doc = SimpleDocTemplate(pdf_path, pagesize=letter,
-                           rightMargin=72, leftMargin=72,
-                           topMargin=72, bottomMargin=72)
-    
-    styles = getSampleStyleSheet()
-    
-    # Style personnalisé
-    styles.add(ParagraphStyle(
-        name='ReceiptTitle',
-        fontSize=16,
-        leading=20,
-        alignment=1,  # Centré
-        spaceAfter=20,
-        fontName='Helvetica-Bold'
-    ))
-    
-    styles.add(ParagraphStyle(
-        name='ReceiptHeader',
-        fontSize=12,
-        leading=15,
-        fontName='Helvetica-Bold',
-        spaceAfter=12
-    ))
-    
-    styles.add(ParagraphStyle(
-        name='ReceiptText',
-        fontSize=10,
-        leading=12,
-        spaceAfter=6
-    ))
-    
-    # Éléments du PDF
-    elements = []
-    
-    # En-tête avec logo
-    if logo_path and os.path.exists(logo_path):
-        logo = Image(logo_path, width=1.5*inch, height=0.75*inch)
-        elements.append(logo)
-    
-    # Titre
-    elements.append(Paragraph(receipt_title, styles['ReceiptTitle']))
-    elements.append(Paragraph(company_name, styles['ReceiptHeader']))
-    elements.append(Spacer(1, 0.25*inch))
-    
-    # Informations de la transaction
-    transaction_date = datetime.strptime(transaction_data['date'], '%Y-%m-%d %H:%M:%S').strftime('%d/%m/%Y %H:%M')
-    
-    transaction_info = [
-        ["Référence", transaction_data['id']],
-        ["Date", transaction_date],
-        ["Type", transaction_data['type']],
-        ["Montant", f"{transaction_data['amount']:,.2f} {iban_data['currency']}"],
-        ["IBAN", iban_data['iban']],
-        ["Description", transaction_data['description'] or "N/A"]
-    ]
-    
-    t = Table(transaction_info, colWidths=[1.5*inch, 4*inch])
-    t.setStyle(TableStyle([
-        ('FONTNAME', (0, 0), (-1, -1), 'Helvetica'),
-        ('FONTSIZE', (0, 0), (-1, -1), 10),
-        ('BOTTOMPADDING', (0, 0), (-1, -1), 6),
-        ('TOPPADDING', (0, 0), (-1, -1), 6),
-        ('VALIGN', (0, 0), (-1, -1), 'TOP'),
-        ('ALIGN', (0, 0), (0, -1), 'RIGHT'),
-        ('TEXTCOLOR', (0, 0), (0, -1), colors.HexColor('#555555')),
-        ('FONTNAME', (0, 0), (0, -1), 'Helvetica-Bold'),
-    ]))
-    
-    elements.append(t)
-    elements.append(Spacer(1, 0.25*inch))
-    
-    # Informations client
-    client_header = Paragraph("Informations Client", styles['ReceiptHeader'])
-    elements.append(client_header)
-    
-    client_info = [
-        ["Nom", f"{client_data['first_name']} {client_data['last_name']}"],
-        ["Type de Client", client_data['type']],
-        ["Email", client_data['email'] or "N/A"],
-        ["Téléphone", client_data['phone'] or "N/A"]
-    ]
-    
-    t = Table(client_info, colWidths=[1.5*inch, 4*inch])
-    t.setStyle(TableStyle([
-        ('FONTNAME', (0, 0), (-1, -1), 'Helvetica'),
-        ('FONTSIZE', (0, 0), (-1, -1), 10),
-        ('BOTTOMPADDING', (0, 0), (-1, -1), 6),
-        ('TOPPADDING', (0, 0), (-1, -1), 6),
-        ('VALIGN', (0, 0), (-1, -1), 'TOP'),
-        ('ALIGN', (0, 0), (0, -1), 'RIGHT'),
-        ('TEXTCOLOR', (0, 0), (0, -1), colors.HexColor('#555555')),
-        ('FONTNAME', (0, 0), (0, -1), 'Helvetica-Bold'),
-    ]))
-    
-    elements.append(t)
-    elements.append(Spacer(1, 0.25*inch))
-    
-    # Notes additionnelles
-    if additional_notes:
-        notes_header = Paragraph("Notes", styles['ReceiptHeader'])
-        elements.append(notes_header)
-        notes_text = Paragraph(additional_notes.replace('\n', '<br/>'), styles['ReceiptText'])
-        elements.append(notes_text)
-        elements.append(Spacer(1, 0.25*inch))
-    
-    # Signature
-    if include_signature:
-        signature_line = Table([["", "Signature"]], colWidths=[4*inch, 1.5*inch])
-        signature_line.setStyle(TableStyle([
+from money import Money
+from receipt_cache import get_receipt_cache, options_hash
+
+# Flux d'images en binaire plutôt qu'en ASCII85 : l'encodage ASCII85 en Python pur
+# coûtait plus que tout le reste du reçu avec logo. Réglage global de ReportLab,
+# voulu pour tout le processus : ReportLab le relit pendant chaque rendu, sans
+# option par document, et le rétablir après un reçu le changerait sous le rendu
+# d'une autre session Streamlit. Les reçus sont les seuls documents ReportLab de
+# l'application (les relevés écrivent leur PDF eux-mêmes) ; l'ASCII85 ne sert
+# qu'aux transports limités à 7 bits, pas aux fichiers ni aux téléchargements.
+rl_config.useA85 = 0
+
+# Répertoire des reçus enregistrés
+RECEIPTS_DIR = os.getenv("RECEIPTS_DIR", "receipts")
+
+# Taille du logo sur le reçu et résolution à laquelle il est conservé
+LOGO_SIZE = (1.5 * inch, 0.75 * inch)
+LOGO_DPI = 200
+
+# Logos décodés gardés en mémoire (chemins ou fichiers envoyés distincts)
+MAX_CACHED_LOGOS = 8
+
+DEFAULT_TITLE = "REÇU DE TRANSACTION"
+
+# Options de render par défaut, complétées avant le calcul des clés du cache :
+# une option omise ou donnée à sa valeur par défaut désigne le même reçu
+RENDER_DEFAULTS = {'logo': None, 'receipt_title': DEFAULT_TITLE, 'additional_notes': "",
+                   'include_signature': True}
+
+# Logo : chemin d'un fichier ou contenu (octets d'un PNG/JPEG envoyé)
+Logo = Union[str, bytes, None]
+
+
+class _CachedLogo(Image):
+    """Image dont le décodage (ImageReader) est partagé entre les reçus"""
+
+    def __init__(self, reader: ImageReader, width: float, height: float):
+        # _img renseigné avant l'initialisation : Image ne relit pas le fichier
+        self._img = reader
+        super().__init__(io.BytesIO(), width=width, height=height)
+
+
+class ReceiptRenderer:
+    """
+    Moteur de rendu des reçus, à partager : les styles et logos sont figés à
+    la construction ou au premier usage, render() peut être appelé depuis
+    plusieurs threads.
+    """
+
+    def __init__(self, pagesize=letter):
+        self.pagesize = pagesize
+        styles = getSampleStyleSheet()
+        styles.add(ParagraphStyle(
+            name='ReceiptTitle',
+            fontSize=16,
+            leading=20,
+            alignment=1,  # Centré
+            spaceAfter=20,
+            fontName='Helvetica-Bold'
+        ))
+        styles.add(ParagraphStyle(
+            name='ReceiptHeader',
+            fontSize=12,
+            leading=15,
+            fontName='Helvetica-Bold',
+            spaceAfter=12
+        ))
+        styles.add(ParagraphStyle(
+            name='ReceiptText',
+            fontSize=10,
+            leading=12,
+            spaceAfter=6
+        ))
+        styles.add(ParagraphStyle(
+            name='ReceiptFooter',
+            fontSize=8,
+            textColor=colors.HexColor('#777777'),
+            alignment=1
+        ))
+        self.styles = styles
+
+        # Tableaux libellé / valeur (transaction et client)
+        self._details_style = TableStyle([
+            ('FONTNAME', (0, 0), (-1, -1), 'Helvetica'),
+            ('FONTSIZE', (0, 0), (-1, -1), 10),
+            ('BOTTOMPADDING', (0, 0), (-1, -1), 6),
+            ('TOPPADDING', (0, 0), (-1, -1), 6),
+            ('VALIGN', (0, 0), (-1, -1), 'TOP'),
+            ('ALIGN', (0, 0), (0, -1), 'RIGHT'),
+            ('TEXTCOLOR', (0, 0), (0, -1), colors.HexColor('#555555')),
+            ('FONTNAME', (0, 0), (0, -1), 'Helvetica-Bold'),
+        ])
+        self._signature_style = TableStyle([
             ('LINEABOVE', (1, 0), (1, 0), 1, colors.black),
             ('FONTSIZE', (1, 0), (1, 0), 10),
             ('ALIGN', (1, 0), (1, 0), 'CENTER'),
             ('VALIGN', (1, 0), (1, 0), 'TOP'),
+        ])
+
+        self._logos: "OrderedDict[Any, ImageReader]" = OrderedDict()
+        self._logos_lock = threading.Lock()
+
+    # ------------------------------------------------------------------
+    # Logos
+    # ------------------------------------------------------------------
+
+    def _logo_key(self, logo: Logo):
+        if isinstance(logo, (bytes, bytearray)):
+            return hashlib.sha256(logo).hexdigest()
+        if not os.path.exists(logo):
+            return None
+        # Un fichier remplacé sur disque est redécodé
+        return (os.path.abspath(logo), os.path.getmtime(logo))
+
+    def _decode_logo(self, logo: Logo) -> ImageReader:
+        from PIL import Image as PILImage
+
+        source = io.BytesIO(logo) if isinstance(logo, (bytes, bytearray)) else logo
+        with PILImage.open(source) as image:
+            image.load()
+            # Réduit à la résolution d'impression : l'image d'origine est souvent bien plus grande
+            width, height = (round(size / inch * LOGO_DPI) for size in LOGO_SIZE)
+            image.thumbnail((width, height))
+            reader = ImageReader(image.copy())
+        reader.getRGBData()  # décodage fait une fois, pas à chaque reçu
+        return reader
+
+    def logo(self, logo: Logo) -> Optional[ImageReader]:
+        """Logo décodé (None si absent ou introuvable), gardé en mémoire pour les reçus suivants"""
+        if not logo:
+            return None
+        key = self._logo_key(logo)
+        if key is None:
+            return None
+        with self._logos_lock:
+            reader = self._logos.get(key)
+            if reader is not None:
+                self._logos.move_to_end(key)
+                return reader
+            reader = self._decode_logo(logo)
+            self._logos[key] = reader
+            if len(self._logos) > MAX_CACHED_LOGOS:
+                self._logos.popitem(last=False)
+            return reader
+
+    # ------------------------------------------------------------------
+    # Rendu
+    # ------------------------------------------------------------------
+
+    def _details(self, rows) -> Table:
+        table = Table(rows, colWidths=[1.5*inch, 4*inch])
+        table.setStyle(self._details_style)
+        return table
+
+    def render(self, transaction_data: Dict[str, Any], client_data: Dict[str, Any],
+               iban_data: Dict[str, Any], company_name: str, logo: Logo = None,
+               receipt_title: str = DEFAULT_TITLE, additional_notes: str = "",
+               include_signature: bool = True) -> bytes:
+        """Reçu de la transaction, en octets PDF"""
+        styles = self.styles
+        elements = []
+
+        # En-tête avec logo
+        reader = self.logo(logo)
+        if reader is not None:
+            elements.append(_CachedLogo(reader, *LOGO_SIZE))
+
+        # Titre
+        elements.append(Paragraph(receipt_title, styles['ReceiptTitle']))
+        elements.append(Paragraph(company_name, styles['ReceiptHeader']))
+        elements.append(Spacer(1, 0.25*inch))
+
+        # Informations de la transaction
+        transaction_date = datetime.strptime(transaction_data['date'], '%Y-%m-%d %H:%M:%S').strftime('%d/%m/%Y %H:%M')
+
+        # Montant en Money (BankDatabase) ; un montant brut est pris dans la devise du compte
+        amount = transaction_data['amount']
+        if not isinstance(amount, Money):
+            amount = Money.of(amount, iban_data['currency'])
+
+        elements.append(self._details([
+            ["Référence", transaction_data['id']],
+            ["Date", transaction_date],
+            ["Type", transaction_data['type']],
+            ["Montant", str(amount)],
+            ["IBAN", iban_data['iban']],
+            ["Description", transaction_data['description'] or "N/A"]
         ]))
-        elements.append(Spacer(1, 0.5*inch))
-        elements.append(signature_line)
-    
-    # Pied de page
-    elements.append(Spacer(1, 0.25*inch))
-    footer = Paragraph(
-        f"Reçu généré le {datetime.now().strftime('%d/%m/%Y %H:%M')} • {company_name}",
-        ParagraphStyle(
-            name='Footer',
-            fontSize=8,
-            textColor=colors.HexColor('#777777'),
-            alignment=1
-        )
-    )
-    elements.append(footer)
-    
-    # Générer le PDF
-    doc.build(elements)
-    return pdf_path
\ No newline at end of file
+        elements.append(Spacer(1, 0.25*inch))
+
+        # Informations client
+        elements.append(Paragraph("Informations Client", styles['ReceiptHeader']))
+        elements.append(self._details([
+            ["Nom", f"{client_data['first_name']} {client_data['last_name']}"],
+            ["Type de Client", client_data['type']],
+            ["Email", client_data['email'] or "N/A"],
+            ["Téléphone", client_data['phone'] or "N/A"]
+        ]))
+        elements.append(Spacer(1, 0.25*inch))
+
+        # Notes additionnelles
+        if additional_notes:
+            elements.append(Paragraph("Notes", styles['ReceiptHeader']))
+            elements.append(Paragraph(additional_notes.replace('\n', '<br/>'), styles['ReceiptText']))
+            elements.append(Spacer(1, 0.25*inch))
+
+        # Signature
+        if include_signature:
+            signature_line = Table([["", "Signature"]], colWidths=[4*inch, 1.5*inch])
+            signature_line.setStyle(self._signature_style)
+            elements.append(Spacer(1, 0.5*inch))
+            elements.append(signature_line)
+
+        # Pied de page
+        elements.append(Spacer(1, 0.25*inch))
+        elements.append(Paragraph(
+            f"Reçu généré le {datetime.now().strftime('%d/%m/%Y %H:%M')} • {company_name}",
+            styles['ReceiptFooter']
+        ))
+
+        buffer = io.BytesIO()
+        doc = SimpleDocTemplate(buffer, pagesize=self.pagesize,
+                                rightMargin=72, leftMargin=72,
+                                topMargin=72, bottomMargin=72)
+        doc.build(elements)
+        return buffer.getvalue()
+
+
+def save_receipt(pdf: bytes, transaction_id, directory: str = RECEIPTS_DIR) -> str:
+    """Écrit le reçu dans `directory` (remplacement atomique) et renvoie son chemin"""
+    os.makedirs(directory, exist_ok=True)
+    path = os.path.join(directory, f"receipt_{transaction_id}.pdf")
+    temporary = f"{path}.tmp"
+    with open(temporary, 'wb') as f:
+        f.write(pdf)
+    os.replace(temporary, path)
+    return path
+
+
+_renderer: Optional[ReceiptRenderer] = None
+_renderer_lock = threading.Lock()
+
+
+def get_receipt_renderer() -> ReceiptRenderer:
+    """Renvoie le moteur de rendu unique du processus"""
+    global _renderer
+    if _renderer is None:
+        with _renderer_lock:
+            if _renderer is None:
+                _renderer = ReceiptRenderer()
+    return _renderer
+
+
+def generate_receipt(transaction_data: Dict[str, Any], client_data: Dict[str, Any],
+                     iban_data: Dict[str, Any], bank=None, **options) -> Dict[str, Any]:
+    """
+    Reçu servi par le cache des reçus (rendu par le moteur partagé s'il en est
+    absent) et inscrit au registre `receipts` de `bank` (BankDatabase) si elle
+    est donnée. `options` sont celles de ReceiptRenderer.render. Renvoie les
+    octets, le chemin du fichier et s'il venait du cache.
+    """
+    options = {**RENDER_DEFAULTS, **options}
+    cache = get_receipt_cache()
+    pdf, key, cached = cache.get_or_render(get_receipt_renderer(), transaction_data, client_data,
+                                           iban_data, **options)
+    path = cache.path(key)
+    if bank is not None:
+        bank.record_receipt(transaction_data['id'], options_hash(options), len(pdf), key)
+    return {'pdf': pdf, 'path': path, 'cached': cached}
+
+
+def generate_receipt_pdf(transaction_data, client_data, iban_data, company_name,
+                        logo_path=None, receipt_title=DEFAULT_TITLE,
+                        additional_notes="", include_signature=True, bank=None):
+    """Reçu via le cache (voir generate_receipt), inscrit au registre si `bank` est donnée ; renvoie le chemin du fichier"""
+    return generate_receipt(
+        transaction_data, client_data, iban_data, bank=bank, company_name=company_name,
+        logo=logo_path, receipt_title=receipt_title, additional_notes=additional_notes,
+        include_signature=include_signature
+    )['path']
@@ -0,0 +1,129 @@
+# search.py
+import re
+from decimal import Decimal
+from typing import Dict, Any, List, Tuple
+
+# Opérateurs réservés du mode BOOLEAN de MATCH ... AGAINST, remplacés par des espaces
+_BOOLEAN_OPERATORS = re.compile(r'[+\-<>()~*"@.,;:\'/\\]')
+_INTEGER = re.compile(r'\d+')
+_AMOUNT = re.compile(r'\d+[.,]\d{1,2}')
+
+# Valeur par défaut de innodb_ft_min_token_size : les mots plus courts ne sont pas indexés
+MIN_TOKEN_LENGTH = 3
+
+# Index FULLTEXT utilisés par la recherche : (table, nom, colonnes)
+FULLTEXT_INDEXES = [
+    ('clients', 'ft_clients_search', 'first_name, last_name, email'),
+    ('ibans', 'ft_ibans_iban', 'iban'),
+    ('transaction_texts', 'ft_transaction_texts_description', 'description'),
+]
+
+# Clause qui ne renvoie aucune ligne quand la saisie ne contient aucun critère exploitable
+NO_MATCH = ("1 = 0", [])
+
+
+def parse_search(text: str) -> Dict[str, List[Any]]:
+    """
+    Découpe la saisie en critères de recherche.
+
+    Les entiers servent à la fois d'identifiants, de montants exacts et de
+    fragments textuels (numéros d'IBAN, téléphones) ; les décimaux ne sont
+    comparés qu'aux montants.
+    """
+    words, ids, amounts = [], [], []
+    for token in (text or '').split():
+        if _INTEGER.fullmatch(token):
+            ids.append(int(token))
+            amounts.append(Decimal(token))
+        elif _AMOUNT.fullmatch(token):
+            amounts.append(Decimal(token.replace(',', '.')))
+            continue
+        words.extend(
+            w for w in _BOOLEAN_OPERATORS.sub(' ', token).split()
+            if len(w) >= MIN_TOKEN_LENGTH
+        )
+    return {'words': words, 'ids': ids, 'amounts': amounts}
+
+
+def boolean_query(words: List[str]) -> str:
+    """Chaque mot est obligatoire et recherché par préfixe"""
+    return ' '.join(f"+{w}*" for w in words)
+
+
+def _combine(conditions: List[str], params: List[Any]) -> Tuple[str, List[Any]]:
+    if not conditions:
+        return NO_MATCH
+    return f"({' OR '.join(conditions)})", params
+
+
+def _in_list(column: str, values: List[Any]) -> str:
+    return f"{column} IN ({', '.join(['%s'] * len(values))})"
+
+
+def client_search_clause(text: str, alias: str = 'c') -> Tuple[str, List[Any]]:
+    """Recherche plein texte sur le nom et l'email, exacte sur l'identifiant"""
+    terms = parse_search(text)
+    conditions, params = [], []
+    if terms['words']:
+        conditions.append(
+            f"MATCH({alias}.first_name, {alias}.last_name, {alias}.email) AGAINST (%s IN BOOLEAN MODE)"
+        )
+        params.append(boolean_query(terms['words']))
+    if terms['ids']:
+        conditions.append(_in_list(f"{alias}.id", terms['ids']))
+        params.extend(terms['ids'])
+    return _combine(conditions, params)
+
+
+def iban_search_clause(text: str, alias: str = 'i') -> Tuple[str, List[Any]]:
+    """Recherche plein texte sur l'IBAN et le titulaire, exacte sur les identifiants et le solde"""
+    terms = parse_search(text)
+    conditions, params = [], []
+    if terms['words']:
+        against = boolean_query(terms['words'])
+        conditions.append(f"MATCH({alias}.iban) AGAINST (%s IN BOOLEAN MODE)")
+        conditions.append(
+            f"{alias}.client_id IN (SELECT id FROM clients "
+            "WHERE MATCH(first_name, last_name, email) AGAINST (%s IN BOOLEAN MODE))"
+        )
+        params.extend([against, against])
+    if terms['ids']:
+        conditions.append(_in_list(f"{alias}.id", terms['ids']))
+        conditions.append(_in_list(f"{alias}.client_id", terms['ids']))
+        params.extend(terms['ids'] * 2)
+    if terms['amounts']:
+        conditions.append(_in_list(f"{alias}.balance", terms['amounts']))
+        params.extend(terms['amounts'])
+    return _combine(conditions, params)
+
+
+def transaction_search_clause(text: str, alias: str = 't') -> Tuple[str, List[Any]]:
+    """
+    Recherche plein texte sur la description, le client et l'IBAN de la
+    transaction, exacte sur son identifiant et son montant.
+    """
+    terms = parse_search(text)
+    conditions, params = [], []
+    if terms['words']:
+        against = boolean_query(terms['words'])
+        # transactions est partitionnée, sans index FULLTEXT : les descriptions sont indexées à part
+        conditions.append(
+            f"{alias}.id IN (SELECT transaction_id FROM transaction_texts "
+            "WHERE MATCH(description) AGAINST (%s IN BOOLEAN MODE))"
+        )
+        conditions.append(
+            f"{alias}.client_id IN (SELECT id FROM clients "
+            "WHERE MATCH(first_name, last_name, email) AGAINST (%s IN BOOLEAN MODE))"
+        )
+        conditions.append(
+            f"{alias}.iban_id IN (SELECT id FROM ibans "
+            "WHERE MATCH(iban) AGAINST (%s IN BOOLEAN MODE))"
+        )
+        params.extend([against] * 3)
+    if terms['ids']:
+        conditions.append(_in_list(f"{alias}.id", terms['ids']))
+        params.extend(terms['ids'])
+    if terms['amounts']:
+        conditions.append(_in_list(f"{alias}.amount", terms['amounts']))
+        params.extend(terms['amounts'])
+    return _combine(conditions, params)
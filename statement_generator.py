@@ -0,0 +1,513 @@
+# statement_generator.py
+"""
+Relevés de compte en PDF : solde d'ouverture, chaque mouvement de la
+période avec le solde après mouvement, totaux et solde de clôture.
+
+Les soldes sont calculés par la base (BankDatabase.get_statement_summary et
+iter_statement_rows, fonction de fenêtrage SUM ... OVER) et les mouvements
+lus par blocs sur un curseur sans tampon. Ils sont dessinés ligne à ligne
+et chaque page est compressée puis écrite dans le fichier dès qu'elle est
+pleine (_PdfStream) : seules les positions des objets, deux par page,
+restent en mémoire jusqu'à la fin du document. La mémoire ne dépend donc
+pas du nombre de mouvements (benchmarks/bench_statements.py). ReportLab ne
+sert qu'à mesurer la largeur des textes.
+
+Le mode lot produit les relevés de tous les comptes dans un pool de
+processus, chacun avec sa propre connexion.
+
+    python statement_generator.py --iban-id 42 --from 2024-12-01 --to 2024-12-31
+    python statement_generator.py --all --from 2024-12-01 --to 2024-12-31 -d releves_decembre
+"""
+import argparse
+import functools
+import logging
+import multiprocessing
+import os
+import re
+import time
+import zlib
+from array import array
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from concurrent.futures.process import BrokenProcessPool
+from datetime import date, datetime
+from typing import Any, Callable, Dict, Optional
+
+from reportlab.lib.pagesizes import A4
+from reportlab.pdfbase.pdfmetrics import stringWidth
+
+from database import DEPOSIT, BankDatabase
+from money import format_cents
+
+logger = logging.getLogger(__name__)
+
+# Répertoire des relevés, mouvements lus par aller-retour, processus du mode lot
+STATEMENTS_DIR = os.getenv("STATEMENTS_DIR", "statements")
+STATEMENT_FETCH_ROWS = int(os.getenv("STATEMENT_FETCH_ROWS", "2000"))
+STATEMENT_WORKERS = int(os.getenv("STATEMENT_WORKERS", str(os.cpu_count() or 2)))
+
+# Relevés soumis par processus : assez pour ne jamais laisser un processus sans travail
+_IN_FLIGHT_PER_WORKER = 2
+
+DEFAULT_TITLE = "RELEVÉ DE COMPTE"
+
+MARGIN = 50
+GRAY = 0x77 / 0xFF  # #777777
+ROW_HEIGHT = 12
+FONT_SIZE = 8
+
+# Colonnes des mouvements : (libellé, abscisse, alignement à droite)
+COLUMNS = (
+    ("Date", MARGIN, False),
+    ("Référence", MARGIN + 62, False),
+    ("Description", MARGIN + 122, False),
+    ("Débit", 405, True),
+    ("Crédit", 470, True),
+    ("Solde", A4[0] - MARGIN, True),
+)
+DESCRIPTION_WIDTH = 405 - 70 - (MARGIN + 122)
+
+# Largeur des caractères des montants et dates : alignement à droite sans stringWidth par cellule
+_DIGIT_WIDTHS = {c: stringWidth(c, 'Helvetica', FONT_SIZE) for c in "0123456789,.-/"}
+
+# Rappel de progression du mode lot : (relevés produits, relevés à produire)
+Progress = Callable[[int, int], None]
+
+
+@functools.lru_cache(maxsize=4096)
+def _fit(text: str, width: float = DESCRIPTION_WIDTH) -> str:
+    """Description tronquée à la largeur de sa colonne (les libellés reviennent souvent : mis en cache)"""
+    if stringWidth(text, 'Helvetica', FONT_SIZE) <= width:
+        return text
+    low, high = 0, len(text)
+    while low < high:
+        middle = (low + high + 1) // 2
+        if stringWidth(text[:middle] + "…", 'Helvetica', FONT_SIZE) <= width:
+            low = middle
+        else:
+            high = middle - 1
+    return text[:low] + "…"
+
+
+def _width(text: str) -> float:
+    try:
+        return sum(map(_DIGIT_WIDTHS.__getitem__, text))
+    except KeyError:
+        return stringWidth(text, 'Helvetica', FONT_SIZE)
+
+
+# Caractères à échapper dans une chaîne PDF : délimiteurs et caractères de contrôle
+_PDF_SPECIAL = re.compile(rb'[\\()\x00-\x1f]')
+
+
+def _pdf_string(text: str) -> bytes:
+    """Chaîne littérale PDF, en WinAnsiEncoding (cp1252) comme les polices du document"""
+    data = text.encode('cp1252', 'replace')
+    return b"(" + _PDF_SPECIAL.sub(lambda match: b"\\%03o" % match.group()[0], data) + b")"
+
+
+def _pdf_text_string(text: str) -> bytes:
+    """Chaîne des métadonnées (titre, auteur), en UTF-16 pour accepter tout caractère"""
+    return b"<FEFF" + text.encode('utf-16-be').hex().upper().encode() + b">"
+
+
+class _PdfStream:
+    """
+    Fichier PDF écrit au fil des pages : le contenu d'une page est compressé
+    et écrit par end_page, puis oublié. Ne restent en mémoire que les
+    positions des objets, nécessaires à la table des références (close).
+    """
+
+    # Objets écrits en tête ; chaque page ajoute ensuite son contenu et son objet page
+    CATALOG, PAGES, FONT, BOLD_FONT, INFO = range(1, 6)
+    FONTS = {'Helvetica': b'/F1', 'Helvetica-Bold': b'/F2'}
+
+    def __init__(self, output, title: str, author: str):
+        self.owns_file = isinstance(output, str)
+        self.file = open(output, 'wb') if self.owns_file else output
+        self.position = 0
+        self.offsets = array('q', [0] * self.INFO)
+        self.pages = 0
+        self.content = []
+        self.font = None
+        self._write(b"%PDF-1.4\n%\xe2\xe3\xcf\xd3\n")
+        self._object(self.CATALOG, b"<< /Type /Catalog /Pages %d 0 R >>" % self.PAGES)
+        for number, name in ((self.FONT, b'Helvetica'), (self.BOLD_FONT, b'Helvetica-Bold')):
+            self._object(number, b"<< /Type /Font /Subtype /Type1 /BaseFont /%s /Encoding /WinAnsiEncoding >>" % name)
+        self._object(self.INFO, b"<< /Title %s /Author %s /Producer (statement_generator) /CreationDate (D:%s) >>"
+                     % (_pdf_text_string(title), _pdf_text_string(author), datetime.now().strftime('%Y%m%d%H%M%S').encode()))
+
+    def _write(self, data: bytes):
+        self.file.write(data)
+        self.position += len(data)
+
+    def _object(self, number: int, body: bytes, stream: Optional[bytes] = None):
+        if number > len(self.offsets):
+            self.offsets.append(self.position)
+        else:
+            self.offsets[number - 1] = self.position
+        self._write(b"%d 0 obj\n%s\n" % (number, body))
+        if stream is not None:
+            self._write(b"stream\n%s\nendstream\n" % stream)
+        self._write(b"endobj\n")
+
+    # Opérateurs de dessin, ajoutés au contenu de la page courante
+
+    def text(self, x: float, y: float, text: str, font: str = 'Helvetica', size: float = FONT_SIZE):
+        # La police fait partie de l'état graphique : elle persiste d'un objet texte à l'autre
+        if self.font != (font, size):
+            self.font = (font, size)
+            self.content.append(b"%s %g Tf\n" % (self.FONTS[font], size))
+        self.content.append(b"BT %.2f %.2f Td %s Tj ET\n" % (x, y, _pdf_string(text)))
+
+    def line(self, x1: float, y1: float, x2: float, y2: float):
+        self.content.append(b"%.2f %.2f m %.2f %.2f l S\n" % (x1, y1, x2, y2))
+
+    def stroke_gray(self, level: float):
+        self.content.append(b"%.3f G\n" % level)
+
+    def fill_gray(self, level: float):
+        self.content.append(b"%.3f g\n" % level)
+
+    def end_page(self):
+        """Écrit la page courante ; la suivante repart de l'état graphique par défaut"""
+        number = self.INFO + 2 * self.pages + 1
+        data = zlib.compress(b"".join(self.content))
+        self._object(number, b"<< /Length %d /Filter /FlateDecode >>" % len(data), data)
+        self._object(number + 1, b"<< /Type /Page /Parent %d 0 R /Contents %d 0 R >>" % (self.PAGES, number))
+        self.pages += 1
+        self.content = []
+        self.font = None
+
+    def close(self):
+        """Arbre des pages, table des références et fin de fichier"""
+        self.offsets[self.PAGES - 1] = self.position
+        self._write(b"%d 0 obj\n<< /Type /Pages /Count %d /MediaBox [0 0 %.4f %.4f] "
+                    b"/Resources << /Font << /F1 %d 0 R /F2 %d 0 R >> >>\n/Kids ["
+                    % (self.PAGES, self.pages, A4[0], A4[1], self.FONT, self.BOLD_FONT))
+        # Par tranches : ni la liste des pages ni la table ne sont construites en entier
+        for low in range(0, self.pages, 1000):
+            pages = range(low, min(self.pages, low + 1000))
+            self._write(b" ".join(b"%d 0 R" % (self.INFO + 2 * page + 2) for page in pages) + b"\n")
+        self._write(b"] >>\nendobj\n")
+
+        xref = self.position
+        self._write(b"xref\n0 %d\n0000000000 65535 f \n" % (len(self.offsets) + 1))
+        for low in range(0, len(self.offsets), 1000):
+            self._write(b"".join(b"%010d 00000 n \n" % offset for offset in self.offsets[low:low + 1000]))
+        self._write(b"trailer\n<< /Size %d /Root %d 0 R /Info %d 0 R >>\nstartxref\n%d\n%%%%EOF\n"
+                    % (len(self.offsets) + 1, self.CATALOG, self.INFO, xref))
+        self.discard()
+
+    def discard(self):
+        """Ferme le fichier s'il a été ouvert ici (après close, ou en cas d'erreur)"""
+        if self.owns_file:
+            self.file.close()
+        else:
+            self.file.flush()
+
+
+class StatementWriter:
+    """Mise en page d'un relevé, alimentée bloc par bloc (add_rows) puis fermée (close)"""
+
+    def __init__(self, output, summary: Dict[str, Any], date_from: date, date_to: date,
+                 company_name: str, title: str = DEFAULT_TITLE):
+        self.summary = summary
+        self.period = f"du {date_from:%d/%m/%Y} au {date_to:%d/%m/%Y}"
+        self.company_name = company_name
+        self.title = title
+        self.pdf = _PdfStream(output, f"{title} {summary['iban']} {self.period}", company_name)
+        self.generated_at = datetime.now().strftime('%d/%m/%Y %H:%M')
+        self.pages = 0
+        self.movements = 0
+        self.closing_cents = summary['opening_cents']
+        self.y = 0
+        self._new_page()
+
+    # ------------------------------------------------------------------
+    # Pages
+    # ------------------------------------------------------------------
+
+    def _text(self, x: float, y: float, text: str, right: bool = False, font: str = 'Helvetica',
+              size: float = FONT_SIZE):
+        if right:
+            x -= stringWidth(text, font, size)
+        self.pdf.text(x, y, text, font, size)
+
+    def _amount(self, cents: int) -> str:
+        return format_cents(cents)
+
+    def _new_page(self):
+        if self.pages:
+            self.pdf.end_page()
+        self.pages += 1
+        width, height = A4
+        summary = self.summary
+        y = height - MARGIN
+
+        self._text(MARGIN, y, self.company_name, font='Helvetica-Bold', size=12)
+        self._text(width - MARGIN, y, self.title, right=True, font='Helvetica-Bold', size=12)
+        y -= 16
+        self._text(MARGIN, y, f"IBAN {summary['iban']} ({summary['currency']})", size=9)
+        self._text(width - MARGIN, y, self.period, right=True, size=9)
+        y -= 20
+
+        if self.pages == 1:
+            # Titulaire et synthèse de la période, connus avant le premier mouvement
+            self._text(MARGIN, y, "Titulaire", font='Helvetica-Bold', size=9)
+            self._text(300, y, "Synthèse", font='Helvetica-Bold', size=9)
+            holder = [f"{summary['first_name']} {summary['last_name']}", summary['email'] or "",
+                      f"Compte {summary['account_type'] or ''}".strip()]
+            totals = [
+                ("Solde d'ouverture", summary['opening_cents']),
+                ("Total des crédits", summary['deposits_cents']),
+                ("Total des débits", summary['withdrawals_cents']),
+                ("Solde de clôture", summary['closing_cents']),
+            ]
+            for index, (label, cents) in enumerate(totals):
+                y -= ROW_HEIGHT
+                if index < len(holder):
+                    self._text(MARGIN, y, holder[index], size=9)
+                self._text(300, y, label, size=9)
+                self._text(width - MARGIN, y, f"{self._amount(cents)} {summary['currency']}", right=True, size=9)
+            y -= ROW_HEIGHT
+            self._text(300, y, f"{summary['movements']:,} mouvements", size=9)
+            y -= 24
+
+        for label, x, right in COLUMNS:
+            self._text(x, y, label, right=right, font='Helvetica-Bold')
+        y -= 4
+        self.pdf.stroke_gray(GRAY)
+        self.pdf.line(MARGIN, y, width - MARGIN, y)
+        self.y = y - ROW_HEIGHT
+
+        footer = f"Page {self.pages} • Relevé généré le {self.generated_at} • {self.company_name}"
+        self.pdf.fill_gray(GRAY)
+        self.pdf.text((width - stringWidth(footer, 'Helvetica', 7)) / 2, MARGIN / 2, footer, size=7)
+        self.pdf.fill_gray(0)
+
+    def _ensure_room(self, lines: int = 1):
+        if self.y - (lines - 1) * ROW_HEIGHT < MARGIN:
+            self._new_page()
+
+    # ------------------------------------------------------------------
+    # Mouvements
+    # ------------------------------------------------------------------
+
+    def _line(self, date_text: str, reference: str, description: str, debit: str, credit: str, balance: str):
+        for (_, x, right), text in zip(COLUMNS, (date_text, reference, description, debit, credit, balance)):
+            if text:
+                self.pdf.text(x - _width(text) if right else x, self.y, text)
+        self.y -= ROW_HEIGHT
+
+    def add_rows(self, rows):
+        """Mouvements (id, date, type, amount_cents, description, balance_cents) de iter_statement_rows"""
+        if not self.movements and rows:
+            self._ensure_room()
+            self._line("", "", "Solde d'ouverture", "", "", self._amount(self.summary['opening_cents']))
+        for transaction_id, moment, transaction_type, amount_cents, description, balance_cents in rows:
+            self._ensure_room()
+            amount = self._amount(amount_cents)
+            deposit = transaction_type == DEPOSIT
+            self._line(f"{moment:%d/%m/%Y}", str(transaction_id),
+                       _fit(description or ""),
+                       "" if deposit else amount, amount if deposit else "", self._amount(balance_cents))
+            self.movements += 1
+            self.closing_cents = balance_cents
+
+    def discard(self):
+        """Abandonne un relevé inachevé (erreur de lecture des mouvements)"""
+        self.pdf.discard()
+
+    def close(self) -> Dict[str, Any]:
+        """Solde de clôture, puis écriture du document ; renvoie pages et mouvements"""
+        summary = self.summary
+        if not self.movements:
+            self._ensure_room()
+            self._line("", "", "Aucun mouvement sur la période", "", "", self._amount(summary['opening_cents']))
+        closing = self.closing_cents
+        self._ensure_room(2)
+        self.y -= 4
+        self.pdf.line(MARGIN, self.y + ROW_HEIGHT - 2, A4[0] - MARGIN, self.y + ROW_HEIGHT - 2)
+        self._text(COLUMNS[2][1], self.y, "Solde de clôture", font='Helvetica-Bold')
+        self._text(COLUMNS[-1][1], self.y, f"{self._amount(closing)} {summary['currency']}",
+                   right=True, font='Helvetica-Bold')
+        self.pdf.end_page()
+        self.pdf.close()
+        return {'pages': self.pages, 'movements': self.movements, 'closing_cents': closing}
+
+
+def statement_path(summary: Dict[str, Any], date_from: date, date_to: date,
+                   directory: str = STATEMENTS_DIR) -> str:
+    iban = ''.join(summary['iban'].split())
+    return os.path.join(directory, f"releve_{iban}_{date_from:%Y%m%d}_{date_to:%Y%m%d}.pdf")
+
+
+def generate_statement(bank, iban_id, date_from: date, date_to: date, output=None,
+                       company_name: str = "Banque Virtuelle", directory: str = STATEMENTS_DIR,
+                       chunk_size: int = STATEMENT_FETCH_ROWS) -> Optional[Dict[str, Any]]:
+    """
+    Relevé du compte `iban_id` sur [date_from, date_to], écrit dans `output`
+    (chemin ou fichier binaire ouvert ; par défaut dans `directory`, écriture
+    atomique). Renvoie le chemin, les soldes en centimes, le nombre de pages et
+    de mouvements, ou None si le compte n'existe pas. Une période antérieure
+    aux mois archivés lève ValueError.
+    """
+    start = time.perf_counter()
+    summary = bank.get_statement_summary(iban_id, date_from, date_to)
+    if summary is None:
+        return None
+
+    path = None
+    target = output
+    if output is None:
+        os.makedirs(directory, exist_ok=True)
+        path = statement_path(summary, date_from, date_to, directory)
+        target = f"{path}.{os.getpid()}.tmp"
+    elif isinstance(output, str):
+        path = output
+
+    writer = StatementWriter(target, summary, date_from, date_to, company_name)
+    try:
+        for rows in bank.iter_statement_rows(iban_id, date_from, date_to, summary['opening_cents'], chunk_size):
+            writer.add_rows(rows)
+        result = writer.close()
+    except BaseException:
+        writer.discard()
+        if output is None and os.path.exists(target):
+            os.remove(target)
+        raise
+    if output is None:
+        os.replace(target, path)
+
+    if result['closing_cents'] != summary['closing_cents']:
+        # Mouvements enregistrés sur la période entre la synthèse et la lecture des lignes
+        logger.warning(f"Relevé {summary['iban']}: solde de clôture {result['closing_cents']} "
+                       f"au lieu de {summary['closing_cents']} (mouvements concurrents)")
+    return {
+        'path': path,
+        'iban': summary['iban'],
+        'currency': summary['currency'],
+        'opening_cents': summary['opening_cents'],
+        'closing_cents': result['closing_cents'],
+        'movements': result['movements'],
+        'pages': result['pages'],
+        'seconds': round(time.perf_counter() - start, 2),
+    }
+
+
+# Accès aux données d'un processus du pool, ouvert par _init_worker
+_worker: Dict[str, Any] = {}
+
+
+def _init_worker():
+    from mysql_config import MySQLDatabase
+    # Connexion ouverte avant le premier relevé : le service paresseux de
+    # get_database() refuserait les requêtes tant que le pool n'est pas prêt
+    _worker['bank'] = BankDatabase(MySQLDatabase(pool_settings={'min_size': 1, 'max_size': 1}))
+
+
+def _statement_job(iban_id, date_from: date, date_to: date, directory: str,
+                   company_name: str) -> Optional[Dict[str, Any]]:
+    """Exécuté dans un processus du pool, sur l'accès aux données de ce processus"""
+    return generate_statement(_worker['bank'], iban_id, date_from, date_to,
+                              company_name=company_name, directory=directory)
+
+
+def generate_all_statements(bank, date_from: date, date_to: date, directory: str = STATEMENTS_DIR,
+                            company_name: str = "Banque Virtuelle", workers: int = STATEMENT_WORKERS,
+                            progress: Optional[Progress] = None) -> Dict[str, Any]:
+    """
+    Relevés de tous les comptes sur la période, un fichier par compte dans
+    `directory`, produits en parallèle par `workers` processus. Un relevé en
+    échec est journalisé et compté sans interrompre les autres.
+    """
+    iban_ids = bank.get_statement_iban_ids()
+    os.makedirs(directory, exist_ok=True)
+    start = time.perf_counter()
+    done, failed, movements, pages = 0, 0, 0, 0
+    # spawn : le serveur Streamlit a des threads et des connexions ouvertes qu'un fork recopierait
+    context = multiprocessing.get_context('spawn')
+    with ProcessPoolExecutor(max_workers=workers, mp_context=context, initializer=_init_worker) as pool:
+        pending = {}
+
+        def collect(limit: int):
+            nonlocal done, failed, movements, pages
+            while len(pending) > limit:
+                finished, _ = wait(pending, return_when=FIRST_COMPLETED)
+                for future in finished:
+                    iban_id = pending.pop(future)
+                    try:
+                        result = future.result()
+                    except BrokenProcessPool:
+                        raise  # processus arrêté brutalement : le lot entier est compromis
+                    except Exception as e:
+                        failed += 1
+                        logger.error(f"Relevé du compte {iban_id} en échec: {e}")
+                    else:
+                        if result is not None:
+                            movements += result['movements']
+                            pages += result['pages']
+                    done += 1
+                    if progress is not None:
+                        progress(done, len(iban_ids))
+
+        # Nombre de relevés soumis borné : la mémoire ne dépend pas du nombre de comptes
+        for iban_id in iban_ids:
+            future = pool.submit(_statement_job, iban_id, date_from, date_to, directory, company_name)
+            pending[future] = iban_id
+            collect(workers * _IN_FLIGHT_PER_WORKER)
+        collect(0)
+
+    seconds = time.perf_counter() - start
+    statements_per_s = done / seconds if seconds else 0.0
+    logger.info(f"Relevés: {done - failed} comptes, {movements:,} mouvements, {pages:,} pages en {seconds:.1f} s "
+                f"({statements_per_s:,.1f} relevés/s, {workers} processus), {failed} en échec")
+    return {
+        'directory': directory,
+        'statements': done - failed,
+        'failed': failed,
+        'movements': movements,
+        'pages': pages,
+        'seconds': round(seconds, 2),
+        'statements_per_s': round(statements_per_s, 1),
+    }
+
+
+def main():
+    from database import BankDatabase
+    from mysql_config import MySQLDatabase
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(message)s")
+    day = lambda s: datetime.strptime(s, "%Y-%m-%d").date()
+    parser = argparse.ArgumentParser(description="Relevés de compte en PDF")
+    target = parser.add_mutually_exclusive_group(required=True)
+    target.add_argument("--iban-id", type=int, help="Relevé d'un seul compte")
+    target.add_argument("--all", action="store_true", help="Relevés de tous les comptes, en parallèle")
+    parser.add_argument("--from", dest="date_from", type=day, required=True, help="Premier jour (AAAA-MM-JJ)")
+    parser.add_argument("--to", dest="date_to", type=day, required=True, help="Dernier jour inclus (AAAA-MM-JJ)")
+    parser.add_argument("-d", "--directory", default=STATEMENTS_DIR)
+    parser.add_argument("--company", default="Banque Virtuelle", help="Nom de la banque sur les relevés")
+    parser.add_argument("--workers", type=int, default=STATEMENT_WORKERS)
+    args = parser.parse_args()
+
+    db = MySQLDatabase()
+    try:
+        bank = BankDatabase(db)
+        if args.all:
+            report = generate_all_statements(bank, args.date_from, args.date_to, args.directory,
+                                             args.company, args.workers)
+            print(f"{report['statements']} relevés écrits dans {report['directory']} en {report['seconds']} s "
+                  f"({report['statements_per_s']:,.1f} relevés/s), {report['failed']} en échec")
+        else:
+            report = generate_statement(bank, args.iban_id, args.date_from, args.date_to,
+                                        company_name=args.company, directory=args.directory)
+            if report is None:
+                raise SystemExit(f"Compte {args.iban_id} introuvable")
+            print(f"{report['path']}: {report['movements']:,} mouvements, {report['pages']} pages, "
+                  f"solde de clôture {format_cents(report['closing_cents'], report['currency'])}")
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    main()
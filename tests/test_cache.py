@@ -0,0 +1,80 @@
+# tests/test_cache.py
+from cache import VersionedCache, cached_read
+
+
+class Loader:
+    def __init__(self):
+        self.calls = 0
+
+    def __call__(self):
+        self.calls += 1
+        return self.calls
+
+
+def test_hit_until_a_table_is_bumped():
+    cache, load = VersionedCache(), Loader()
+    assert cache.get_or_load('k', ('clients',), load) == 1
+    assert cache.get_or_load('k', ('clients',), load) == 1
+    cache.bump('ibans')  # table non lue : l'entrée reste valide
+    assert cache.get_or_load('k', ('clients',), load) == 1
+    cache.bump('clients')
+    assert cache.get_or_load('k', ('clients',), load) == 2
+    stats = cache.stats()
+    assert (stats['hits'], stats['misses'], stats['stale']) == (2, 2, 1)
+
+
+def test_entry_depends_on_every_table():
+    cache, load = VersionedCache(), Loader()
+    cache.get_or_load('k', ('clients', 'ibans'), load)
+    cache.bump('ibans')
+    assert cache.get_or_load('k', ('clients', 'ibans'), load) == 2
+
+
+def test_ttl_expires_entries():
+    cache, load = VersionedCache(ttl=0), Loader()
+    cache.get_or_load('k', ('clients',), load)
+    assert cache.get_or_load('k', ('clients',), load) == 2
+    assert cache.stats()['expired'] == 1
+
+
+def test_write_during_load_leaves_the_entry_stale():
+    cache = VersionedCache()
+
+    def load():
+        cache.bump('clients')  # écriture concurrente pendant la lecture
+        return 'old'
+
+    assert cache.get_or_load('k', ('clients',), load) == 'old'
+    assert cache.get_or_load('k', ('clients',), lambda: 'new') == 'new'
+
+
+def test_lru_eviction():
+    cache = VersionedCache(max_entries=2)
+    for key in ('a', 'b'):
+        cache.get_or_load(key, (), lambda: key)
+    cache.get_or_load('a', (), lambda: 'reloaded')  # 'a' redevient la plus récente
+    cache.get_or_load('c', (), lambda: 'c')
+    assert cache.get_or_load('a', (), lambda: 'reloaded') == 'a'
+    assert cache.get_or_load('b', (), lambda: 'reloaded') == 'reloaded'
+    assert cache.stats()['evictions'] >= 1
+
+
+def test_cached_read_keys_on_arguments():
+    class Bank:
+        def __init__(self):
+            self.cache = VersionedCache()
+            self.calls = 0
+
+        @cached_read('clients')
+        def get_client(self, client_id):
+            self.calls += 1
+            return {'id': client_id}
+
+    bank = Bank()
+    bank.get_client(1)
+    bank.get_client(1)
+    bank.get_client(2)
+    assert bank.calls == 2
+    bank.cache.bump('clients')
+    bank.get_client(1)
+    assert bank.calls == 3
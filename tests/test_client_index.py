@@ -0,0 +1,59 @@
+# tests/test_client_index.py
+import pytest
+
+from client_index import ClientIndex
+
+CLIENTS = [
+    {'id': 1, 'first_name': "Hélène", 'last_name': "Dupont", 'email': "helene.dupont@example.com"},
+    {'id': 2, 'first_name': "Jean", 'last_name': "Dupond", 'email': "jd@example.com"},
+    {'id': 3, 'first_name': "Jean", 'last_name': "Jean", 'email': "jean.jean@example.com"},
+    {'id': 12, 'first_name': "Marc", 'last_name': "Lepont", 'email': None},
+    {'id': 21, 'first_name': "Anne", 'last_name': "Martin", 'email': "anne@example.com"},
+]
+
+
+@pytest.fixture
+def index():
+    index = ClientIndex()
+    index.load(CLIENTS)
+    return index
+
+
+def ids(results):
+    return [client['id'] for client in results]
+
+
+def test_prefix_search_ignores_case_and_accents(index):
+    assert ids(index.search("HELENE")) == [1]
+    assert set(ids(index.search("dupon"))) == {1, 2}
+
+
+def test_every_word_must_match(index):
+    assert ids(index.search("jean dupond")) == [2]
+    assert ids(index.search("jean durand")) == []
+
+
+def test_repeated_word_keeps_the_other_occurrence(index):
+    assert set(ids(index.search("jean jean"))) == {2, 3}
+
+
+def test_exact_id_comes_first(index):
+    results = ids(index.search("12"))
+    assert results[0] == 12
+
+
+def test_substring_fallback_on_full_name(index):
+    assert set(ids(index.search("pont"))) == {1, 12}
+
+
+def test_limit_and_empty_query(index):
+    assert len(index.search("", limit=2)) == 2
+    assert len(index.search("jean", limit=1)) == 1
+
+
+def test_upsert_and_remove_keep_the_index_consistent(index):
+    index.upsert({'id': 2, 'first_name': "Jean", 'last_name': "Durand", 'email': "jd@example.com"})
+    assert ids(index.search("dupond")) == []
+    assert ids(index.search("durand")) == [2]
+    index.remove(2)
+    assert ids(index.search("durand")) == []
@@ -0,0 +1,132 @@
+# tests/test_connection_pool.py
+"""Pool de connexions sur des connexions factices : aucun serveur MySQL"""
+import threading
+import time
+
+import pytest
+
+pytest.importorskip("mysql.connector")
+
+from mysql.connector.errors import PoolError  # noqa: E402
+
+from mysql_config import ConnectionPool  # noqa: E402
+
+
+class FakeConnection:
+    def __init__(self):
+        self.in_transaction = False
+        self.closed = False
+
+    def ping(self, **kwargs):
+        pass
+
+    def rollback(self):
+        self.in_transaction = False
+
+    def close(self):
+        self.closed = True
+
+
+@pytest.fixture(autouse=True)
+def fake_connections(monkeypatch):
+    opened = []
+
+    def connect(pool):
+        cnx = FakeConnection()
+        opened.append(cnx)
+        return cnx
+
+    monkeypatch.setattr(ConnectionPool, '_connect', connect)
+    return opened
+
+
+def test_pool_grows_on_demand_up_to_max_size(fake_connections):
+    pool = ConnectionPool({}, min_size=1, max_size=2, wait_timeout=0.05)
+    assert len(fake_connections) == 1
+    first, second = pool.get_connection(), pool.get_connection()
+    assert len(fake_connections) == 2
+    with pytest.raises(PoolError):
+        pool.get_connection()
+    metrics = pool.metrics()
+    assert (metrics['size'], metrics['in_use'], metrics['exhausted'], metrics['timeouts']) == (2, 2, 1, 1)
+    first.close()
+    second.close()
+    assert pool.metrics()['idle'] == 2
+
+
+def test_released_connection_is_reused_and_rolled_back():
+    pool = ConnectionPool({}, min_size=1, max_size=1)
+    conn = pool.get_connection()
+    cnx = conn._cnx
+    cnx.in_transaction = True
+    conn.close()
+    assert not cnx.in_transaction
+    with pool.get_connection() as again:
+        assert again._cnx is cnx
+
+
+def test_waiters_are_served_in_arrival_order():
+    pool = ConnectionPool({}, min_size=1, max_size=1, wait_timeout=5)
+    held = pool.get_connection()
+    served = []
+
+    def wait(name):
+        with pool.get_connection():
+            served.append(name)
+
+    threads = []
+    for name in ('premier', 'deuxième', 'troisième'):
+        thread = threading.Thread(target=wait, args=(name,))
+        thread.start()
+        threads.append(thread)
+        while pool.metrics()['waiting'] < len(threads):
+            time.sleep(0.001)
+    held.close()
+    for thread in threads:
+        thread.join(5)
+    assert served == ['premier', 'deuxième', 'troisième']
+    assert pool.metrics()['timeouts'] == 0
+
+
+def test_wait_queue_is_bounded():
+    pool = ConnectionPool({}, min_size=1, max_size=1, wait_timeout=5, max_waiters=1)
+    held = pool.get_connection()
+    waiter = threading.Thread(target=lambda: pool.get_connection().close())
+    waiter.start()
+    while pool.metrics()['waiting'] < 1:
+        time.sleep(0.001)
+    with pytest.raises(PoolError):
+        pool.get_connection()
+    assert pool.metrics()['rejected'] == 1
+    held.close()
+    waiter.join(5)
+
+
+def test_timed_out_waiter_leaves_the_queue():
+    pool = ConnectionPool({}, min_size=1, max_size=1)
+    held = pool.get_connection()
+    with pytest.raises(PoolError):
+        pool.get_connection(timeout=0.01)
+    assert pool.metrics()['waiting'] == 0
+    held.close()
+    pool.get_connection(timeout=0.01).close()
+
+
+def test_closeall_wakes_waiters():
+    pool = ConnectionPool({}, min_size=1, max_size=1, wait_timeout=5)
+    pool.get_connection()
+    errors = []
+
+    def wait():
+        try:
+            pool.get_connection()
+        except PoolError as e:
+            errors.append(e)
+
+    thread = threading.Thread(target=wait)
+    thread.start()
+    while pool.metrics()['waiting'] < 1:
+        time.sleep(0.001)
+    pool.closeall()
+    thread.join(5)
+    assert len(errors) == 1
@@ -0,0 +1,48 @@
+# tests/test_money.py
+from decimal import Decimal
+
+import pytest
+
+from money import Money, format_cents, format_totals, to_cents
+
+
+@pytest.mark.parametrize("value, cents", [
+    (12, 1200),
+    (0.1, 10),
+    (19.99, 1999),
+    (Decimal("1234.5"), 123450),
+    ("0.005", 1),            # demi arrondi au supérieur
+    ("-0.005", -1),
+    ("1e3", 100000),
+    (Money(250, 'EUR'), 250),
+])
+def test_to_cents(value, cents):
+    assert to_cents(value) == cents
+
+
+@pytest.mark.parametrize("value", [True, None, "abc", "NaN", "Infinity", [1]])
+def test_to_cents_rejects_invalid_amounts(value):
+    with pytest.raises(ValueError):
+        to_cents(value)
+
+
+@pytest.mark.parametrize("cents, currency, text", [
+    (0, '', "0.00"),
+    (5, '', "0.05"),
+    (-5, '', "-0.05"),
+    (1234567, 'EUR', "12,345.67 EUR"),
+    (-100000, 'USD', "-1,000.00 USD"),
+])
+def test_format_cents(cents, currency, text):
+    assert format_cents(cents, currency) == text
+
+
+def test_format_totals_sorted_by_currency():
+    assert format_totals({'USD': 300, 'EUR': 1250}) == "12.50 EUR · 3.00 USD"
+    assert format_totals({}) == "0.00"
+
+
+def test_money_arithmetic_checks_currency():
+    assert sum([Money(100, 'EUR'), Money(250, 'EUR')]) == Money(350, 'EUR')
+    with pytest.raises(ValueError):
+        Money(100, 'EUR') + Money(100, 'USD')
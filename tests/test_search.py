@@ -0,0 +1,34 @@
+# tests/test_search.py
+from decimal import Decimal
+
+from search import NO_MATCH, boolean_query, client_search_clause, parse_search
+
+
+def test_parse_search_splits_ids_amounts_and_words():
+    terms = parse_search("Dupont 42 12,50 jean-pierre")
+    assert terms['ids'] == [42]
+    assert terms['amounts'] == [Decimal(42), Decimal("12.50")]
+    # Les entiers servent aussi de fragments textuels, pas les décimaux
+    assert terms['words'] == ["Dupont", "jean", "pierre"]
+
+
+def test_parse_search_drops_short_words_and_boolean_operators():
+    terms = parse_search('+de "la" (martin)* ~x')
+    assert terms['words'] == ["martin"]
+    assert terms['ids'] == [] and terms['amounts'] == []
+
+
+def test_parse_search_empty():
+    assert parse_search(None) == {'words': [], 'ids': [], 'amounts': []}
+    assert parse_search("   ") == {'words': [], 'ids': [], 'amounts': []}
+
+
+def test_boolean_query_requires_every_prefix():
+    assert boolean_query(["jean", "dupont"]) == "+jean* +dupont*"
+
+
+def test_client_clause_without_usable_terms_matches_nothing():
+    assert client_search_clause("a b") == NO_MATCH
+    clause, params = client_search_clause("martin 7")
+    assert "MATCH(c.first_name, c.last_name, c.email)" in clause and "c.id IN (%s)" in clause
+    assert params == ["+martin*", 7]  # « 7 » trop court pour l'index plein texte
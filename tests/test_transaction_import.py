@@ -0,0 +1,65 @@
+# tests/test_transaction_import.py
+import io
+from datetime import datetime
+
+import pytest
+
+pytest.importorskip("mysql.connector")
+
+from database import DEPOSIT, WITHDRAWAL  # noqa: E402
+from transaction_import import parse_amount, parse_date, read_statement  # noqa: E402
+
+NOW = datetime(2024, 12, 31, 12, 0)
+
+
+@pytest.mark.parametrize("text, cents", [
+    ("1234.5", 123450),
+    ("1 234,50", 123450),
+    ("1\u00a0234,50", 123450),  # espace insécable des tableurs
+    ("1\u202f234,50", 123450),
+    ("0.01", 1),
+])
+def test_parse_amount(text, cents):
+    assert parse_amount(text) == cents
+
+
+@pytest.mark.parametrize("text", ["", "abc", "0", "-5", "1.234", "10000000000000"])
+def test_parse_amount_rejects(text):
+    with pytest.raises(ValueError):
+        parse_amount(text)
+
+
+@pytest.mark.parametrize("text, expected", [
+    ("2024-03-05", datetime(2024, 3, 5)),
+    ("2024-03-05 14:30:00", datetime(2024, 3, 5, 14, 30)),
+    ("05/03/2024", datetime(2024, 3, 5)),
+    ("05/03/2024 08:15:00", datetime(2024, 3, 5, 8, 15)),
+    ("", NOW),
+    (None, NOW),
+])
+def test_parse_date(text, expected):
+    assert parse_date(text, NOW) == expected
+
+
+def test_parse_date_rejects_unknown_format():
+    with pytest.raises(ValueError):
+        parse_date("5 mars 2024", NOW)
+
+
+def test_read_statement_maps_debits_and_credits():
+    statement = io.StringIO(
+        "Relevé de compte;\n"
+        "IBAN;FR76 3000 6000 0112 3456 7890 189\n"
+        "\n"
+        "Date;Libellé;Débit;Crédit\n"
+        "02/12/2024;Loyer;-850,00;\n"
+        "03/12/2024;Salaire;;2 400,00\n"
+        "04/12/2024;Erreur;10,00;10,00\n"
+    )
+    rows = list(read_statement(statement))
+    assert [line for line, _ in rows] == [5, 6, 7]
+    loyer, salaire, erreur = (fields for _, fields in rows)
+    assert loyer == {'iban': "FR76 3000 6000 0112 3456 7890 189", 'type': WITHDRAWAL, 'amount': "850,00",
+                     'description': "Loyer", 'date': "02/12/2024"}
+    assert salaire['type'] == DEPOSIT and salaire['amount'] == "2 400,00"
+    assert erreur['error']
@@ -0,0 +1,251 @@
+# transaction_import.py
+"""
+Import de masse des mouvements (fichiers de fin de journée).
+
+Le fichier est lu en flux et traité par lots : chaque lot est validé en
+mémoire, puis enregistré par BankDatabase.import_postings en une transaction
+à nombre de requêtes fixe. Les lignes refusées sont écrites, avec leur motif,
+dans un fichier de rejets au format CSV.
+
+Deux formats sont acceptés :
+- csv : en-tête iban, type, amount, description et date (facultative),
+  séparateur « , » ou « ; » ;
+- statement : relevé bancaire exporté, avec une ligne « IBAN;FR76... » avant
+  l'en-tête « Date;Libellé;Débit;Crédit » et des montants à la française.
+
+    python transaction_import.py mouvements.csv --rejects rejets.csv
+"""
+import argparse
+import csv
+import logging
+import time
+from datetime import datetime
+from decimal import Decimal, InvalidOperation
+from itertools import chain, islice
+from typing import Any, Dict, Iterable, Iterator, List, Optional, TextIO, Tuple
+
+from mysql.connector import Error
+
+from database import BankDatabase, DEPOSIT, WITHDRAWAL, RETRYABLE_ERRORS, MAX_TX_ATTEMPTS
+from ibans import normalize_iban
+from money import cents_to_decimal, to_cents
+
+logger = logging.getLogger(__name__)
+
+# Nombre de lignes enregistrées par transaction
+DEFAULT_BATCH_SIZE = 1000
+
+# Montant maximal d'un mouvement (DECIMAL(15,2))
+MAX_AMOUNT = Decimal("9999999999999.99")
+
+FORMATS = ('csv', 'statement')
+
+# Libellés de type acceptés dans les fichiers
+_TYPES = {
+    'deposit': DEPOSIT, 'depot': DEPOSIT, 'dépôt': DEPOSIT, 'credit': DEPOSIT, 'crédit': DEPOSIT,
+    'withdrawal': WITHDRAWAL, 'retrait': WITHDRAWAL, 'debit': WITHDRAWAL, 'débit': WITHDRAWAL,
+}
+
+_DATE_FORMATS = ("%Y-%m-%d %H:%M:%S", "%Y-%m-%d", "%d/%m/%Y %H:%M:%S", "%d/%m/%Y")
+
+# Une ligne brute du fichier : (numéro de ligne, champs)
+RawRow = Tuple[int, Dict[str, str]]
+
+
+def parse_amount(text: str) -> int:
+    """
+    Montant en centimes. Accepte « 1234.5 », « 1 234,50 » ; refuse les
+    montants nuls, négatifs ou à plus de 2 décimales.
+    """
+    cleaned = (text or '').replace(' ', '').replace('\u00a0', '').replace('\u202f', '').replace(',', '.')
+    try:
+        amount = Decimal(cleaned)
+    except InvalidOperation:
+        raise ValueError(f"Montant invalide: {text!r}")
+    if amount <= 0 or amount > MAX_AMOUNT:
+        raise ValueError(f"Montant hors limites: {text!r}")
+    if amount != amount.quantize(Decimal("0.01")):
+        raise ValueError(f"Montant avec plus de 2 décimales: {text!r}")
+    return to_cents(amount)
+
+
+def parse_date(text: str, default: datetime) -> datetime:
+    text = (text or '').strip()
+    if not text:
+        return default
+    for date_format in _DATE_FORMATS:
+        try:
+            return datetime.strptime(text, date_format)
+        except ValueError:
+            continue
+    raise ValueError(f"Date invalide: {text!r}")
+
+
+def _sniff_delimiter(header: str) -> str:
+    return ';' if header.count(';') > header.count(',') else ','
+
+
+def read_csv(stream: TextIO) -> Iterator[RawRow]:
+    """Lignes d'un CSV à en-tête ; les noms de colonnes sont mis en minuscules"""
+    header = stream.readline()
+    if not header:
+        return
+    reader = csv.reader(chain([header], stream), delimiter=_sniff_delimiter(header))
+    columns = [column.strip().lower() for column in next(reader)]
+    for row in reader:
+        if any(field.strip() for field in row):
+            yield reader.line_num, dict(zip(columns, row))
+
+
+def read_statement(stream: TextIO) -> Iterator[RawRow]:
+    """Lignes d'un relevé bancaire, ramenées aux colonnes du format csv"""
+    reader = csv.reader(stream, delimiter=';')
+    iban, in_body = '', False
+    for row in reader:
+        if not any(field.strip() for field in row):
+            continue
+        first = row[0].strip().lower()
+        if not in_body:
+            if first in ('iban', 'compte') and len(row) > 1:
+                iban = row[1]
+            elif first == 'date':
+                in_body = True
+            continue
+        date, label, debit, credit = (row + [''] * 4)[:4]
+        if debit.strip() and credit.strip():
+            fields = {'iban': iban, 'type': '', 'amount': '', 'description': label, 'date': date,
+                      'error': "Débit et crédit renseignés sur la même ligne"}
+        elif debit.strip():
+            fields = {'iban': iban, 'type': WITHDRAWAL, 'amount': debit.replace('-', ''),
+                      'description': label, 'date': date}
+        else:
+            fields = {'iban': iban, 'type': DEPOSIT, 'amount': credit,
+                      'description': label, 'date': date}
+        yield reader.line_num, fields
+
+
+def validate(fields: Dict[str, str], now: datetime) -> Dict[str, Any]:
+    """Convertit une ligne brute en mouvement ; lève ValueError avec le motif du refus"""
+    if fields.get('error'):
+        raise ValueError(fields['error'])
+    iban = normalize_iban(fields.get('iban'))
+    if not iban:
+        raise ValueError("IBAN manquant")
+    if len(iban) > 34:
+        raise ValueError(f"IBAN trop long: {iban}")
+    transaction_type = _TYPES.get((fields.get('type') or '').strip().lower())
+    if transaction_type is None:
+        raise ValueError(f"Type de mouvement invalide: {fields.get('type')!r}")
+    return {
+        'iban': iban,
+        'type': transaction_type,
+        'amount_cents': parse_amount(fields.get('amount')),
+        'description': (fields.get('description') or '').strip(),
+        'date': parse_date(fields.get('date'), now),
+    }
+
+
+def _batches(rows: Iterable[RawRow], size: int) -> Iterator[List[RawRow]]:
+    iterator = iter(rows)
+    while True:
+        batch = list(islice(iterator, size))
+        if not batch:
+            return
+        yield batch
+
+
+class TransactionImporter:
+    """Enchaîne lecture, validation et enregistrement par lots, et tient les compteurs de l'import"""
+
+    def __init__(self, bank: BankDatabase, batch_size: int = DEFAULT_BATCH_SIZE,
+                 rejects: Optional[TextIO] = None):
+        self.bank = bank
+        self.batch_size = batch_size
+        self._rejects = csv.writer(rejects, delimiter=';') if rejects is not None else None
+        if self._rejects is not None:
+            self._rejects.writerow(['ligne', 'motif', 'iban', 'type', 'amount', 'description', 'date'])
+        self.counters = {'read': 0, 'imported': 0, 'rejected': 0}
+
+    def _reject(self, line: int, fields: Dict[str, Any], reason: str):
+        self.counters['rejected'] += 1
+        if self._rejects is not None:
+            if 'amount_cents' in fields:
+                fields = dict(fields, amount=cents_to_decimal(fields['amount_cents']))
+            self._rejects.writerow([line, reason] + [
+                fields.get(column, '') for column in ('iban', 'type', 'amount', 'description', 'date')
+            ])
+
+    def _store(self, postings: List[Dict[str, Any]]) -> List[Tuple[Dict[str, Any], str]]:
+        for attempt in range(1, MAX_TX_ATTEMPTS + 1):
+            try:
+                return self.bank.import_postings(postings)
+            except Error as e:
+                if e.errno in RETRYABLE_ERRORS and attempt < MAX_TX_ATTEMPTS:
+                    logger.warning(f"Lot rejoué après un conflit de verrou (tentative {attempt})")
+                    continue
+                logger.error(f"Échec d'enregistrement d'un lot de {len(postings)} lignes: {e}")
+                return [(posting, f"Erreur base de données: {e.msg}") for posting in postings]
+
+    def run(self, rows: Iterable[RawRow]) -> Dict[str, Any]:
+        """Importe toutes les lignes et renvoie le bilan (lignes lues, importées, rejetées, débit)"""
+        start = time.perf_counter()
+        for batch in _batches(rows, self.batch_size):
+            now = datetime.now()
+            postings = []
+            for line, fields in batch:
+                self.counters['read'] += 1
+                try:
+                    posting = validate(fields, now)
+                except ValueError as e:
+                    self._reject(line, fields, str(e))
+                    continue
+                posting['line'] = line
+                postings.append(posting)
+
+            rejected = self._store(postings) if postings else []
+            for posting, reason in rejected:
+                self._reject(posting['line'], posting, reason)
+            self.counters['imported'] += len(postings) - len(rejected)
+            logger.info(f"Import: {self.counters['read']} lignes lues, "
+                        f"{self.counters['imported']} importées, {self.counters['rejected']} rejetées")
+
+        elapsed = time.perf_counter() - start
+        return {
+            **self.counters,
+            'seconds': round(elapsed, 2),
+            'rows_per_s': round(self.counters['read'] / elapsed, 1) if elapsed else 0.0,
+        }
+
+
+def import_transactions(bank: BankDatabase, stream: TextIO, file_format: str = 'csv',
+                        batch_size: int = DEFAULT_BATCH_SIZE,
+                        rejects: Optional[TextIO] = None) -> Dict[str, Any]:
+    """Importe un fichier de mouvements ouvert en mode texte"""
+    if file_format not in FORMATS:
+        raise ValueError(f"Format inconnu: {file_format}")
+    rows = read_statement(stream) if file_format == 'statement' else read_csv(stream)
+    return TransactionImporter(bank, batch_size, rejects).run(rows)
+
+
+if __name__ == "__main__":
+    from mysql_config import MySQLDatabase
+
+    parser = argparse.ArgumentParser(description="Importe un fichier de mouvements par lots")
+    parser.add_argument("path", help="Fichier CSV ou relevé bancaire")
+    parser.add_argument("--format", choices=FORMATS, default='csv')
+    parser.add_argument("--batch-size", type=int, default=DEFAULT_BATCH_SIZE)
+    parser.add_argument("--rejects", default="rejets.csv", help="Fichier des lignes refusées")
+    parser.add_argument("--encoding", default="utf-8-sig")
+    args = parser.parse_args()
+
+    db = MySQLDatabase()
+    try:
+        with open(args.path, encoding=args.encoding, newline='') as stream, \
+                open(args.rejects, 'w', encoding='utf-8', newline='') as rejects:
+            report = import_transactions(BankDatabase(db), stream, args.format, args.batch_size, rejects)
+        print(f"{report['imported']} mouvements importés, {report['rejected']} rejetés "
+              f"sur {report['read']} lignes en {report['seconds']} s ({report['rows_per_s']} lignes/s)")
+        if report['rejected']:
+            print(f"Lignes refusées: {args.rejects}")
+    finally:
+        db.close()